@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database import get_async_db, AuditEvent as DBAuditEvent
+from app.models import AuditEventInfo, AuditPage
+from app.services.audit import audit_log
+from app.services.serialization import loads
+
+router = APIRouter()
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Events are stored as naive UTC, like every other timestamp column
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _event_info(event: DBAuditEvent) -> AuditEventInfo:
+    return AuditEventInfo(
+        id=event.id,
+        created_at=event.created_at,
+        operation=event.operation,
+        connection_id=event.connection_id,
+        client=event.client,
+        vhost=event.vhost,
+        exchange=event.exchange,
+        routing_key=event.routing_key,
+        queue=event.queue,
+        message_count=event.message_count,
+        message_ids=loads(event.message_ids) if event.message_ids else [],
+        success=event.success,
+        error=event.error
+    )
+
+
+@router.get("/", response_model=AuditPage)
+async def list_audit_events(
+    connection_id: Optional[int] = None,
+    queue: Optional[str] = None,
+    exchange: Optional[str] = None,
+    operation: Optional[str] = None,
+    client: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only events before this time"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Audit events, newest first. Filtering by connection or queue (with
+    an optional time range) is served by an index."""
+    query = select(DBAuditEvent)
+    if connection_id is not None:
+        query = query.where(DBAuditEvent.connection_id == connection_id)
+    if queue is not None:
+        query = query.where(DBAuditEvent.queue == queue)
+    if exchange is not None:
+        query = query.where(DBAuditEvent.exchange == exchange)
+    if operation is not None:
+        query = query.where(DBAuditEvent.operation == operation)
+    if client is not None:
+        query = query.where(DBAuditEvent.client == client)
+    if since is not None:
+        query = query.where(DBAuditEvent.created_at >= _naive_utc(since))
+    if until is not None:
+        query = query.where(DBAuditEvent.created_at < _naive_utc(until))
+    if cursor:
+        # Keyset paging: strictly older than the last event returned
+        try:
+            created_at, event_id = cursor.rsplit("_", 1)
+            created_at, event_id = datetime.fromisoformat(created_at), int(event_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(or_(
+            DBAuditEvent.created_at < created_at,
+            and_(DBAuditEvent.created_at == created_at, DBAuditEvent.id < event_id)
+        ))
+
+    query = query.order_by(DBAuditEvent.created_at.desc(), DBAuditEvent.id.desc()).limit(limit + 1)
+    events = (await db.execute(query)).scalars().all()
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        last = events[-1]
+        next_cursor = f"{last.created_at.isoformat()}_{last.id}"
+    return AuditPage(events=[_event_info(event) for event in events], next_cursor=next_cursor)
+
+
+@router.get("/stats")
+async def audit_stats():
+    """Buffered, written and dropped audit events on this replica"""
+    return audit_log.stats()
@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+from app.services.capture import capture_store
+from app.services.serialization import FastJSONResponse
+
+router = APIRouter()
+
+
+def _existing_capture(name: str) -> str:
+    try:
+        exists = capture_store.exists(name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Capture not found"
+        )
+    return name
+
+
+@router.get("/")
+async def list_captures():
+    """Captures on this replica with their size, offsets and time range"""
+    return FastJSONResponse({"captures": await run_in_threadpool(capture_store.list)})
+
+
+@router.get("/{name}")
+async def get_capture(name: str):
+    """Manifest and statistics of a capture"""
+    return FastJSONResponse(await run_in_threadpool(capture_store.info, _existing_capture(name)))
+
+
+@router.get("/{name}/messages")
+async def read_capture(
+    name: str,
+    offset: Optional[int] = Query(None, ge=0, description="First offset to return"),
+    since: Optional[datetime] = Query(None, description="First capture time to return"),
+    limit: int = Query(100, ge=1, le=1000),
+    search: Optional[str] = Query(None, description="Only messages whose body or metadata contain this text")
+):
+    """A page of captured messages in the export format; pass `next_offset`
+    back as `offset` for the following page"""
+    _existing_capture(name)
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    def read():
+        with capture_store.reader(name) as reader:
+            return reader.read(
+                offset=offset,
+                since=since.timestamp() if since else None,
+                limit=limit,
+                search=search.encode("utf-8") if search else None
+            )
+
+    try:
+        return FastJSONResponse(await run_in_threadpool(read))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read capture: {str(e)}"
+        )
+
+
+@router.delete("/{name}")
+async def delete_capture(name: str):
+    """Delete a capture that is not being written"""
+    _existing_capture(name)
+    if capture_store.is_active(name):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Capture is being written; stop its consumer first"
+        )
+    await run_in_threadpool(capture_store.delete, name)
+    return {"message": f"Capture {name} deleted"}
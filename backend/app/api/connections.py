@@ -1,25 +1,37 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db, RabbitMQConnection as DBConnection
+from app.database import get_async_db, RabbitMQConnection as DBConnection
 from app.models import (
     RabbitMQConnection, RabbitMQConnectionCreate, RabbitMQConnectionUpdate,
-    ConnectionTestResult
+    ConnectionHealth, NodeStatus
 )
 from app.services.encryption import encryption_service
-from app.services.rabbitmq_service import RabbitMQService
+from app.services.connection_registry import connection_registry
+from app.services.health_check import health_checker
+from app.services.serialization import dumps
 
 router = APIRouter()
 
 
+def _nodes_json(nodes) -> str:
+    """Extra node addresses as stored in the nodes column"""
+    return json.dumps([node.model_dump(exclude_none=True) for node in nodes])
+
+
 @router.post("/", response_model=RabbitMQConnection)
 async def create_connection(
     connection: RabbitMQConnectionCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new RabbitMQ connection"""
     # Check if connection name already exists
-    existing = db.query(DBConnection).filter(DBConnection.name == connection.name).first()
+    existing = (await db.execute(
+        select(DBConnection).where(DBConnection.name == connection.name)
+    )).scalars().first()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,12 +51,18 @@ async def create_connection(
         password_encrypted=encrypted_password,
         virtual_host=connection.virtual_host,
         use_ssl=connection.use_ssl,
-        description=connection.description
+        ssl_ca_cert=connection.ssl_ca_cert,
+        ssl_client_cert=connection.ssl_client_cert,
+        ssl_client_key_encrypted=encryption_service.encrypt(connection.ssl_client_key) if connection.ssl_client_key else None,
+        ssl_verify=connection.ssl_verify,
+        description=connection.description,
+        nodes=_nodes_json(connection.nodes),
+        balance_management=connection.balance_management
     )
     
     db.add(db_connection)
-    db.commit()
-    db.refresh(db_connection)
+    await db.commit()
+    await db.refresh(db_connection)
     
     # Return connection without encrypted password
     return RabbitMQConnection(
@@ -57,7 +75,13 @@ async def create_connection(
         password="***",  # Don't return actual password
         virtual_host=db_connection.virtual_host,
         use_ssl=db_connection.use_ssl,
+        ssl_ca_cert=db_connection.ssl_ca_cert,
+        ssl_client_cert=db_connection.ssl_client_cert,
+        ssl_client_key="***" if db_connection.ssl_client_key_encrypted else None,
+        ssl_verify=db_connection.ssl_verify is not False,
         description=db_connection.description,
+        nodes=json.loads(db_connection.nodes or "[]"),
+        balance_management=bool(db_connection.balance_management),
         created_at=db_connection.created_at,
         updated_at=db_connection.updated_at,
         is_active=db_connection.is_active
@@ -65,9 +89,11 @@ async def create_connection(
 
 
 @router.get("/", response_model=List[RabbitMQConnection])
-async def list_connections(db: Session = Depends(get_db)):
+async def list_connections(db: AsyncSession = Depends(get_async_db)):
     """List all RabbitMQ connections"""
-    connections = db.query(DBConnection).filter(DBConnection.is_active == True).all()
+    connections = (await db.execute(
+        select(DBConnection).where(DBConnection.is_active == True)
+    )).scalars().all()
     
     result = []
     for conn in connections:
@@ -81,7 +107,13 @@ async def list_connections(db: Session = Depends(get_db)):
             password="***",  # Don't return actual password
             virtual_host=conn.virtual_host,
             use_ssl=conn.use_ssl,
+            ssl_ca_cert=conn.ssl_ca_cert,
+            ssl_client_cert=conn.ssl_client_cert,
+            ssl_client_key="***" if conn.ssl_client_key_encrypted else None,
+            ssl_verify=conn.ssl_verify is not False,
             description=conn.description,
+            nodes=json.loads(conn.nodes or "[]"),
+            balance_management=bool(conn.balance_management),
             created_at=conn.created_at,
             updated_at=conn.updated_at,
             is_active=conn.is_active
@@ -90,13 +122,44 @@ async def list_connections(db: Session = Depends(get_db)):
     return result
 
 
+@router.get("/health", response_model=List[ConnectionHealth])
+async def list_connection_health():
+    """Latest test result of each connection tested since startup"""
+    return sorted(health_checker.results.values(), key=lambda result: result.connection_id)
+
+
+@router.post("/test-all")
+async def test_all_connections(db: AsyncSession = Depends(get_async_db)):
+    """Test every active connection concurrently.
+
+    Streams one ConnectionHealth per line (NDJSON) as each test finishes.
+    """
+    connections = (await db.execute(
+        select(DBConnection.id, DBConnection.name).where(DBConnection.is_active == True)
+    )).all()
+
+    targets = []
+    for connection_id, name in connections:
+        rabbitmq_service = await connection_registry.get_service_async(db, connection_id)
+        if rabbitmq_service:
+            targets.append((connection_id, name, rabbitmq_service))
+
+    async def stream():
+        async for result in health_checker.check_all(targets):
+            yield dumps(result) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/{connection_id}", response_model=RabbitMQConnection)
-async def get_connection(connection_id: int, db: Session = Depends(get_db)):
+async def get_connection(connection_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific RabbitMQ connection"""
-    connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    connection = (await db.execute(
+        select(DBConnection).where(
+            DBConnection.id == connection_id,
+            DBConnection.is_active == True
+        )
+    )).scalars().first()
     
     if not connection:
         raise HTTPException(
@@ -114,7 +177,13 @@ async def get_connection(connection_id: int, db: Session = Depends(get_db)):
         password="***",  # Don't return actual password
         virtual_host=connection.virtual_host,
         use_ssl=connection.use_ssl,
+        ssl_ca_cert=connection.ssl_ca_cert,
+        ssl_client_cert=connection.ssl_client_cert,
+        ssl_client_key="***" if connection.ssl_client_key_encrypted else None,
+        ssl_verify=connection.ssl_verify is not False,
         description=connection.description,
+        nodes=json.loads(connection.nodes or "[]"),
+        balance_management=bool(connection.balance_management),
         created_at=connection.created_at,
         updated_at=connection.updated_at,
         is_active=connection.is_active
@@ -125,13 +194,15 @@ async def get_connection(connection_id: int, db: Session = Depends(get_db)):
 async def update_connection(
     connection_id: int,
     connection_update: RabbitMQConnectionUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a RabbitMQ connection"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    db_connection = (await db.execute(
+        select(DBConnection).where(
+            DBConnection.id == connection_id,
+            DBConnection.is_active == True
+        )
+    )).scalars().first()
     
     if not db_connection:
         raise HTTPException(
@@ -142,16 +213,24 @@ async def update_connection(
     # Update fields
     update_data = connection_update.dict(exclude_unset=True)
     
+    if "nodes" in update_data:
+        update_data["nodes"] = _nodes_json(connection_update.nodes or [])
+    
     # Handle password encryption
     if "password" in update_data:
         update_data["password_encrypted"] = encryption_service.encrypt(update_data["password"])
         del update_data["password"]
+    if "ssl_client_key" in update_data:
+        client_key = update_data.pop("ssl_client_key")
+        update_data["ssl_client_key_encrypted"] = encryption_service.encrypt(client_key) if client_key else None
     
     for field, value in update_data.items():
         setattr(db_connection, field, value)
     
-    db.commit()
-    db.refresh(db_connection)
+    await db.commit()
+    await db.refresh(db_connection)
+    connection_registry.invalidate(connection_id)
+    health_checker.forget(connection_id)
     
     return RabbitMQConnection(
         id=db_connection.id,
@@ -163,7 +242,13 @@ async def update_connection(
         password="***",
         virtual_host=db_connection.virtual_host,
         use_ssl=db_connection.use_ssl,
+        ssl_ca_cert=db_connection.ssl_ca_cert,
+        ssl_client_cert=db_connection.ssl_client_cert,
+        ssl_client_key="***" if db_connection.ssl_client_key_encrypted else None,
+        ssl_verify=db_connection.ssl_verify is not False,
         description=db_connection.description,
+        nodes=json.loads(db_connection.nodes or "[]"),
+        balance_management=bool(db_connection.balance_management),
         created_at=db_connection.created_at,
         updated_at=db_connection.updated_at,
         is_active=db_connection.is_active
@@ -171,12 +256,14 @@ async def update_connection(
 
 
 @router.delete("/{connection_id}")
-async def delete_connection(connection_id: int, db: Session = Depends(get_db)):
+async def delete_connection(connection_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a RabbitMQ connection (soft delete)"""
-    connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    connection = (await db.execute(
+        select(DBConnection).where(
+            DBConnection.id == connection_id,
+            DBConnection.is_active == True
+        )
+    )).scalars().first()
     
     if not connection:
         raise HTTPException(
@@ -185,24 +272,36 @@ async def delete_connection(connection_id: int, db: Session = Depends(get_db)):
         )
     
     connection.is_active = False
-    db.commit()
+    await db.commit()
+    connection_registry.invalidate(connection_id)
+    health_checker.forget(connection_id)
     
     return {"message": "Connection deleted successfully"}
 
 
-@router.post("/{connection_id}/test", response_model=ConnectionTestResult)
-async def test_connection(connection_id: int, db: Session = Depends(get_db)):
-    """Test a RabbitMQ connection"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+@router.post("/{connection_id}/test", response_model=ConnectionHealth)
+async def test_connection(connection_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Test a RabbitMQ connection (AMQP and Management API in parallel)"""
+    rabbitmq_service = await connection_registry.get_service_async(db, connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+    
+    return await health_checker.check(connection_id, rabbitmq_service.connection.name, rabbitmq_service)
+
+
+@router.get("/{connection_id}/nodes", response_model=List[NodeStatus])
+async def get_connection_nodes(connection_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Measured latency and health of each node of a connection"""
+    rabbitmq_service = await connection_registry.get_service_async(db, connection_id)
+    
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
-    rabbitmq_service = RabbitMQService(db_connection)
-    return rabbitmq_service.test_connection()
+    return rabbitmq_service.nodes.state()
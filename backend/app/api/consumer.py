@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from app.database import get_db, RabbitMQConnection as DBConnection
-from app.models import ConsumeRequest, ConsumedMessage
-from app.services.rabbitmq_service import RabbitMQService
-import pika
+from app.models import BROWSE_MAX_MESSAGES, ConsumeRequest, ConsumedMessage, DlqAnalyzeRequest, QueueProfileRequest
+from app.services.rabbitmq_service import RabbitMQService, MessageBatchReader, export_message
+from app.services.connection_registry import connection_registry
+from app.services.admission import admission, client_of
+from app.services.audit import AUDIT_MAX_MESSAGE_IDS, audit_log
+from app.services.decoders import PayloadDecoder
+from app.services.dlq_analysis import analyze_dead_letters
+from app.services.queue_profile import profile_queue
+from app.services.serialization import FastJSONResponse, dumps
+from app.services.lazy_import import lazy_import
+from app.services.session_store import session_store
+import anyio
 import json
 import asyncio
 from datetime import datetime
-from typing import Dict, Set
+from typing import Dict, Optional, Set
 import threading
+import zlib
+
+pika = lazy_import("pika")
 
 router = APIRouter()
 
@@ -16,6 +31,17 @@ router = APIRouter()
 active_consumers: Dict[str, Dict] = {}
 
 
+def _decoder_for(consume_request: ConsumeRequest) -> PayloadDecoder:
+    """Payload decoder of a request; unknown codecs and bad schemas are a 400"""
+    try:
+        return PayloadDecoder(consume_request.decoder, consume_request.schemas)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid decoder settings: {str(e)}"
+        )
+
+
 # DISABLED: Conflicting with main.py WebSocket implementation
 # @router.websocket("/consume/{connection_id}")
 async def consume_messages(websocket: WebSocket, connection_id: int):
@@ -213,96 +239,366 @@ async def consume_simple_test(data: dict):
 @router.post("/consume-messages")
 async def consume_messages_http(
     consume_request: ConsumeRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Consume messages via HTTP (for simple consumption)"""
     # Get connection
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == consume_request.connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, consume_request.connection_id)
 
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
 
-    try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        messages = rabbitmq_service.consume_messages(
-            queue_name=consume_request.queue,
-            max_messages=consume_request.max_messages or 10,
-            auto_ack=consume_request.auto_ack,
-            vhost=consume_request.vhost
-        )
+    decoder = _decoder_for(consume_request)
+    with admission.slot(rabbitmq_service, client_of(request)):
+        try:
+            messages = await run_in_threadpool(
+                rabbitmq_service.consume_messages,
+                queue_name=consume_request.queue,
+                max_messages=consume_request.max_messages or 10,
+                auto_ack=consume_request.auto_ack,
+                vhost=consume_request.vhost,
+                decoder=decoder
+            )
+            await audit_log.record(
+                "consume", consume_request.connection_id, client_of(request),
+                vhost=consume_request.vhost, queue=consume_request.queue,
+                message_count=len(messages),
+                message_ids=[message["properties"].get("message_id") for message in messages]
+            )
 
-        return {"messages": messages}
+            return FastJSONResponse({"messages": messages})
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to consume messages: {str(e)}"
-        )
+        except Exception as e:
+            await audit_log.record(
+                "consume", consume_request.connection_id, client_of(request),
+                vhost=consume_request.vhost, queue=consume_request.queue,
+                message_count=0, success=False, error=str(e)
+            )
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to consume messages: {str(e)}"
+            )
 
 
 @router.post("/browse")
 async def browse_messages_http(
     consume_request: ConsumeRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Browse messages via HTTP (messages remain in queue)"""
     # Get connection
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == consume_request.connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, consume_request.connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
 
-    if not db_connection:
+    decoder = _decoder_for(consume_request)
+    with admission.slot(rabbitmq_service, client_of(request)):
+        try:
+            messages = await run_in_threadpool(
+                rabbitmq_service.browse_messages,
+                queue_name=consume_request.queue,
+                max_messages=consume_request.max_messages or 10,
+                vhost=consume_request.vhost,
+                decoder=decoder
+            )
+
+            return FastJSONResponse({"messages": messages})
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to browse messages: {str(e)}"
+            )
+
+
+@router.get("/export")
+async def export_messages(
+    request: Request,
+    connection_id: int,
+    queue: str,
+    vhost: str = "/",
+    mode: str = Query("browse", pattern="^(browse|consume)$"),
+    max_messages: Optional[int] = Query(None, ge=1),
+    batch_size: int = Query(100, ge=1, le=10000),
+    compress: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Stream queue contents as NDJSON (optionally gzip), one message per line.
+
+    Messages are pulled in `batch_size` chunks. In `consume` mode each chunk
+    is acked only after it has been written to the client. In `browse` mode
+    nothing can be acked, so every exported message stays unacked on the
+    broker until the export ends and requeues them; browse exports are
+    therefore limited to BROWSE_MAX_MESSAGES (the default `max_messages`).
+    """
+    browse = mode == "browse"
+    if browse and max_messages is not None and max_messages > BROWSE_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Browse exports are limited to {BROWSE_MAX_MESSAGES} messages; use mode=consume for more"
+        )
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
+
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
 
+    client = client_of(request)
+    # The admission slot is held until the stream ends
+    ticket = admission.acquire(rabbitmq_service, client)
+    reader = MessageBatchReader(
+        rabbitmq_service,
+        queue,
+        destructive=not browse,
+        batch_size=batch_size,
+        vhost=vhost,
+        limit=max_messages
+    )
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        messages = rabbitmq_service.browse_messages(
-            queue_name=consume_request.queue,
-            max_messages=consume_request.max_messages or 10,
-            vhost=consume_request.vhost
+        await run_in_threadpool(reader.open)
+    except Exception as e:
+        admission.release(ticket)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to export messages: {str(e)}"
+        )
+
+    progress = {"exported": 0, "message_ids": [], "released": False}
+
+    async def release():
+        # Runs from the stream's finally and again as the response's
+        # background task: a client that disconnects before the first chunk
+        # cancels the response before the generator ever starts
+        if progress["released"]:
+            return
+        progress["released"] = True
+        # A disconnect mid-stream cancels the generator; finish the cleanup anyway
+        with anyio.CancelScope(shield=True):
+            try:
+                await run_in_threadpool(reader.close)
+            finally:
+                admission.release(ticket)
+                if reader.destructive:
+                    await audit_log.record(
+                        "export", connection_id, client, vhost=vhost, queue=queue,
+                        message_count=progress["exported"], message_ids=progress["message_ids"]
+                    )
+
+    async def stream():
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        try:
+            while max_messages is None or progress["exported"] < max_messages:
+                remaining = batch_size if max_messages is None else max_messages - progress["exported"]
+                batch = await run_in_threadpool(reader.read_batch, remaining)
+                if not batch:
+                    break
+
+                chunk = b"".join(dumps(export_message(*delivery, queue)) + b"\n" for delivery in batch)
+                if compressor:
+                    chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+                # The generator resumes only once the chunk has been sent
+                yield chunk
+                await run_in_threadpool(reader.commit)
+                progress["exported"] += len(batch)
+                if reader.destructive and len(progress["message_ids"]) < AUDIT_MAX_MESSAGE_IDS:
+                    progress["message_ids"].extend(properties.message_id for _, properties, _ in batch)
+
+            if compressor:
+                yield compressor.flush()
+        finally:
+            await release()
+
+    filename = f"{queue}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        background=BackgroundTask(release)
+    )
+
+
+@router.post("/dlq-analyze")
+async def analyze_dead_letter_queue(
+    analyze_request: DlqAnalyzeRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Break a dead-letter queue down by x-death reason, original queue,
+    exchange, routing key and first-death time without consuming it.
+
+    Messages are read in `batch_size` chunks and folded into bounded
+    counters, so memory doesn't grow with `max_messages`; everything read
+    is requeued when the scan ends.
+    """
+    rabbitmq_service = connection_registry.get_service(db, analyze_request.connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+
+    # The admission slot is held until the scan ends
+    ticket = admission.acquire(rabbitmq_service, client_of(request))
+    reader = MessageBatchReader(
+        rabbitmq_service,
+        analyze_request.queue,
+        destructive=False,
+        batch_size=analyze_request.batch_size,
+        vhost=analyze_request.vhost,
+        limit=analyze_request.max_messages
+    )
+    try:
+        await run_in_threadpool(reader.open)
+    except Exception as e:
+        admission.release(ticket)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to analyze dead letters: {str(e)}"
         )
 
-        return {"messages": messages}
+    released = {"done": False}
+
+    async def release():
+        # As for exports, also the streamed response's background task, for
+        # clients that disconnect before the stream starts
+        if released["done"]:
+            return
+        released["done"] = True
+        with anyio.CancelScope(shield=True):
+            try:
+                await run_in_threadpool(reader.close)
+            finally:
+                admission.release(ticket)
+
+    async def updates():
+        try:
+            async for update in analyze_dead_letters(
+                reader,
+                analyze_request.max_messages,
+                bucket_seconds=analyze_request.bucket_seconds,
+                samples=analyze_request.samples
+            ):
+                yield update
+        finally:
+            await release()
+
+    if analyze_request.progress:
+        async def stream():
+            async for update in updates():
+                yield json.dumps(update) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson", background=BackgroundTask(release))
 
+    try:
+        result = None
+        async for update in updates():
+            result = update
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to browse messages: {str(e)}"
+            detail=f"Failed to analyze dead letters: {str(e)}"
+        )
+    finally:
+        await release()
+
+
+@router.post("/profile")
+async def profile_queue_contents(
+    profile_request: QueueProfileRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Summarize what is in a queue without consuming it: size and age
+    distributions, content types, top routing keys and header values.
+
+    At most `max_messages` are read from the head of the queue, and a
+    reservoir sample of message summaries is returned instead of the
+    messages. Byte and content-type totals for the whole queue are
+    projections of that head, not measurements.
+    """
+    rabbitmq_service = connection_registry.get_service(db, profile_request.connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
         )
 
+    with admission.slot(rabbitmq_service, client_of(request)):
+        reader = MessageBatchReader(
+            rabbitmq_service,
+            profile_request.queue,
+            destructive=False,
+            batch_size=profile_request.batch_size,
+            vhost=profile_request.vhost,
+            limit=profile_request.max_messages
+        )
+        try:
+            await run_in_threadpool(reader.open)
+            try:
+                profile = await profile_queue(
+                    reader,
+                    profile_request.max_messages,
+                    top_k=profile_request.top_k,
+                    sample_size=profile_request.sample_size
+                )
+            finally:
+                await run_in_threadpool(reader.close)
+            return FastJSONResponse(profile)
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to profile queue: {str(e)}"
+            )
+
 
 @router.get("/active")
 async def get_active_consumers():
-    """Get list of active consumers"""
+    """Get list of active consumers across all replicas"""
+    sessions = await session_store.list_sessions()
     consumers = []
-    for consumer_id, info in active_consumers.items():
+    for session in sessions:
         consumers.append({
-            "id": consumer_id,
-            "queue": info["queue"],
-            "vhost": info["vhost"]
+            "id": session.id,
+            "queue": session.queue,
+            "vhost": session.vhost,
+            "connection_id": session.connection_id,
+            "replica_id": session.replica_id,
+            "started_at": session.started_at
         })
     return {"active_consumers": consumers}
 
 
 @router.post("/stop/{consumer_id}")
-async def stop_consumer(consumer_id: str):
-    """Stop a specific consumer"""
-    if consumer_id in active_consumers:
-        # The consumer will be stopped when the WebSocket connection is closed
-        # This is handled in the WebSocket endpoint
-        return {"message": f"Stop signal sent to consumer {consumer_id}"}
-    else:
+async def stop_consumer(consumer_id: str, request: Request):
+    """Stop a specific consumer, routing the request to the replica that owns it"""
+    session = await session_store.get(consumer_id)
+    if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Consumer not found"
         )
+
+    consumer_manager = request.app.state.consumer_manager
+    if session.replica_id == consumer_manager.replica_id:
+        await consumer_manager.stop(consumer_id)
+        return {"message": f"Consumer {consumer_id} stopped", "replica_id": session.replica_id}
+
+    # The owning replica picks this up on its next heartbeat
+    await session_store.request_stop(consumer_id)
+    return {"message": f"Stop signal sent to consumer {consumer_id}", "replica_id": session.replica_id}
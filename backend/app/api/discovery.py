@@ -1,29 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Iterable, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.database import get_db, RabbitMQConnection as DBConnection
-from app.models import ClusterDiscovery
+from app.database import get_db
+from app.models import ClusterDiscovery, ClusterOverview
+from app.services.admission import AdmissionRejected, admission, client_of
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.connection_registry import connection_registry
+from app.services.metrics import FULL_RESPONSES, NOT_MODIFIED_RESPONSES
 from app.services.rabbitmq_service import RabbitMQService
+from app.services.serialization import dumps
+from app.services.topology_cache import KINDS
 
 router = APIRouter()
 
 
+def _not_modified(request: Request, etag: str, modified: float) -> bool:
+    """Evaluate If-None-Match (weak comparison), else If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def _conditional_response(request: Request, rabbitmq_service: RabbitMQService, kinds: Iterable[str],
+                                vhost: Optional[str], content: Callable[[], object]) -> Response:
+    """304 when the client's copy is current, otherwise the encoded view.
+
+    Validators come from the topology fingerprints, so an unchanged poll
+    is answered without serializing anything. Discovery runs off the event
+    loop and counts against the cluster's and client's admission limits.
+    """
+    topology = rabbitmq_service.topology
+    with admission.slot(rabbitmq_service, client_of(request)):
+        snapshot = await run_in_threadpool(topology.get)
+    kinds = tuple(kinds)
+    etag, modified = snapshot.validators(kinds, vhost)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Cache-Control": "no-cache"
+    }
+    if snapshot.stale:
+        # The cluster's circuit is open; this is the last topology we saw
+        headers["Warning"] = '110 - "Response is Stale"'
+        headers["Age"] = str(snapshot.age())
+
+    if _not_modified(request, etag, modified):
+        NOT_MODIFIED_RESPONSES.inc()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    FULL_RESPONSES.inc()
+    body = topology.body((kinds, vhost), etag, lambda: dumps(content(snapshot.discovery)))
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @router.get("/{connection_id}/cluster", response_model=ClusterDiscovery)
-async def discover_cluster(connection_id: int, db: Session = Depends(get_db)):
+async def discover_cluster(connection_id: int, request: Request, db: Session = Depends(get_db)):
     """Discover all objects in a RabbitMQ cluster"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        return rabbitmq_service.discover_cluster()
+        return await _conditional_response(request, rabbitmq_service, KINDS, None, lambda discovery: discovery)
+    except (AdmissionRejected, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -32,28 +87,26 @@ async def discover_cluster(connection_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{connection_id}/queues")
-async def get_queues(connection_id: int, vhost: str = None, db: Session = Depends(get_db)):
+async def get_queues(connection_id: int, request: Request, vhost: str = None, db: Session = Depends(get_db)):
     """Get queues from a specific connection, optionally filtered by vhost"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        discovery = rabbitmq_service.discover_cluster()
-        
-        queues = discovery.queues
-        if vhost:
-            queues = [q for q in queues if q.vhost == vhost]
+        def content(discovery):
+            queues = discovery.queues
+            if vhost:
+                queues = [q for q in queues if q.vhost == vhost]
+            return {"queues": queues}
         
-        return {"queues": queues}
+        return await _conditional_response(request, rabbitmq_service, ("queues",), vhost or None, content)
+    except (AdmissionRejected, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -62,28 +115,26 @@ async def get_queues(connection_id: int, vhost: str = None, db: Session = Depend
 
 
 @router.get("/{connection_id}/exchanges")
-async def get_exchanges(connection_id: int, vhost: str = None, db: Session = Depends(get_db)):
+async def get_exchanges(connection_id: int, request: Request, vhost: str = None, db: Session = Depends(get_db)):
     """Get exchanges from a specific connection, optionally filtered by vhost"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        discovery = rabbitmq_service.discover_cluster()
+        def content(discovery):
+            exchanges = discovery.exchanges
+            if vhost:
+                exchanges = [e for e in exchanges if e.vhost == vhost]
+            return {"exchanges": exchanges}
         
-        exchanges = discovery.exchanges
-        if vhost:
-            exchanges = [e for e in exchanges if e.vhost == vhost]
-        
-        return {"exchanges": exchanges}
+        return await _conditional_response(request, rabbitmq_service, ("exchanges",), vhost or None, content)
+    except (AdmissionRejected, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -92,24 +143,22 @@ async def get_exchanges(connection_id: int, vhost: str = None, db: Session = Dep
 
 
 @router.get("/{connection_id}/vhosts")
-async def get_vhosts(connection_id: int, db: Session = Depends(get_db)):
+async def get_vhosts(connection_id: int, request: Request, db: Session = Depends(get_db)):
     """Get virtual hosts from a specific connection"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        discovery = rabbitmq_service.discover_cluster()
-        
-        return {"vhosts": discovery.vhosts}
+        return await _conditional_response(
+            request, rabbitmq_service, ("vhosts",), None, lambda discovery: {"vhosts": discovery.vhosts}
+        )
+    except (AdmissionRejected, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -118,26 +167,46 @@ async def get_vhosts(connection_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{connection_id}/users")
-async def get_users(connection_id: int, db: Session = Depends(get_db)):
+async def get_users(connection_id: int, request: Request, db: Session = Depends(get_db)):
     """Get users from a specific connection"""
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        discovery = rabbitmq_service.discover_cluster()
-        
-        return {"users": discovery.users}
+        return await _conditional_response(
+            request, rabbitmq_service, ("users",), None, lambda discovery: {"users": discovery.users}
+        )
+    except (AdmissionRejected, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get users: {str(e)}"
         )
+
+
+@router.get("/{connection_id}/overview", response_model=ClusterOverview)
+async def get_overview(connection_id: int, db: Session = Depends(get_db)):
+    """Get cluster versions, totals, message rates and node health"""
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
+    
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+    
+    try:
+        return await rabbitmq_service.overview.get()
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get overview: {str(e)}"
+        )
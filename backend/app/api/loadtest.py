@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db
+from app.models import LoadTestConfig, LoadTestStatus
+from app.services.admission import client_of
+from app.services.connection_registry import connection_registry
+from app.services.loadtest import FINISHED_STATES, loadtest_manager
+from app.services.serialization import dumps_text
+
+router = APIRouter()
+
+
+@router.post("/", response_model=LoadTestStatus)
+async def start_load_test(
+    config: LoadTestConfig,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Start publishing synthetic messages and measuring end-to-end latency"""
+    rabbitmq_service = connection_registry.get_service(db, config.connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+
+    try:
+        job = loadtest_manager.start(config, rabbitmq_service, client_of(request))
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+    return job.status()
+
+
+@router.get("/", response_model=List[LoadTestStatus])
+async def list_load_tests():
+    """List running and recent load tests on this replica"""
+    return [job.status() for job in loadtest_manager.jobs.values()]
+
+
+@router.get("/{job_id}", response_model=LoadTestStatus)
+async def get_load_test(job_id: str):
+    """Get load test status and latency percentiles"""
+    job = loadtest_manager.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Load test not found"
+        )
+    return job.status()
+
+
+@router.post("/{job_id}/stop", response_model=LoadTestStatus)
+async def stop_load_test(job_id: str):
+    """Stop a running load test"""
+    if not loadtest_manager.stop(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Load test not found"
+        )
+    return loadtest_manager.get(job_id).status()
+
+
+@router.websocket("/{job_id}/ws")
+async def load_test_updates(websocket: WebSocket, job_id: str):
+    """Live status frames until the load test finishes"""
+    await websocket.accept()
+    job = loadtest_manager.get(job_id)
+    if not job:
+        await websocket.send_json({"error": "Load test not found"})
+        await websocket.close()
+        return
+
+    updates = job.subscribe()
+    try:
+        while True:
+            update = await updates.get()
+            await websocket.send_text(dumps_text(update))
+            if update.state in FINISHED_STATES:
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job.unsubscribe(updates)
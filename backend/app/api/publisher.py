@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db, RabbitMQConnection as DBConnection
-from app.models import PublishMessage, PublishResult
-from app.services.rabbitmq_service import RabbitMQService
+from typing import Optional
+from app.database import get_db
+from app.models import PublishMessage, PublishResult, RpcRequest, RpcResponse, RpcResult
+from app.services.admission import client_of
+from app.services.audit import audit_log
+from app.services.connection_registry import connection_registry
+from app.services.histogram import LatencyHistogram
+from app.services.message_import import import_messages
+import asyncio
+import json
+import time
 import uuid
 from datetime import datetime
 
@@ -12,24 +21,20 @@ router = APIRouter()
 @router.post("/publish", response_model=PublishResult)
 async def publish_message(
     message_data: PublishMessage,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Publish a message to RabbitMQ"""
     # Get connection
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == message_data.connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, message_data.connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        
         # Add default properties if not provided
         properties = message_data.properties or {}
         if "timestamp" not in properties:
@@ -45,6 +50,12 @@ async def publish_message(
             properties=properties,
             vhost=message_data.vhost
         )
+        await audit_log.record(
+            "publish", message_data.connection_id, client_of(request),
+            vhost=message_data.vhost, exchange=message_data.exchange,
+            routing_key=message_data.routing_key,
+            message_ids=[properties.get("message_id")], success=success
+        )
         
         if success:
             return PublishResult(
@@ -59,6 +70,11 @@ async def publish_message(
             )
             
     except Exception as e:
+        await audit_log.record(
+            "publish", message_data.connection_id, client_of(request),
+            vhost=message_data.vhost, exchange=message_data.exchange,
+            routing_key=message_data.routing_key, success=False, error=str(e)
+        )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to publish message: {str(e)}"
@@ -72,20 +88,15 @@ async def validate_publish_params(
 ):
     """Validate publish parameters without actually publishing"""
     # Get connection
-    db_connection = db.query(DBConnection).filter(
-        DBConnection.id == message_data.connection_id,
-        DBConnection.is_active == True
-    ).first()
+    rabbitmq_service = connection_registry.get_service(db, message_data.connection_id)
     
-    if not db_connection:
+    if not rabbitmq_service:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     try:
-        rabbitmq_service = RabbitMQService(db_connection)
-        
         # Test connection
         test_result = rabbitmq_service.test_connection()
         if not test_result.success:
@@ -96,7 +107,7 @@ async def validate_publish_params(
         
         # Validate exchange exists (if specified)
         if message_data.exchange:
-            discovery = rabbitmq_service.discover_cluster()
+            discovery = rabbitmq_service.topology.get().discovery
             exchange_exists = any(
                 e.name == message_data.exchange and e.vhost == message_data.vhost
                 for e in discovery.exchanges
@@ -117,3 +128,165 @@ async def validate_publish_params(
             "valid": False,
             "message": f"Validation failed: {str(e)}"
         }
+
+
+@router.post("/import")
+async def import_messages_file(
+    request: Request,
+    connection_id: int = Query(...),
+    file: UploadFile = File(...),
+    vhost: str = Query(None),
+    exchange: Optional[str] = Query(None, description="Publish every line to this exchange"),
+    routing_key: Optional[str] = Query(None, description="Publish every line with this routing key"),
+    rate: Optional[float] = Query(None, gt=0, description="Maximum messages per second"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+    progress: bool = Query(False, description="Stream NDJSON progress updates"),
+    db: Session = Depends(get_db)
+):
+    """Publish an NDJSON (optionally gzipped) message dump, as produced by
+    /api/consumer/export or the consume endpoints"""
+    rabbitmq_service = connection_registry.get_service(db, connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+
+    imported = import_messages(
+        rabbitmq_service, file, vhost=vhost, exchange=exchange,
+        routing_key=routing_key, rate=rate, batch_size=batch_size
+    )
+
+    async def updates():
+        # One audit event per import, with what was published before any failure
+        last = {"published": 0, "failed": 0}
+        error = None
+        try:
+            async for update in imported:
+                last = update
+                yield update
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if error is None and not last.get("done"):
+                error = "Import interrupted"
+            elif error is None and last["failed"]:
+                error = f"{last['failed']} message(s) failed to publish"
+            await audit_log.record(
+                "import", connection_id, client_of(request), vhost=vhost,
+                exchange=exchange, routing_key=routing_key,
+                message_count=last["published"], success=error is None, error=error
+            )
+
+    if progress:
+        async def stream():
+            async for update in updates():
+                yield json.dumps(update) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    try:
+        result = None
+        async for update in updates():
+            result = update
+        return result
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import messages: {str(e)}"
+        )
+
+
+def _reply_properties(message) -> dict:
+    return {
+        "content_type": message.content_type,
+        "content_encoding": message.content_encoding,
+        "headers": message.headers,
+        "correlation_id": message.correlation_id,
+        "message_id": message.message_id,
+        "timestamp": message.timestamp.isoformat() if message.timestamp else None,
+        "type": message.type,
+        "app_id": message.app_id,
+    }
+
+
+@router.post("/rpc", response_model=RpcResult)
+async def rpc_round_trip(
+    rpc: RpcRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Send request(s) with direct reply-to and measure round-trip latency"""
+    rabbitmq_service = connection_registry.get_service(db, rpc.connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+
+    body = rpc.message.encode("utf-8")
+    base_properties = rpc.properties or {}
+    base_correlation_id = base_properties.get("correlation_id")
+    latency = LatencyHistogram()
+    responses = {}
+    counts = {"received": 0, "timeouts": 0, "errors": 0}
+    next_index = iter(range(rpc.repeat))
+
+    async def worker():
+        for index in next_index:
+            properties = dict(base_properties)
+            if base_correlation_id and rpc.repeat > 1:
+                properties["correlation_id"] = f"{base_correlation_id}-{index}"
+            elif not base_correlation_id:
+                properties["correlation_id"] = uuid.uuid4().hex
+
+            response = RpcResponse(correlation_id=properties["correlation_id"])
+            start = time.perf_counter()
+            try:
+                reply = await rabbitmq_service.rpc_call_async(
+                    rpc.exchange, rpc.routing_key, body, properties,
+                    timeout=rpc.timeout_seconds, vhost=rpc.vhost
+                )
+                elapsed_us = int((time.perf_counter() - start) * 1_000_000)
+                latency.record(elapsed_us)
+                counts["received"] += 1
+                response.latency_ms = elapsed_us / 1000
+                response.body = reply.body.decode("utf-8", errors="replace")
+                response.properties = _reply_properties(reply)
+            except asyncio.TimeoutError:
+                counts["timeouts"] += 1
+                response.error = f"No reply within {rpc.timeout_seconds}s"
+            except Exception as e:
+                counts["errors"] += 1
+                response.error = str(e)
+
+            if index < rpc.max_responses:
+                responses[index] = response
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(rpc.concurrency, rpc.repeat))))
+
+    await audit_log.record(
+        "rpc", rpc.connection_id, client_of(request), vhost=rpc.vhost,
+        exchange=rpc.exchange, routing_key=rpc.routing_key, message_count=rpc.repeat,
+        message_ids=[base_properties.get("message_id")], success=not counts["errors"],
+        error=f"{counts['errors']} request(s) failed" if counts["errors"] else None
+    )
+
+    percentiles = latency.percentiles((50, 99))
+    return RpcResult(
+        sent=rpc.repeat,
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+        latency_ms={
+            "min": (latency.min or 0) / 1000,
+            "p50": percentiles[50] / 1000,
+            "p99": percentiles[99] / 1000,
+            "max": latency.max / 1000,
+            "mean": round(latency.mean / 1000, 3),
+        },
+        responses=[responses[index] for index in sorted(responses)],
+        **counts
+    )
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.database import get_db
+from app.models import ReplayConfig, ReplayStatus
+from app.services.admission import client_of
+from app.services.capture import capture_store
+from app.services.connection_registry import connection_registry
+from app.services.replay import capture_records, file_records, replay_manager
+
+router = APIRouter()
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _service_for(db: Session, config: ReplayConfig):
+    rabbitmq_service = connection_registry.get_service(db, config.connection_id)
+
+    if not rabbitmq_service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+    return rabbitmq_service
+
+
+def _start(config: ReplayConfig, rabbitmq_service, source: str, records, client: str,
+           cleanup: Optional[str] = None) -> ReplayStatus:
+    try:
+        job = replay_manager.start(config, rabbitmq_service, source, records, cleanup, client)
+    except RuntimeError as e:
+        records.close()
+        if cleanup:
+            os.remove(cleanup)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+    return job.status()
+
+
+@router.post("/", response_model=ReplayStatus)
+async def start_replay(
+    config: ReplayConfig,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Republish a capture with its recorded timing, optionally sped up,
+    rate-capped or re-routed"""
+    rabbitmq_service = _service_for(db, config)
+
+    if not config.capture:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="capture is required; upload export files to /api/replay/upload"
+        )
+    try:
+        exists = capture_store.exists(config.capture)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Capture not found"
+        )
+
+    records = capture_records(config.capture, config.offset, _epoch(config.since), _epoch(config.until))
+    return _start(config, rabbitmq_service, f"capture:{config.capture}", records, client_of(request))
+
+
+@router.post("/upload", response_model=ReplayStatus)
+async def start_replay_upload(
+    request: Request,
+    config: str = Form(..., description="ReplayConfig as JSON"),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Republish an NDJSON (optionally gzipped) export or capture page,
+    timed by each line's `captured_at` or message timestamp"""
+    try:
+        replay_config = ReplayConfig.model_validate_json(config)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False)
+        )
+    rabbitmq_service = _service_for(db, replay_config)
+
+    # The job outlives the request, so the upload is spooled to disk and
+    # read back by the replay as it goes
+    def spool() -> str:
+        with tempfile.NamedTemporaryFile(prefix="replay-", suffix=".ndjson", delete=False) as spooled:
+            shutil.copyfileobj(file.file, spooled)
+            return spooled.name
+
+    path = await run_in_threadpool(spool)
+    records = file_records(path, _epoch(replay_config.since), _epoch(replay_config.until))
+    return _start(replay_config, rabbitmq_service, f"upload:{file.filename}", records, client_of(request), cleanup=path)
+
+
+@router.get("/", response_model=List[ReplayStatus])
+async def list_replays():
+    """List running and recent replays on this replica"""
+    return [job.status() for job in replay_manager.jobs.values()]
+
+
+@router.get("/{job_id}", response_model=ReplayStatus)
+async def get_replay(job_id: str):
+    """Get replay progress with target and achieved rates"""
+    job = replay_manager.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Replay not found"
+        )
+    return job.status()
+
+
+@router.post("/{job_id}/stop", response_model=ReplayStatus)
+async def stop_replay(job_id: str):
+    """Stop a running replay"""
+    if not replay_manager.stop(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Replay not found"
+        )
+    return replay_manager.get(job_id).status()
@@ -0,0 +1,97 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db, RabbitMQConnection as DBConnection, WatchRule as DBWatchRule
+from app.models import WatchEvent, WatchRule, WatchRuleCreate
+from app.services.serialization import dumps_text
+from app.services.watch import watch_service
+
+router = APIRouter()
+
+
+@router.post("/rules", response_model=WatchRule)
+async def create_watch_rule(rule: WatchRuleCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a queue watch rule"""
+    connection = (await db.execute(
+        select(DBConnection.id).where(
+            DBConnection.id == rule.connection_id,
+            DBConnection.is_active == True
+        )
+    )).first()
+    if not connection:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Connection not found"
+        )
+
+    db_rule = DBWatchRule(**rule.model_dump())
+    db.add(db_rule)
+    await db.commit()
+    await db.refresh(db_rule)
+    watch_service.wake()
+
+    return WatchRule.model_validate(db_rule)
+
+
+@router.get("/rules", response_model=List[WatchRule])
+async def list_watch_rules(connection_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """List watch rules, optionally for one connection"""
+    query = select(DBWatchRule).where(DBWatchRule.is_active == True)
+    if connection_id is not None:
+        query = query.where(DBWatchRule.connection_id == connection_id)
+    rules = (await db.execute(query.order_by(DBWatchRule.id))).scalars().all()
+    return [WatchRule.model_validate(rule) for rule in rules]
+
+
+@router.delete("/rules/{rule_id}")
+async def delete_watch_rule(rule_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Delete a watch rule (soft delete)"""
+    rule = (await db.execute(
+        select(DBWatchRule).where(
+            DBWatchRule.id == rule_id,
+            DBWatchRule.is_active == True
+        )
+    )).scalars().first()
+
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Watch rule not found"
+        )
+
+    rule.is_active = False
+    await db.commit()
+    watch_service.wake()
+
+    return {"message": "Watch rule deleted successfully"}
+
+
+@router.get("/alerts", response_model=List[WatchEvent])
+async def list_alerts(connection_id: Optional[int] = None):
+    """Alerts currently firing (as seen by this replica's poller)"""
+    return watch_service.alerts(connection_id)
+
+
+@router.websocket("/ws")
+async def watch_events(websocket: WebSocket, connection_id: Optional[int] = None):
+    """Currently firing alerts, then every firing/resolved transition"""
+    await websocket.accept()
+    events = watch_service.subscribe(connection_id)
+
+    async def forward():
+        while True:
+            event = await events.get()
+            await websocket.send_text(dumps_text(event))
+
+    # Reading is what notices the client going away between events
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        watch_service.unsubscribe(events)
@@ -1,18 +1,88 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import create_engine, event, inspect, literal, text, Column, Integer, String, Text, DateTime, Boolean, Float, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from datetime import datetime
+from typing import List
 import os
+from app.services.metrics import instrument_engine
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./rabbitmq_ui.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Connection pool tuning (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() == "true"
+# Check/upgrade the schema when the app starts; disable when an init
+# container or job runs `python -m app.database` instead
+DB_SCHEMA_ON_STARTUP = os.getenv("DB_SCHEMA_ON_STARTUP", "true").lower() == "true"
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite/asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+
+def _engine_kwargs(url: str) -> dict:
+    kwargs = {}
+    if "sqlite" in url:
+        kwargs["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            return kwargs
+        if "aiosqlite" in url:
+            # aiosqlite defaults to NullPool; keep connections open instead
+            kwargs["poolclass"] = AsyncAdaptedQueuePool
+    kwargs.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return kwargs
+
+
+def _enable_sqlite_wal(sync_engine):
+    """Use WAL journaling so readers don't block on the writer"""
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_kwargs(ASYNC_DATABASE_URL))
+
+if SQLITE_WAL and "sqlite" in DATABASE_URL:
+    _enable_sqlite_wal(engine)
+    _enable_sqlite_wal(async_engine.sync_engine)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
 
@@ -28,12 +98,157 @@ class RabbitMQConnection(Base):
     password_encrypted = Column(Text, nullable=False)
     virtual_host = Column(String(100), default="/")
     use_ssl = Column(Boolean, default=False)
+    # PEM material for TLS; the client key is encrypted like the password
+    ssl_ca_cert = Column(Text)
+    ssl_client_cert = Column(Text)
+    ssl_client_key_encrypted = Column(Text)
+    ssl_verify = Column(Boolean, default=True)
     description = Column(Text)
+    # JSON list of {"host", "port", "management_port"} besides `host`
+    nodes = Column(Text)
+    balance_management = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    is_active = Column(Boolean, default=True)
+
+
+class ConsumerSession(Base):
+    """A WebSocket consumer and the replica that owns it"""
+    __tablename__ = "consumer_sessions"
+
+    consumer_id = Column(String(64), primary_key=True)
+    replica_id = Column(String(255), index=True, nullable=False)
+    connection_id = Column(Integer, nullable=False)
+    queue = Column(String(255), nullable=False)
+    vhost = Column(String(100), default="/")
+    started_at = Column(DateTime, default=datetime.utcnow)
+    stop_requested = Column(Boolean, default=False)
+
+
+class ConsumerReplica(Base):
+    """Liveness and consumer count of each backend replica"""
+    __tablename__ = "consumer_replicas"
+
+    replica_id = Column(String(255), primary_key=True)
+    consumers = Column(Integer, default=0)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class WatchRule(Base):
+    """An alert condition evaluated against the queues of one connection"""
+    __tablename__ = "watch_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    connection_id = Column(Integer, index=True, nullable=False)
+    name = Column(String(100), nullable=False)
+    vhost = Column(String(100))  # NULL watches every vhost
+    queue_pattern = Column(String(255), default="*")
+    condition = Column(String(32), nullable=False)
+    threshold = Column(Float, default=0)
+    webhook_url = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
 
 
+class AuditEvent(Base):
+    """A publish or destructive consume, written in batches by the audit log"""
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("ix_audit_events_connection_time", "connection_id", "created_at"),
+        Index("ix_audit_events_queue_time", "queue", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True, nullable=False)
+    operation = Column(String(32), nullable=False)
+    connection_id = Column(Integer, nullable=False)
+    client = Column(String(255))
+    vhost = Column(String(100))
+    exchange = Column(String(255))
+    routing_key = Column(String(255))
+    queue = Column(String(255))
+    message_count = Column(Integer, default=1)
+    # JSON list of up to AUDIT_MAX_MESSAGE_IDS message ids
+    message_ids = Column(Text)
+    success = Column(Boolean, default=True)
+    error = Column(Text)
+
+
+def _add_column_ddl(table, column, dialect) -> str:
+    quote = dialect.identifier_preparer.quote
+    ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        # Backfill existing rows with the model default
+        value = literal(default.arg, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+    return ddl
+
+
+def ensure_schema(bind=None) -> List[str]:
+    """Create missing tables and add missing columns; returns the changes made.
+
+    When the schema is current this is only a few catalog reads, so it is
+    cheap enough to run on every start. Columns that are NOT NULL without a
+    default can't be added to populated tables and are reported instead.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    changes = []
+
+    missing_tables = [table for table in Base.metadata.sorted_tables if table.name not in existing]
+    if missing_tables:
+        Base.metadata.create_all(bind=bind, tables=missing_tables)
+        changes += [f"created table {table.name}" for table in missing_tables]
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            added = set()
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable and not (column.default is not None and column.default.is_scalar):
+                    print(f"Schema: cannot add NOT NULL column {table.name}.{column.name} automatically")
+                    continue
+                conn.execute(text(_add_column_ddl(table, column, conn.dialect)))
+                added.add(column.name)
+                changes.append(f"added column {table.name}.{column.name}")
+            for index in table.indexes:
+                if added.intersection(column.name for column in index.columns):
+                    index.create(conn)
+
+    for change in changes:
+        print(f"Schema: {change}")
+    return changes
+
+
+def prime_pool(count: int):
+    """Open `count` pooled connections up front so first requests skip the connect"""
+    connections = [engine.connect() for _ in range(count)]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def prime_async_pool(count: int):
+    """prime_pool for the async engine"""
+    connections = [await async_engine.connect() for _ in range(count)]
+    try:
+        for connection in connections:
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -43,3 +258,18 @@ def get_db():
         raise
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
+if __name__ == "__main__":
+    # Run as a migration step: python -m app.database
+    changes = ensure_schema()
+    print(f"Schema up to date ({len(changes)} change(s) applied)")
@@ -1,31 +1,63 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import asyncio
 from contextlib import asynccontextmanager
 
-from app.database import engine, Base, RabbitMQConnection, get_db
-from app.api import connections, discovery, publisher, consumer
+from app.database import DB_SCHEMA_ON_STARTUP, ensure_schema, get_db
+from app.api import audit, captures, connections, discovery, publisher, consumer, loadtest, replay, watch
+from app.services.admission import AdmissionRejected
+from app.services.audit import audit_log
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.decoders import PayloadDecoder, shutdown_executor
 from app.services.encryption import EncryptionService
 from app.websockets.consumer import RabbitMQConsumerManager
-from app.services.rabbitmq_service import RabbitMQService
+from app.services.connection_registry import connection_registry
+from app.services.channel_pool import channel_pool
+from app.services.loadtest import loadtest_manager
+from app.services.metrics import render_metrics
+from app.services.replay import replay_manager
+from app.services.compression import CompressionMiddleware
+from app.services.serialization import FastJSONResponse
+from app.services.warmup import readiness, warm_up
+from app.services.watch import watch_service
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    Base.metadata.create_all(bind=engine)
+    # Startup: the schema check is a no-op when the schema is current; the
+    # rest of the warm-up runs in the background and gates /ready
+    if DB_SCHEMA_ON_STARTUP:
+        ensure_schema()
     app.state.consumer_manager = RabbitMQConsumerManager()
+    heartbeat = asyncio.create_task(app.state.consumer_manager.run_heartbeat())
+    warmup = asyncio.create_task(warm_up(readiness))
+    watcher = asyncio.create_task(watch_service.run())
+    auditor = asyncio.create_task(audit_log.run())
     yield
     # Shutdown
-    pass
+    warmup.cancel()
+    heartbeat.cancel()
+    watcher.cancel()
+    # Wait for an in-flight heartbeat write before consumers deregister
+    await asyncio.gather(warmup, heartbeat, watcher, return_exceptions=True)
+    await app.state.consumer_manager.shutdown()
+    await loadtest_manager.shutdown()
+    await replay_manager.shutdown()
+    # After the producers stop, so their last events are written
+    audit_log.stop()
+    await asyncio.gather(auditor, return_exceptions=True)
+    await channel_pool.close_all()
+    shutdown_executor()
 
 
 app = FastAPI(
     title="RabbitMQ Web UI API",
     description="REST API for RabbitMQ cluster management and operations",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -38,11 +70,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip for responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
 # Include API routers
 app.include_router(connections.router, prefix="/api/connections", tags=["connections"])
 app.include_router(discovery.router, prefix="/api/discovery", tags=["discovery"])
 app.include_router(publisher.router, prefix="/api/publisher", tags=["publisher"])
 app.include_router(consumer.router, prefix="/api/consumer", tags=["consumer"])
+app.include_router(loadtest.router, prefix="/api/loadtest", tags=["loadtest"])
+app.include_router(watch.router, prefix="/api/watch", tags=["watch"])
+app.include_router(captures.router, prefix="/api/captures", tags=["captures"])
+app.include_router(replay.router, prefix="/api/replay", tags=["replay"])
+app.include_router(audit.router, prefix="/api/audit", tags=["audit"])
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """The cluster's Management API is failing; don't wait on it"""
+    return FastJSONResponse(
+        {"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Too many expensive operations in flight for the cluster or client"""
+    return FastJSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": "1"})
 
 
 @app.get("/")
@@ -57,29 +111,43 @@ async def websocket_endpoint(
     db=Depends(get_db)
 ):
     consumer_manager = app.state.consumer_manager
+    consumer_id = None
     try:
-        # Get RabbitMQ connection from database
-        db_connection = db.query(RabbitMQConnection).filter(RabbitMQConnection.id == connection_id).first()
-        if not db_connection:
+        # Resolve the RabbitMQ service from the connection registry
+        rabbitmq_service = connection_registry.get_service(db, connection_id)
+        if not rabbitmq_service:
             await websocket.close(code=4004, reason="Connection not found")
             return
 
-        # Initialize RabbitMQ service
-        rabbitmq_service = RabbitMQService(db_connection)
+        # Spread consumers across replicas: accept and close with 1013
+        # (Try Again Later); the Consumer page reconnects with backoff and the
+        # load balancer picks another replica
+        if not await consumer_manager.has_capacity():
+            await websocket.accept()
+            await websocket.close(code=1013, reason="Replica at capacity, retry")
+            return
 
         # Accept WebSocket connection
-        await consumer_manager.connect(websocket, connection_id)
+        consumer_id = await consumer_manager.connect(websocket, connection_id)
 
         # Wait for consumer configuration
         while True:
             try:
                 data = await websocket.receive_json()
                 if data.get("action") == "start":
+                    # Schemas are compiled once here, not per message
+                    decoder = PayloadDecoder(data.get("decoder"), data.get("schemas"))
+                    # "capture": true records to a capture named after the consumer
+                    capture = data.get("capture")
+                    if capture is True:
+                        capture = consumer_id
                     # Start consuming messages
                     await consumer_manager.consume(
-                        connection_id,
+                        consumer_id,
                         data["queue"],
-                        rabbitmq_service
+                        rabbitmq_service,
+                        decoder,
+                        capture or None
                     )
             except WebSocketDisconnect:
                 break
@@ -90,7 +158,8 @@ async def websocket_endpoint(
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
-        consumer_manager.disconnect(connection_id)
+        if consumer_id:
+            await consumer_manager.disconnect(consumer_id)
 
 
 @app.get("/health")
@@ -98,10 +167,28 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 503 until pools, registry and client stacks are warm"""
+    return FastJSONResponse(readiness.snapshot(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
+    # Run via `python -m app.main` so the consumer WebSocket gets the tuned
+    # permessage-deflate protocol (uvicorn's CLI can't select a custom one)
+    from app.websockets.compression import TunedWebSocketProtocol
+
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", 8000)),
+        ws=TunedWebSocketProtocol,
         reload=os.getenv("ENVIRONMENT") == "development"
     )
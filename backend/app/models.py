@@ -1,8 +1,21 @@
+import os
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
+# Messages a non-destructive read (browse export, DLQ analysis, profile) may
+# read: all of them stay unacked on the broker until it ends, as one prefetch
+# window, which AMQP caps at 65535
+BROWSE_MAX_MESSAGES = min(int(os.getenv("BROWSE_MAX_MESSAGES", "10000")), 65535)
+
+
+class NodeAddress(BaseModel):
+    host: str = Field(..., description="Node host")
+    port: Optional[int] = Field(None, description="AMQP port (defaults to the connection's)")
+    management_port: Optional[int] = Field(None, description="Management API port (defaults to the connection's)")
+
+
 class RabbitMQConnectionBase(BaseModel):
     name: str = Field(..., description="Connection name")
     host: str = Field(..., description="RabbitMQ host")
@@ -12,7 +25,13 @@ class RabbitMQConnectionBase(BaseModel):
     password: str = Field(..., description="Password")
     virtual_host: str = Field("/", description="Virtual host")
     use_ssl: bool = Field(False, description="Use SSL connection")
+    ssl_ca_cert: Optional[str] = Field(None, description="PEM CA bundle to verify the broker with (system CAs when unset)")
+    ssl_client_cert: Optional[str] = Field(None, description="PEM client certificate")
+    ssl_client_key: Optional[str] = Field(None, description="PEM client private key")
+    ssl_verify: bool = Field(True, description="Verify the broker certificate and host name")
     description: Optional[str] = Field(None, description="Connection description")
+    nodes: List[NodeAddress] = Field([], description="Other cluster nodes to fail over to")
+    balance_management: bool = Field(False, description="Spread Management API calls across healthy nodes")
 
 
 class RabbitMQConnectionCreate(RabbitMQConnectionBase):
@@ -28,7 +47,13 @@ class RabbitMQConnectionUpdate(BaseModel):
     password: Optional[str] = None
     virtual_host: Optional[str] = None
     use_ssl: Optional[bool] = None
+    ssl_ca_cert: Optional[str] = None
+    ssl_client_cert: Optional[str] = None
+    ssl_client_key: Optional[str] = None
+    ssl_verify: Optional[bool] = None
     description: Optional[str] = None
+    nodes: Optional[List[NodeAddress]] = None
+    balance_management: Optional[bool] = None
     is_active: Optional[bool] = None
 
 
@@ -42,12 +67,34 @@ class RabbitMQConnection(RabbitMQConnectionBase):
         from_attributes = True
 
 
+class NodeStatus(BaseModel):
+    host: str
+    port: int
+    management_port: int
+    amqp_up: bool
+    amqp_ms: Optional[float] = Field(None, description="Moving average AMQP connect time")
+    amqp_failures: int
+    management_up: bool
+    management_ms: Optional[float] = Field(None, description="Moving average Management API latency")
+    management_failures: int
+
+
 class ConnectionTestResult(BaseModel):
     success: bool
     message: str
     details: Optional[Dict[str, Any]] = None
 
 
+class ConnectionHealth(ConnectionTestResult):
+    connection_id: int
+    name: str
+    amqp_ok: bool
+    management_ok: bool
+    amqp_ms: Optional[float] = None
+    management_ms: Optional[float] = None
+    checked_at: datetime
+
+
 class QueueInfo(BaseModel):
     name: str
     vhost: str
@@ -95,6 +142,38 @@ class ClusterDiscovery(BaseModel):
     bindings: List[BindingInfo]
 
 
+class NodeStats(BaseModel):
+    name: str
+    running: bool
+    uptime_seconds: Optional[float] = None
+    mem_used: Optional[int] = None
+    mem_limit: Optional[int] = None
+    mem_alarm: bool = False
+    disk_free: Optional[int] = None
+    disk_free_limit: Optional[int] = None
+    disk_free_alarm: bool = False
+    fd_used: Optional[int] = None
+    fd_total: Optional[int] = None
+    sockets_used: Optional[int] = None
+    sockets_total: Optional[int] = None
+    proc_used: Optional[int] = None
+    proc_total: Optional[int] = None
+
+
+class ClusterOverview(BaseModel):
+    cluster_name: Optional[str] = None
+    rabbitmq_version: Optional[str] = None
+    erlang_version: Optional[str] = None
+    object_totals: Dict[str, int] = {}
+    queue_totals: Dict[str, int] = {}
+    message_rates: Dict[str, float] = Field({}, description="Messages/sec between the last two samples")
+    nodes: List[NodeStats] = []
+    alarms: List[str] = []
+    sampled_at: datetime
+    sample_interval_seconds: Optional[float] = Field(None, description="Time between the samples the rates come from")
+    stale: bool = Field(False, description="Last good sample, served while the cluster's circuit is open")
+
+
 class PublishMessage(BaseModel):
     connection_id: int
     vhost: str = "/"
@@ -111,12 +190,202 @@ class PublishResult(BaseModel):
     message_id: Optional[str] = None
 
 
+class RpcRequest(BaseModel):
+    connection_id: int
+    vhost: str = "/"
+    exchange: str = ""
+    routing_key: str
+    message: str
+    properties: Optional[Dict[str, Any]] = None
+    timeout_seconds: float = Field(5, gt=0, le=300, description="How long to wait for each reply")
+    repeat: int = Field(1, ge=1, le=100000, description="Number of requests to send")
+    concurrency: int = Field(1, ge=1, le=1000, description="Requests in flight at once")
+    max_responses: int = Field(10, ge=0, le=1000, description="Replies to include in the result")
+
+
+class RpcResponse(BaseModel):
+    correlation_id: str
+    body: Optional[str] = None
+    properties: Dict[str, Any] = {}
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class RpcResult(BaseModel):
+    sent: int
+    received: int
+    timeouts: int
+    errors: int
+    elapsed_seconds: float
+    latency_ms: Dict[str, float]
+    responses: List[RpcResponse]
+
+
+# Largest generated body: RabbitMQ's default max_message_size (16 MiB since 4.0)
+LOADTEST_MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+class LoadTestConfig(BaseModel):
+    connection_id: int
+    vhost: str = "/"
+    exchange: str = ""
+    routing_key: str = Field(..., description="Routing key for the generated messages")
+    queue: str = Field(..., description="Queue the generated messages are consumed from")
+    rate: float = Field(1000, gt=0, description="Target publish rate (messages/sec)")
+    duration_seconds: float = Field(30, gt=0, le=3600, description="Publishing stops after this long")
+    message_count: Optional[int] = Field(None, gt=0, description="Publishing stops after this many messages")
+    size_distribution: str = Field("fixed", pattern="^(fixed|uniform|normal)$")
+    size_min: int = Field(256, ge=0, le=LOADTEST_MAX_MESSAGE_BYTES,
+                          description="Body size (fixed), lower bound (uniform) or mean (normal)")
+    size_max: int = Field(256, ge=0, le=LOADTEST_MAX_MESSAGE_BYTES,
+                          description="Upper bound (uniform) or standard deviation (normal)")
+    properties: Optional[Dict[str, Any]] = Field(None, description="Properties template; {seq} and {job} are substituted in strings")
+    drain_seconds: float = Field(5, ge=0, le=300, description="How long to wait for in-flight messages after publishing")
+
+
+class LoadTestStatus(BaseModel):
+    id: str
+    state: str
+    config: LoadTestConfig
+    started_at: datetime
+    elapsed_seconds: float
+    published: int
+    publish_errors: int
+    received: int
+    publish_rate: float
+    receive_rate: float
+    latency_ms: Dict[str, float]
+    error: Optional[str] = None
+
+
+class ReplayConfig(BaseModel):
+    connection_id: int
+    vhost: str = "/"
+    capture: Optional[str] = Field(None, description="Capture to replay (uploads use /api/replay/upload instead)")
+    offset: Optional[int] = Field(None, ge=0, description="First capture offset to replay")
+    since: Optional[datetime] = Field(None, description="Skip messages captured before this time")
+    until: Optional[datetime] = Field(None, description="Stop at messages captured after this time")
+    exchange: Optional[str] = Field(None, description="Publish every message to this exchange, e.g. a staging one")
+    routing_key_map: Dict[str, str] = Field({}, description="New routing keys by original key or glob; first match wins")
+    timing: str = Field("original", pattern="^(original|none)$", description="Keep recorded inter-arrival times or publish back to back")
+    speed: float = Field(1.0, gt=0, description="Timing scale: 2 replays twice as fast as recorded")
+    max_rate: Optional[float] = Field(None, gt=0, description="Upper bound on messages per second")
+    message_count: Optional[int] = Field(None, gt=0, description="Stop after this many messages")
+    batch_size: int = Field(100, ge=1, le=10000, description="Messages read ahead and published per confirm batch")
+
+
+class ReplayStatus(BaseModel):
+    id: str
+    state: str
+    source: str
+    config: ReplayConfig
+    started_at: datetime
+    elapsed_seconds: float
+    published: int
+    publish_errors: int
+    skipped: int = Field(0, description="Lines of an uploaded file that could not be parsed")
+    target_rate: Optional[float] = Field(None, description="Rate the schedule asked for so far (messages/sec)")
+    achieved_rate: float
+    lag_ms: float = Field(0, description="How far the last publish was behind its scheduled time")
+    max_lag_ms: float = 0
+    error: Optional[str] = None
+
+
+class AuditEventInfo(BaseModel):
+    id: int
+    created_at: datetime
+    operation: str  # publish | import | rpc | loadtest | replay | consume | export | websocket_consume
+    connection_id: int
+    client: Optional[str] = None
+    vhost: Optional[str] = None
+    exchange: Optional[str] = None
+    routing_key: Optional[str] = None
+    queue: Optional[str] = None
+    message_count: int
+    message_ids: List[str] = Field([], description="Up to AUDIT_MAX_MESSAGE_IDS ids of the messages involved")
+    success: bool
+    error: Optional[str] = None
+
+
+class AuditPage(BaseModel):
+    events: List[AuditEventInfo]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` for the next (older) page")
+
+
+class WatchRuleCreate(BaseModel):
+    connection_id: int
+    name: str = Field(..., description="Rule name shown in alerts")
+    vhost: Optional[str] = Field(None, description="Vhost to watch; every vhost when omitted")
+    queue_pattern: str = Field("*", description="Glob matched against queue names, e.g. '*.dlq'")
+    condition: str = Field(..., pattern="^(depth_above|no_consumers|rate_imbalance|not_running)$")
+    threshold: float = Field(0, ge=0, description="Depth for depth_above; publish minus deliver rate (msg/s) for rate_imbalance")
+    webhook_url: Optional[str] = Field(None, description="POSTed a JSON WatchEvent on every firing/resolved transition")
+
+
+class WatchRule(WatchRuleCreate):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class WatchEvent(BaseModel):
+    state: str  # firing | resolved
+    rule_id: int
+    rule_name: str
+    connection_id: int
+    vhost: str
+    queue: str
+    condition: str
+    threshold: float
+    value: float
+    at: datetime
+
+
 class ConsumeRequest(BaseModel):
     connection_id: int
     queue: str
     vhost: str = "/"
     auto_ack: bool = True
     max_messages: Optional[int] = 10
+    # Codec for every message (json, text, msgpack, protobuf, avro, base64);
+    # by default it follows the x-decoder header or the content type
+    decoder: Optional[str] = None
+    # Per-codec schema, e.g. {"avro": {...record schema...}}
+    schemas: Optional[Dict[str, Any]] = None
+
+
+class DlqAnalyzeRequest(BaseModel):
+    connection_id: int
+    queue: str
+    vhost: str = "/"
+    max_messages: int = Field(1000, ge=1, le=BROWSE_MAX_MESSAGES,
+                              description="Messages to scan; all of them are requeued afterwards")
+    batch_size: int = Field(100, ge=1, le=10000)
+    bucket_seconds: int = Field(3600, ge=1, description="Width of the first-death time buckets")
+    samples: int = Field(5, ge=0, le=100, description="Message ids kept per group")
+    progress: bool = Field(False, description="Stream NDJSON progress updates")
+
+
+class QueueProfileRequest(BaseModel):
+    connection_id: int
+    queue: str
+    vhost: str = "/"
+    max_messages: int = Field(1000, ge=1, le=BROWSE_MAX_MESSAGES,
+                              description="Scan budget; all scanned messages are requeued")
+    batch_size: int = Field(100, ge=1, le=10000)
+    top_k: int = Field(10, ge=1, le=100, description="Entries per top routing key/header value list")
+    sample_size: int = Field(20, ge=0, le=1000, description="Message summaries kept by reservoir sampling")
+
+
+class ConsumerSessionInfo(BaseModel):
+    id: str
+    replica_id: str
+    connection_id: int
+    queue: str
+    vhost: str = "/"
+    started_at: datetime
 
 
 class ConsumedMessage(BaseModel):
@@ -0,0 +1,108 @@
+import ipaddress
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+from app.services.metrics import REJECTED_OPERATIONS
+
+# Expensive operations (discovery, browse, consume, export) running at once
+ADMISSION_CLUSTER_LIMIT = int(os.getenv("ADMISSION_CLUSTER_LIMIT", "8"))   # per saved connection
+ADMISSION_CLIENT_LIMIT = int(os.getenv("ADMISSION_CLIENT_LIMIT", "4"))     # per client and connection
+# Proxies (IPs or CIDRs, comma-separated) whose X-Forwarded-For is believed;
+# anyone else can forge the header, so they are known by their peer address
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+
+class AdmissionRejected(Exception):
+    """Raised when an operation would exceed a concurrency limit"""
+
+    def __init__(self, scope: str, limit: int):
+        self.scope = scope
+        super().__init__(f"Too many concurrent operations for this {scope} (limit {limit}); try again shortly")
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_of(request) -> str:
+    """Client address of a request.
+
+    X-Forwarded-For is only followed through TRUSTED_PROXIES: walking it
+    from the nearest hop, the first address that is not a trusted proxy is
+    the client. Without trusted proxies this is the peer address.
+    """
+    client = getattr(request, "client", None)
+    address = client.host if client else ""
+    headers = getattr(request, "headers", None) or {}
+    forwarded = headers.get("x-forwarded-for")
+    if not forwarded or not _is_trusted_proxy(address):
+        return address
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        address = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return address
+
+
+class AdmissionController:
+    """Caps concurrent expensive operations per cluster and per client.
+
+    Refuses immediately instead of queueing, so a slow cluster can't tie up
+    the worker's threads and a single client can't starve the others.
+    """
+
+    def __init__(self, cluster_limit: int = ADMISSION_CLUSTER_LIMIT, client_limit: int = ADMISSION_CLIENT_LIMIT):
+        self.cluster_limit = cluster_limit
+        self.client_limit = client_limit
+        self._clusters: Dict[int, int] = {}
+        self._clients: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, rabbitmq_service, client: Optional[str]) -> tuple:
+        """Take a slot on the service's cluster; returns a ticket for release()"""
+        connection_id = rabbitmq_service.connection.id
+        cluster = rabbitmq_service.connection.name
+        client_key = (connection_id, client or "")
+        with self._lock:
+            if self._clusters.get(connection_id, 0) >= self.cluster_limit:
+                REJECTED_OPERATIONS.labels(cluster=cluster, reason="cluster_limit").inc()
+                raise AdmissionRejected("cluster", self.cluster_limit)
+            if self._clients.get(client_key, 0) >= self.client_limit:
+                REJECTED_OPERATIONS.labels(cluster=cluster, reason="client_limit").inc()
+                raise AdmissionRejected("client", self.client_limit)
+            self._clusters[connection_id] = self._clusters.get(connection_id, 0) + 1
+            self._clients[client_key] = self._clients.get(client_key, 0) + 1
+        return client_key
+
+    def release(self, ticket: tuple):
+        connection_id = ticket[0]
+        with self._lock:
+            self._clusters[connection_id] -= 1
+            if not self._clusters[connection_id]:
+                del self._clusters[connection_id]
+            self._clients[ticket] -= 1
+            if not self._clients[ticket]:
+                del self._clients[ticket]
+
+    @contextmanager
+    def slot(self, rabbitmq_service, client: Optional[str]):
+        ticket = self.acquire(rabbitmq_service, client)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def in_flight(self, connection_id: int) -> int:
+        return self._clusters.get(connection_id, 0)
+
+
+# Global admission controller instance
+admission = AdmissionController()
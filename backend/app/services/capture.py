@@ -0,0 +1,427 @@
+import base64
+import bisect
+import mmap
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.services.metrics import CAPTURE_FLUSH_SECONDS, CAPTURED_MESSAGES
+from app.services.serialization import dumps, loads
+
+# Directory holding one sub-directory of segments per capture
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "./captures")
+# A segment is closed and a new one started once it reaches this size
+CAPTURE_SEGMENT_BYTES = int(os.getenv("CAPTURE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+# One index entry per this many bytes of segment data
+CAPTURE_INDEX_INTERVAL_BYTES = int(os.getenv("CAPTURE_INDEX_INTERVAL_BYTES", "4096"))
+# Buffered messages are written out once they reach this size (and every second)
+CAPTURE_BUFFER_BYTES = int(os.getenv("CAPTURE_BUFFER_BYTES", str(1024 * 1024)))
+# Oldest closed segments are deleted beyond this total size or age, per capture
+CAPTURE_RETENTION_BYTES = int(os.getenv("CAPTURE_RETENTION_BYTES", str(1024 * 1024 * 1024)))
+CAPTURE_RETENTION_HOURS = float(os.getenv("CAPTURE_RETENTION_HOURS", "168"))
+# fsync every flush (durable across power loss, much slower)
+CAPTURE_FSYNC = os.getenv("CAPTURE_FSYNC", "false").lower() == "true"
+
+# payload length, crc32 of the payload, capture time, metadata length;
+# the payload is the JSON metadata followed by the raw body
+RECORD_HEADER = struct.Struct("<IIdI")
+# offset of a record, its capture time, its position in the segment
+INDEX_ENTRY = struct.Struct("<QdQ")
+
+CAPTURE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+MANIFEST = "capture.json"
+
+
+def _segment_name(base_offset: int, suffix: str) -> str:
+    return f"{base_offset:020d}{suffix}"
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def capture_properties(message) -> Dict[str, Any]:
+    """Properties of an aio-pika message in the export format (pika-style,
+    expiration in milliseconds as AMQP carries it)"""
+    expiration = message.expiration
+    if isinstance(expiration, (int, float)):
+        expiration = str(int(expiration * 1000))
+    elif expiration is not None and not isinstance(expiration, str):
+        expiration = None
+    return {
+        "content_type": message.content_type,
+        "content_encoding": message.content_encoding,
+        "headers": message.headers,
+        "delivery_mode": int(message.delivery_mode) if message.delivery_mode is not None else None,
+        "priority": message.priority,
+        "correlation_id": message.correlation_id,
+        "reply_to": message.reply_to,
+        "expiration": expiration,
+        "message_id": message.message_id,
+        "timestamp": message.timestamp.isoformat() if message.timestamp else None,
+        "type": message.type,
+        "user_id": message.user_id,
+        "app_id": message.app_id
+    }
+
+
+class CaptureWriter:
+    """Appends messages to a segmented log.
+
+    append() only serializes into an in-memory batch; flush() (run it off
+    the event loop) writes the batch through buffered files in one go,
+    starting a new segment whenever the current one is full and adding a
+    sparse index entry every CAPTURE_INDEX_INTERVAL_BYTES. Every writer
+    session starts a fresh segment, so a torn record left by a crash only
+    ever ends a closed segment, where readers stop at its bad checksum.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = CAPTURE_SEGMENT_BYTES,
+                 index_interval: int = CAPTURE_INDEX_INTERVAL_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        os.makedirs(directory, exist_ok=True)
+        with CaptureReader(directory) as reader:
+            self.next_offset = reader.end_offset()
+        self._pending: List[Tuple[int, float, bytes]] = []
+        self.pending_bytes = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._log = None
+        self._index = None
+        self._position = 0
+        self._last_indexed = None
+        enforce_retention(directory)
+
+    def append(self, timestamp: float, meta: Dict[str, Any], body: bytes) -> int:
+        """Queue one message for the next flush; returns its offset"""
+        meta_bytes = dumps(meta)
+        payload_length = len(meta_bytes) + len(body)
+        crc = zlib.crc32(body, zlib.crc32(meta_bytes))
+        record = b"".join((RECORD_HEADER.pack(payload_length, crc, timestamp, len(meta_bytes)), meta_bytes, body))
+        with self._lock:
+            offset = self.next_offset
+            self.next_offset += 1
+            self._pending.append((offset, timestamp, record))
+            self.pending_bytes += len(record)
+        return offset
+
+    def should_flush(self) -> bool:
+        return self.pending_bytes >= CAPTURE_BUFFER_BYTES
+
+    def _roll(self, base_offset: int):
+        self._close_files()
+        self._log = open(os.path.join(self.directory, _segment_name(base_offset, ".log")), "ab",
+                         buffering=CAPTURE_BUFFER_BYTES)
+        self._index = open(os.path.join(self.directory, _segment_name(base_offset, ".idx")), "ab")
+        self._position = 0
+        self._last_indexed = None
+        enforce_retention(self.directory)
+
+    def flush(self):
+        """Write everything appended so far"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self.pending_bytes = 0
+            if not pending:
+                return
+            start = time.perf_counter()
+            for offset, timestamp, record in pending:
+                if self._log is None or (self._position and self._position + len(record) > self.segment_bytes):
+                    self._roll(offset)
+                if self._last_indexed is None or self._position - self._last_indexed >= self.index_interval:
+                    self._index.write(INDEX_ENTRY.pack(offset, timestamp, self._position))
+                    self._last_indexed = self._position
+                self._log.write(record)
+                self._position += len(record)
+            self._log.flush()
+            self._index.flush()
+            if CAPTURE_FSYNC:
+                os.fsync(self._log.fileno())
+                os.fsync(self._index.fileno())
+            CAPTURE_FLUSH_SECONDS.observe(time.perf_counter() - start)
+            CAPTURED_MESSAGES.inc(len(pending))
+
+    def _close_files(self):
+        for file in (self._log, self._index):
+            if file is not None:
+                file.close()
+        self._log = self._index = None
+
+    def close(self):
+        self.flush()
+        with self._flush_lock:
+            self._close_files()
+        enforce_retention(self.directory)
+
+
+def _segments(directory: str) -> List[int]:
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-4]) for name in names if name.endswith(".log") and name[:-4].isdigit())
+
+
+def enforce_retention(directory: str, max_bytes: int = CAPTURE_RETENTION_BYTES,
+                      max_age_seconds: float = CAPTURE_RETENTION_HOURS * 3600):
+    """Delete the oldest segments beyond the size or age limit; the newest
+    (possibly active) segment is always kept"""
+    bases = _segments(directory)
+    stats = []
+    for base in bases:
+        try:
+            stats.append((base, os.stat(os.path.join(directory, _segment_name(base, ".log")))))
+        except FileNotFoundError:
+            continue
+    total = sum(stat.st_size for _, stat in stats)
+    cutoff = time.time() - max_age_seconds
+    for base, stat in stats[:-1]:
+        if total <= max_bytes and stat.st_mtime >= cutoff:
+            break
+        for suffix in (".log", ".idx"):
+            try:
+                os.remove(os.path.join(directory, _segment_name(base, suffix)))
+            except FileNotFoundError:
+                pass
+        total -= stat.st_size
+
+
+class _Segment:
+    """A memory-mapped segment and its index"""
+
+    def __init__(self, directory: str, base_offset: int):
+        self.base_offset = base_offset
+        self.data = self._map(os.path.join(directory, _segment_name(base_offset, ".log")))
+        index = self._map(os.path.join(directory, _segment_name(base_offset, ".idx")))
+        usable = len(index) - len(index) % INDEX_ENTRY.size
+        self.index = list(INDEX_ENTRY.iter_unpack(index[:usable])) if index else []
+        if index:
+            index.close()
+        if not self.index:
+            self.index = [(base_offset, 0.0, 0)]
+
+    @staticmethod
+    def _map(path: str):
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+        except FileNotFoundError:
+            return b""
+
+    def start_for(self, offset: Optional[int] = None, since: Optional[float] = None) -> Tuple[int, int]:
+        """(offset, position) of the last index entry at or before the target"""
+        if offset is not None:
+            i = bisect.bisect_right([entry[0] for entry in self.index], offset) - 1
+        elif since is not None:
+            i = bisect.bisect_right([entry[1] for entry in self.index], since) - 1
+        else:
+            i = 0
+        entry = self.index[max(i, 0)]
+        return entry[0], entry[2]
+
+    def records(self, offset: int, position: int) -> Iterator[Tuple[int, float, int, int, int]]:
+        """(offset, timestamp, meta start, body start, end) of each intact
+        record from `position` on"""
+        data = self.data
+        view = memoryview(data) if data else None
+        while position + RECORD_HEADER.size <= len(data):
+            length, crc, timestamp, meta_length = RECORD_HEADER.unpack_from(data, position)
+            start = position + RECORD_HEADER.size
+            end = start + length
+            if end > len(data) or meta_length > length or zlib.crc32(view[start:end]) != crc:
+                # Torn or partially flushed tail
+                return
+            yield offset, timestamp, start, start + meta_length, end
+            offset += 1
+            position = end
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+class CaptureReader:
+    """Pages through a capture by offset or time using memory-mapped
+    segments, so scanning and searching don't copy message data"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.bases = _segments(directory)
+        self._open: Dict[int, _Segment] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for segment in self._open.values():
+            segment.close()
+        self._open.clear()
+
+    def segment(self, base_offset: int) -> _Segment:
+        segment = self._open.get(base_offset)
+        if segment is None:
+            segment = self._open[base_offset] = _Segment(self.directory, base_offset)
+        return segment
+
+    def end_offset(self) -> int:
+        """Offset the next record would get"""
+        if not self.bases:
+            return 0
+        last = self.segment(self.bases[-1])
+        offset, position = last.index[-1][0], last.index[-1][2]
+        for offset, *_ in last.records(offset, position):
+            offset += 1
+        return offset
+
+    def _first_segment(self, offset: Optional[int], since: Optional[float]) -> int:
+        if offset is not None:
+            return max(bisect.bisect_right(self.bases, offset) - 1, 0)
+        if since is not None:
+            starts = [self.segment(base).index[0][1] for base in self.bases]
+            return max(bisect.bisect_right(starts, since) - 1, 0)
+        return 0
+
+    def scan(self, offset: Optional[int] = None, since: Optional[float] = None,
+             search: Optional[bytes] = None) -> Iterator[Tuple[int, float, Any, memoryview]]:
+        """(offset, timestamp, metadata, body) from the target onwards;
+        `search` keeps only records whose metadata or body contains it"""
+        for base in self.bases[self._first_segment(offset, since):]:
+            segment = self.segment(base)
+            record_offset, position = segment.start_for(offset, since)
+            data = segment.data
+            for record_offset, timestamp, start, body_start, end in segment.records(record_offset, position):
+                if offset is not None and record_offset < offset:
+                    continue
+                if since is not None and timestamp < since:
+                    continue
+                if search and data.find(search, start, end) == -1:
+                    continue
+                yield record_offset, timestamp, loads(data[start:body_start]), memoryview(data)[body_start:end]
+
+    def read(self, offset: Optional[int] = None, since: Optional[float] = None, limit: int = 100,
+             search: Optional[bytes] = None) -> Dict[str, Any]:
+        """A page of messages in the export format plus the offset to continue from"""
+        messages = []
+        next_offset = offset
+        records = self.scan(offset, since, search)
+        try:
+            for record_offset, timestamp, meta, body in records:
+                if len(messages) >= limit:
+                    break
+                messages.append(record_message(record_offset, timestamp, meta, bytes(body)))
+                next_offset = record_offset + 1
+        finally:
+            # Release the views into the mapped segments before they are closed
+            records.close()
+        return {"messages": messages, "next_offset": next_offset}
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [os.path.getsize(os.path.join(self.directory, _segment_name(base, ".log"))) for base in self.bases]
+        records = self.scan()
+        first = next(records, None)
+        records.close()
+        first = first[:2] if first else None
+        last_time = None
+        for base in reversed(self.bases):
+            segment = self.segment(base)
+            for _, last_time, *_ in segment.records(segment.index[-1][0], segment.index[-1][2]):
+                pass
+            if last_time is not None:
+                break
+        return {
+            "segments": len(self.bases),
+            "bytes": sum(sizes),
+            "first_offset": first[0] if first else None,
+            "next_offset": self.end_offset(),
+            "first_time": _iso(first[1]) if first else None,
+            "last_time": _iso(last_time) if last_time is not None else None
+        }
+
+
+def record_message(offset: int, timestamp: float, meta: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """A captured message in the export format (importable as is)"""
+    message = dict(meta, offset=offset, captured_at=_iso(timestamp))
+    try:
+        message["body"] = body.decode("utf-8")
+    except UnicodeDecodeError:
+        message["body"] = base64.b64encode(body).decode("ascii")
+        message["body_encoding"] = "base64"
+    return message
+
+
+class CaptureStore:
+    """Named captures under CAPTURE_DIR; at most one writer per capture"""
+
+    def __init__(self, root: str = CAPTURE_DIR):
+        self.root = root
+        self._writers: Dict[str, CaptureWriter] = {}
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        if not CAPTURE_NAME.match(name):
+            raise ValueError(f"Invalid capture name '{name}'")
+        return os.path.join(self.root, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isdir(self.path(name))
+
+    def open_writer(self, name: str, manifest: Dict[str, Any]) -> CaptureWriter:
+        directory = self.path(name)
+        with self._lock:
+            if name in self._writers:
+                raise ValueError(f"Capture '{name}' is already being written")
+            writer = CaptureWriter(directory)
+            with open(os.path.join(directory, MANIFEST), "wb") as f:
+                f.write(dumps(dict(manifest, name=name, updated_at=datetime.utcnow().isoformat())))
+            self._writers[name] = writer
+            return writer
+
+    def close_writer(self, name: str):
+        with self._lock:
+            writer = self._writers.pop(name, None)
+        if writer is not None:
+            writer.close()
+
+    def is_active(self, name: str) -> bool:
+        return name in self._writers
+
+    def reader(self, name: str) -> CaptureReader:
+        return CaptureReader(self.path(name))
+
+    def info(self, name: str) -> Dict[str, Any]:
+        directory = self.path(name)
+        try:
+            with open(os.path.join(directory, MANIFEST), "rb") as f:
+                manifest = loads(f.read())
+        except (FileNotFoundError, ValueError):
+            manifest = {"name": name}
+        with CaptureReader(directory) as reader:
+            return dict(manifest, active=self.is_active(name), **reader.stats())
+
+    def list(self) -> List[Dict[str, Any]]:
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return []
+        return [self.info(name) for name in names if CAPTURE_NAME.match(name) and self.exists(name)]
+
+    def delete(self, name: str):
+        if self.is_active(name):
+            raise ValueError(f"Capture '{name}' is being written")
+        shutil.rmtree(self.path(name))
+
+
+# Global capture store instance
+capture_store = CaptureStore()
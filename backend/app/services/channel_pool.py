@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.lazy_import import lazy_import
+
+aio_pika = lazy_import("aio_pika")
+
+# Unused pooled connections are closed after this many seconds
+CHANNEL_POOL_IDLE_SECONDS = float(os.getenv("CHANNEL_POOL_IDLE_SECONDS", "300"))
+# Publishes in flight on one confirm channel before waiting for confirms
+CHANNEL_POOL_CONFIRM_WINDOW = int(os.getenv("CHANNEL_POOL_CONFIRM_WINDOW", "1000"))
+
+DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+
+_MESSAGE_FIELDS = {
+    "headers", "content_type", "content_encoding", "delivery_mode", "priority",
+    "correlation_id", "reply_to", "expiration", "message_id", "timestamp",
+    "type", "user_id", "app_id"
+}
+
+
+def build_message(body: bytes, properties: Optional[Dict[str, Any]] = None) -> "aio_pika.Message":
+    """aio_pika.Message from pika-style properties (as exported/consumed)"""
+    kwargs = {}
+    for name, value in (properties or {}).items():
+        if value is None or name not in _MESSAGE_FIELDS:
+            continue
+        if name == "expiration" and isinstance(value, str):
+            # AMQP carries expiration as milliseconds in a string
+            value = int(value) / 1000
+        elif name == "timestamp" and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        kwargs[name] = value
+    return aio_pika.Message(body, **kwargs)
+
+
+class _PoolEntry:
+    def __init__(self, connection, channel):
+        self.connection = connection
+        self.channel = channel
+        self.exchanges: Dict[str, Any] = {}
+        self.last_used = time.monotonic()
+        # Direct reply-to consumer, started on first RPC call
+        self.replies: Dict[str, asyncio.Future] = {}
+        self.reply_consumer: Optional[str] = None
+        self.reply_lock = asyncio.Lock()
+
+    async def on_reply(self, message):
+        future = self.replies.pop(message.correlation_id, None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+
+class ChannelPool:
+    """Long-lived aio-pika connections with a publisher-confirm channel each.
+
+    Entries are keyed by (connection id, connection version, vhost), so an
+    edited connection gets a fresh entry; superseded and idle entries are
+    closed lazily on the next acquire.
+    """
+
+    def __init__(self, idle_seconds: float = CHANNEL_POOL_IDLE_SECONDS,
+                 confirm_window: int = CHANNEL_POOL_CONFIRM_WINDOW):
+        self.idle_seconds = idle_seconds
+        self.confirm_window = confirm_window
+        self._entries: Dict[Tuple, _PoolEntry] = {}
+        self._locks: Dict[Tuple, asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(service, vhost: Optional[str]) -> Tuple:
+        return (service.connection.id, service.connection.updated_at, vhost or service.vhost)
+
+    async def acquire(self, service, vhost: str = None) -> _PoolEntry:
+        """Pooled connection and confirm channel for a service/vhost"""
+        key = self._key(service, vhost)
+        entry = self._entries.get(key)
+        if entry is not None and not entry.channel.is_closed:
+            entry.last_used = time.monotonic()
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.channel.is_closed:
+                await self._evict(key)
+                connection = await service.connect_async(key[2])
+                channel = await connection.channel(publisher_confirms=True)
+                entry = _PoolEntry(connection, channel)
+                self._entries[key] = entry
+            entry.last_used = time.monotonic()
+            return entry
+
+    async def _evict(self, current_key: Tuple):
+        now = time.monotonic()
+        stale = [
+            key for key, entry in self._entries.items()
+            if key == current_key
+            or (key[0] == current_key[0] and key[1] != current_key[1])
+            or now - entry.last_used > self.idle_seconds
+        ]
+        for key in stale:
+            entry = self._entries.pop(key)
+            try:
+                await entry.connection.close()
+            except Exception:
+                pass
+
+    async def get_exchange(self, entry: _PoolEntry, name: str):
+        if name == "":
+            return entry.channel.default_exchange
+        exchange = entry.exchanges.get(name)
+        if exchange is None:
+            exchange = await entry.channel.get_exchange(name, ensure=False)
+            entry.exchanges[name] = exchange
+        return exchange
+
+    async def publish_batch(self, service, messages: List[tuple], vhost: str = None) -> List[Optional[Exception]]:
+        """Publish (exchange, routing_key, body, properties) tuples with
+        up to `confirm_window` confirms outstanding at a time"""
+        from pamqp.commands import Basic
+
+        entry = await self.acquire(service, vhost)
+        results: List[Optional[Exception]] = []
+
+        for offset in range(0, len(messages), self.confirm_window):
+            window = messages[offset:offset + self.confirm_window]
+            publishes = []
+            for exchange_name, routing_key, body, properties in window:
+                exchange = await self.get_exchange(entry, exchange_name)
+                publishes.append(exchange.publish(
+                    build_message(body, properties),
+                    routing_key=routing_key,
+                    mandatory=False
+                ))
+            for outcome in await asyncio.gather(*publishes, return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    results.append(outcome)
+                elif outcome is not None and not isinstance(outcome, Basic.Ack):
+                    results.append(Exception("Message was not confirmed by the broker"))
+                else:
+                    results.append(None)
+
+        entry.last_used = time.monotonic()
+        return results
+
+    async def _ensure_reply_consumer(self, entry: _PoolEntry):
+        if entry.reply_consumer:
+            return
+        async with entry.reply_lock:
+            if not entry.reply_consumer:
+                # Direct reply-to must be consumed (no-ack) on the publishing channel
+                queue = await entry.channel.get_queue(DIRECT_REPLY_TO, ensure=False)
+                entry.reply_consumer = await queue.consume(entry.on_reply, no_ack=True)
+
+    async def rpc_call(self, service, exchange_name: str, routing_key: str, body: bytes,
+                       properties: Optional[Dict[str, Any]] = None, timeout: float = 5.0,
+                       vhost: str = None):
+        """Publish a request with reply_to=amq.rabbitmq.reply-to and wait for
+        the response with the same correlation id; returns the response
+        message (raises asyncio.TimeoutError if none arrives in time, and
+        ValueError if the correlation id is already in flight)"""
+        entry = await self.acquire(service, vhost)
+        await self._ensure_reply_consumer(entry)
+
+        properties = dict(properties or {})
+        correlation_id = properties.get("correlation_id") or uuid.uuid4().hex
+        properties["correlation_id"] = correlation_id
+        properties["reply_to"] = DIRECT_REPLY_TO
+
+        # Replies are matched by correlation id alone, and the pooled channel
+        # is shared by every caller: a second request with an id that is
+        # still awaiting its reply could take the other caller's response
+        if correlation_id in entry.replies:
+            raise ValueError(f"correlation_id {correlation_id!r} is already awaiting a reply")
+        future = asyncio.get_running_loop().create_future()
+        entry.replies[correlation_id] = future
+        try:
+            exchange = await self.get_exchange(entry, exchange_name)
+            await exchange.publish(build_message(body, properties), routing_key=routing_key)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if entry.replies.get(correlation_id) is future:
+                del entry.replies[correlation_id]
+            entry.last_used = time.monotonic()
+
+    async def close_all(self):
+        for entry in list(self._entries.values()):
+            try:
+                await entry.connection.close()
+            except Exception:
+                pass
+        self._entries.clear()
+
+
+# Global channel pool instance
+channel_pool = ChannelPool()
@@ -0,0 +1,126 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict
+from app.services.metrics import CIRCUIT_STATE, REJECTED_OPERATIONS
+
+# Outcomes of the last N Management API calls are considered
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+# No decision is made on fewer calls than this
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+# Share of failed or slow calls in the window that opens the circuit
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+# Calls slower than this count as failures even when they succeed
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "5"))
+# How long an open circuit refuses calls before letting a probe through
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+# Concurrent probe calls allowed while half-open
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "1"))
+
+STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a cluster whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Management API of '{name}' is unavailable (circuit open); retry in {self.retry_after}s")
+
+
+class CircuitBreaker:
+    """Failure-rate and latency based breaker for one cluster.
+
+    Closed: calls go through and their outcomes fill a sliding window; once
+    at least `min_calls` are recorded and the share of failed or slow calls
+    reaches `failure_rate`, the circuit opens. Open: calls fail fast for
+    `open_seconds`. Half-open: up to `half_open_calls` probes go through;
+    a good probe closes the circuit, a bad one re-opens it.
+    """
+
+    def __init__(self, name: str, window: int = CIRCUIT_WINDOW, min_calls: int = CIRCUIT_MIN_CALLS,
+                 failure_rate: float = CIRCUIT_FAILURE_RATE, slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS, half_open_calls: int = CIRCUIT_HALF_OPEN_CALLS):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._gauge = CIRCUIT_STATE.labels(cluster=name)
+        self._rejected = REJECTED_OPERATIONS.labels(cluster=name, reason="circuit_open")
+        self._gauge.set(0)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._gauge.set(STATE_VALUES[state])
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._set_state("open")
+        print(f"Circuit opened for {self.name}")
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == "open":
+                remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self._rejected.inc()
+                    raise CircuitOpenError(self.name, remaining)
+                self._probes = 0
+                self._set_state("half_open")
+
+            if self.state == "half_open":
+                if self._probes >= self.half_open_calls:
+                    self._rejected.inc()
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+
+    def record(self, ok: bool, elapsed: float):
+        """Record the outcome of an admitted call"""
+        bad = not ok or elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self.state == "half_open":
+                self._probes -= 1
+                if bad:
+                    self._open()
+                else:
+                    self._set_state("closed")
+                    print(f"Circuit closed for {self.name}")
+                return
+            if self.state == "open":
+                # A call admitted before the circuit opened
+                return
+
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and \
+                    sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+
+class CircuitBreakerRegistry:
+    """One breaker per saved connection, kept across service rebuilds"""
+
+    def __init__(self):
+        self._breakers: Dict[int, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, connection_id: int, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(connection_id)
+            if breaker is None or breaker.name != name:
+                breaker = self._breakers[connection_id] = CircuitBreaker(name)
+            return breaker
+
+
+# Global circuit breaker registry
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,160 @@
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.services.metrics import COMPRESSION_BYTES
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli 4 compresses JSON better than gzip 6 at similar CPU cost
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "text/"
+)
+
+
+def _brotli():
+    """The brotli module, or None when it isn't installed"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def negotiate_encoding(accept_encoding: str, brotli_available: bool = True) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values"""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding == "br" and not brotli_available:
+            continue
+        if coding in ("br", "gzip") and (q > best_q or (q == best_q and coding == "br")):
+            best, best_q = coding, q
+    return best
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            brotli = _brotli()
+            self._compressor = brotli.Compressor(quality=brotli_quality, mode=brotli.MODE_TEXT)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk; non-final chunks are flushed so streams stay live"""
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + (self._compressor.finish() if final else self._compressor.flush())
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip for HTTP responses.
+
+    Like Starlette's GZipMiddleware, but also offers brotli (when the module
+    is installed) and flushes each chunk of streaming responses. Responses
+    that already carry a Content-Encoding, are not text-like, or are smaller
+    than `minimum_size` pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 gzip_level: int = COMPRESSION_GZIP_LEVEL, brotli_quality: int = COMPRESSION_BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_available = _brotli() is not None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.brotli_available)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressionResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def run(self, scope, receive):
+        await self.middleware.app(scope, receive, self.wrapped_send)
+
+    def _compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def wrapped_send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._compressible(Headers(raw=message["headers"]))
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            compressed = self.encoder.compress(body, final=not more_body)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+            self._count(body, compressed)
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        compressed = self.encoder.compress(body, final=not more_body)
+        self._count(body, compressed)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _count(self, raw: bytes, compressed: bytes):
+        uncompressed_counter, compressed_counter = COMPRESSION_BYTES[self.encoding]
+        uncompressed_counter.inc(len(raw))
+        compressed_counter.inc(len(compressed))
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import RabbitMQConnection
+from app.services.rabbitmq_service import RabbitMQService
+from app.services.metrics import CacheMetrics
+
+
+# How long a cached service is trusted before its version is re-checked
+# against the database. Within this window lookups do no DB round-trips.
+REGISTRY_REVALIDATE_SECONDS = float(os.getenv("CONNECTION_REGISTRY_REVALIDATE_SECONDS", "5"))
+
+
+class _RegistryEntry:
+    __slots__ = ("service", "version", "checked_at")
+
+    def __init__(self, service: RabbitMQService, version, checked_at: float):
+        self.service = service
+        self.version = version
+        self.checked_at = checked_at
+
+
+class ConnectionRegistry:
+    """Process-wide cache of resolved RabbitMQService objects.
+
+    Each entry holds the decrypted credentials in memory only, together with
+    the `updated_at` of the row it was built from. Local writes invalidate
+    entries directly; writes made by other replicas are picked up by the
+    periodic version check, which only reads (updated_at, is_active).
+    """
+
+    def __init__(self, revalidate_seconds: float = REGISTRY_REVALIDATE_SECONDS):
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: Dict[int, _RegistryEntry] = {}
+        self._lock = threading.Lock()
+        self._metrics = CacheMetrics("connection_registry")
+
+    def get_service(self, db: Session, connection_id: int) -> Optional[RabbitMQService]:
+        """Return the cached service for an active connection, or None"""
+        now = time.monotonic()
+        entry = self._entries.get(connection_id)
+
+        if entry is not None and now - entry.checked_at < self.revalidate_seconds:
+            self._metrics.hit.inc()
+            return entry.service
+
+        if entry is not None:
+            row = db.execute(self._version_query(connection_id)).first()
+            if self._is_current(entry, row, now):
+                return entry.service
+
+        db_connection = db.execute(self._row_query(connection_id)).scalars().first()
+        return self._store(db, connection_id, db_connection, now)
+
+    async def get_service_async(self, db: AsyncSession, connection_id: int) -> Optional[RabbitMQService]:
+        """Async variant of get_service for routes using AsyncSession"""
+        now = time.monotonic()
+        entry = self._entries.get(connection_id)
+
+        if entry is not None and now - entry.checked_at < self.revalidate_seconds:
+            self._metrics.hit.inc()
+            return entry.service
+
+        if entry is not None:
+            row = (await db.execute(self._version_query(connection_id))).first()
+            if self._is_current(entry, row, now):
+                return entry.service
+
+        db_connection = (await db.execute(self._row_query(connection_id))).scalars().first()
+        return self._store(db, connection_id, db_connection, now)
+
+    async def preload_async(self, db: AsyncSession) -> int:
+        """Resolve every active connection up front; returns how many"""
+        rows = (await db.execute(
+            select(RabbitMQConnection).where(RabbitMQConnection.is_active == True)
+        )).scalars().all()
+        now = time.monotonic()
+        for db_connection in rows:
+            entry = self._entries.get(db_connection.id)
+            # Keep services resolved meanwhile, and the caches they hold
+            if entry is None or entry.version != db_connection.updated_at:
+                self._store(db, db_connection.id, db_connection, now)
+        return len(rows)
+
+    def invalidate(self, connection_id: int):
+        """Drop the cached service for a connection"""
+        with self._lock:
+            self._entries.pop(connection_id, None)
+
+    def clear(self):
+        """Drop all cached services"""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _version_query(connection_id: int):
+        # Cheap version check: no password column, no decryption
+        return select(
+            RabbitMQConnection.updated_at,
+            RabbitMQConnection.is_active
+        ).where(RabbitMQConnection.id == connection_id)
+
+    @staticmethod
+    def _row_query(connection_id: int):
+        return select(RabbitMQConnection).where(
+            RabbitMQConnection.id == connection_id,
+            RabbitMQConnection.is_active == True
+        )
+
+    def _is_current(self, entry: _RegistryEntry, row, now: float) -> bool:
+        if row is None or not row.is_active or row.updated_at != entry.version:
+            return False
+        entry.checked_at = now
+        self._metrics.hit.inc()
+        return True
+
+    def _store(self, db, connection_id: int, db_connection, now: float) -> Optional[RabbitMQService]:
+        self._metrics.miss.inc()
+        if not db_connection:
+            self.invalidate(connection_id)
+            return None
+
+        # Detach the row so the cached service never triggers lazy loads
+        db.expunge(db_connection)
+        service = RabbitMQService(db_connection)
+
+        with self._lock:
+            self._entries[connection_id] = _RegistryEntry(service, db_connection.updated_at, now)
+
+        return service
+
+
+# Global connection registry instance
+connection_registry = ConnectionRegistry()
@@ -0,0 +1,321 @@
+import asyncio
+import base64
+import io
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+from app.services.lazy_import import lazy_import
+from app.services.metrics import DECODE_ERRORS, DECODE_SECONDS
+from app.services.serialization import dumps_text, loads
+
+# Optional codec libraries, imported when a payload first needs them
+msgpack = lazy_import("msgpack")
+fastavro = lazy_import("fastavro")
+
+# Payloads at least this large are decoded in the executor instead of on the event loop
+DECODE_OFFLOAD_BYTES = int(os.getenv("DECODE_OFFLOAD_BYTES", "65536"))
+# "thread" or "process"; processes sidestep the GIL for CPU-heavy codecs
+DECODE_EXECUTOR = os.getenv("DECODE_EXECUTOR", "thread")
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "2"))
+# Message header naming the codec, overriding the content type
+DECODER_HEADER = os.getenv("DECODER_HEADER", "x-decoder")
+
+# Content types (parameters stripped) and the codec that reads them
+CONTENT_TYPES = {
+    "application/json": "json",
+    "text/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/protobuf": "protobuf",
+    "application/x-protobuf": "protobuf",
+    "application/vnd.google.protobuf": "protobuf",
+    "application/avro": "avro",
+    "application/vnd.apache.avro+binary": "avro",
+    "avro/binary": "avro",
+    "application/octet-stream": "base64",
+}
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("varint too long")
+
+
+def _take(data: bytes, pos: int, size: int) -> Tuple[bytes, int]:
+    if pos + size > len(data):
+        raise ValueError("truncated field")
+    return data[pos:pos + size], pos + size
+
+
+def _length_delimited(chunk: bytes, depth: int) -> Any:
+    # A string, a nested message or raw bytes; the wire format doesn't say which
+    try:
+        text = chunk.decode("utf-8")
+        if text.isprintable():
+            return text
+    except UnicodeDecodeError:
+        pass
+    if chunk and depth < 16:
+        try:
+            return decode_protobuf_wire(chunk, depth + 1)
+        except (ValueError, IndexError):
+            pass
+    return base64.b64encode(chunk).decode("ascii")
+
+
+def decode_protobuf_wire(data: bytes, depth: int = 0) -> Dict[str, Any]:
+    """Schema-less view of a protobuf message: field number -> value(s)"""
+    fields: Dict[str, list] = {}
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if number == 0:
+            raise ValueError("field number 0")
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            chunk, pos = _take(data, pos, 8)
+            value = int.from_bytes(chunk, "little")
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            chunk, pos = _take(data, pos, length)
+            value = _length_delimited(chunk, depth)
+        elif wire_type == 5:
+            chunk, pos = _take(data, pos, 4)
+            value = int.from_bytes(chunk, "little")
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        fields.setdefault(str(number), []).append(value)
+    return {number: values[0] if len(values) == 1 else values for number, values in fields.items()}
+
+
+def _protobuf_decoder(schema: Optional[Mapping[str, Any]]) -> Callable[[bytes], Any]:
+    if not schema:
+        return decode_protobuf_wire
+    # schema: {"descriptor_set": base64 FileDescriptorSet (protoc --descriptor_set_out), "message": "pkg.Type"}
+    from google.protobuf import descriptor_pb2, descriptor_pool, json_format, message_factory
+
+    pool = descriptor_pool.DescriptorPool()
+    files = descriptor_pb2.FileDescriptorSet.FromString(base64.b64decode(schema["descriptor_set"]))
+    for file in files.file:
+        pool.Add(file)
+    descriptor = pool.FindMessageTypeByName(schema["message"])
+    if hasattr(message_factory, "GetMessageClass"):
+        message_class = message_factory.GetMessageClass(descriptor)
+    else:
+        message_class = message_factory.MessageFactory(pool).GetPrototype(descriptor)
+
+    def decode(body: bytes) -> Any:
+        return json_format.MessageToDict(message_class.FromString(body), preserving_proto_field_name=True)
+    return decode
+
+
+def _avro_decoder(schema: Optional[Mapping[str, Any]]) -> Callable[[bytes], Any]:
+    if not schema:
+        raise ValueError("avro payloads need a schema")
+    parsed = fastavro.parse_schema(dict(schema))
+
+    def decode(body: bytes) -> Any:
+        return fastavro.schemaless_reader(io.BytesIO(body), parsed)
+    return decode
+
+
+def _text(body: bytes) -> str:
+    return body.decode("utf-8")
+
+
+def _base64(body: bytes) -> str:
+    return base64.b64encode(body).decode("ascii")
+
+
+def _msgpack(body: bytes) -> Any:
+    return msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+
+@lru_cache(maxsize=256)
+def _compiled(codec: str, schema: Optional[str]) -> Callable[[bytes], Any]:
+    return decoder_registry.factory(codec)(loads(schema) if schema else None)
+
+
+class DecoderRegistry:
+    """Codec name -> factory(schema) returning a decode(bytes) function.
+
+    Factories may compile a schema; compiled decoders are cached by
+    (codec, schema), in each worker process too.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[Optional[Mapping[str, Any]]], Callable[[bytes], Any]]] = {}
+
+    def register(self, name: str, factory: Callable[[Optional[Mapping[str, Any]]], Callable[[bytes], Any]]):
+        self._factories[name] = factory
+        _compiled.cache_clear()
+
+    def names(self):
+        return sorted(self._factories)
+
+    def __contains__(self, name) -> bool:
+        return name in self._factories
+
+    def factory(self, name: str):
+        factory = self._factories.get(name)
+        if factory is None:
+            raise ValueError(f"Unknown decoder '{name}' (available: {', '.join(self.names())})")
+        return factory
+
+
+# Global decoder registry instance
+decoder_registry = DecoderRegistry()
+decoder_registry.register("json", lambda schema: loads)
+decoder_registry.register("text", lambda schema: _text)
+decoder_registry.register("base64", lambda schema: _base64)
+decoder_registry.register("msgpack", lambda schema: _msgpack)
+decoder_registry.register("protobuf", _protobuf_decoder)
+decoder_registry.register("avro", _avro_decoder)
+
+
+def _run(codec: Optional[str], schema: Optional[str], body: bytes) -> Tuple[Any, str, float]:
+    """Decode and time one payload; module-level so process workers can run it.
+
+    Without a codec JSON is tried, then UTF-8 text, then base64.
+    """
+    start = time.perf_counter()
+    if codec is not None:
+        value = _compiled(codec, schema)(body)
+    else:
+        try:
+            value, codec = loads(body), "json"
+        except ValueError:
+            try:
+                value, codec = body.decode("utf-8"), "text"
+            except UnicodeDecodeError:
+                value, codec = _base64(body), "base64"
+    return value, codec, time.perf_counter() - start
+
+
+_executor: Optional[Executor] = None
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if DECODE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(DECODE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(DECODE_WORKERS, thread_name_prefix="decode")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class DecodedPayload(NamedTuple):
+    value: Any
+    codec: str
+    error: Optional[str] = None
+
+
+class PayloadDecoder:
+    """Decoding settings of one subscription or request.
+
+    The codec comes from `codec` when given, else the DECODER_HEADER
+    message header (if it names a registered codec), else the content
+    type. Without any of them JSON is tried, then UTF-8 text. Payloads a
+    codec can't read are shown as text or base64 with the error attached.
+    """
+
+    def __init__(self, codec: Optional[str] = None, schemas: Optional[Dict[str, Any]] = None):
+        if codec is not None:
+            decoder_registry.factory(codec)
+        self.codec = codec
+        # Canonical JSON per codec: hashable cache key and picklable for process workers
+        self.schemas = {name: dumps_text(schema) for name, schema in (schemas or {}).items()}
+        # Compile up front so a bad schema fails the subscription, not every message
+        for name, schema in self.schemas.items():
+            _compiled(name, schema)
+
+    def codec_for(self, content_type: Optional[str], headers: Optional[Mapping[str, Any]]) -> Optional[str]:
+        if self.codec:
+            return self.codec
+        if headers:
+            named = headers.get(DECODER_HEADER)
+            if isinstance(named, bytes):
+                named = named.decode("utf-8", "replace")
+            # Publishers control the header; unknown names fall back to the content type
+            if isinstance(named, str) and named in decoder_registry:
+                return named
+        if content_type:
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            codec = CONTENT_TYPES.get(media_type)
+            if codec:
+                return codec
+            if media_type.endswith("+json"):
+                return "json"
+            if media_type.startswith("text/"):
+                return "text"
+        return None
+
+    def decode(self, body: bytes, content_type: Optional[str] = None,
+               headers: Optional[Mapping[str, Any]] = None) -> DecodedPayload:
+        """Decode on the calling thread"""
+        codec = self.codec_for(content_type, headers)
+        try:
+            value, codec, elapsed = _run(codec, self.schemas.get(codec), body)
+        except Exception as e:
+            return self._failed(codec, body, e)
+        DECODE_SECONDS.labels(codec=codec).observe(elapsed)
+        return DecodedPayload(value, codec)
+
+    async def decode_async(self, body: bytes, content_type: Optional[str] = None,
+                           headers: Optional[Mapping[str, Any]] = None) -> DecodedPayload:
+        """Decode, moving payloads of DECODE_OFFLOAD_BYTES or more off the event loop"""
+        if len(body) < DECODE_OFFLOAD_BYTES:
+            return self.decode(body, content_type, headers)
+        codec = self.codec_for(content_type, headers)
+        try:
+            value, codec, elapsed = await asyncio.get_running_loop().run_in_executor(
+                _get_executor(), _run, codec, self.schemas.get(codec), body
+            )
+        except Exception as e:
+            return self._failed(codec, body, e)
+        DECODE_SECONDS.labels(codec=codec).observe(elapsed)
+        return DecodedPayload(value, codec)
+
+    @staticmethod
+    def _failed(codec: str, body: bytes, error: Exception) -> DecodedPayload:
+        DECODE_ERRORS.labels(codec=codec if codec in decoder_registry else "unknown").inc()
+        try:
+            return DecodedPayload(body.decode("utf-8"), "text", f"{codec}: {str(error)}")
+        except UnicodeDecodeError:
+            return DecodedPayload(_base64(body), "base64", f"{codec}: {str(error)}")
+
+    def text(self, body: bytes, content_type: Optional[str] = None,
+             headers: Optional[Mapping[str, Any]] = None) -> DecodedPayload:
+        """Like decode(), but structured values are rendered as JSON text
+        and JSON/text payloads are returned as sent"""
+        decoded = self.decode(body, content_type, headers)
+        if decoded.codec == "json":
+            return decoded._replace(value=body.decode("utf-8"))
+        if not isinstance(decoded.value, str):
+            return decoded._replace(value=dumps_text(decoded.value))
+        return decoded
+
+
+# Decoder of requests that don't ask for a codec
+default_decoder = PayloadDecoder()
@@ -0,0 +1,185 @@
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.services.rabbitmq_service import MessageBatchReader
+
+# Distinct values kept per dimension (and reason/queue/exchange/routing key
+# groups); further ones are counted under OTHER so memory stays bounded
+DLQ_MAX_GROUPS = int(os.getenv("DLQ_MAX_GROUPS", "1000"))
+
+OTHER = "(other)"
+NOT_DEAD_LETTERED = "(not dead-lettered)"
+DIMENSIONS = ("reason", "queue", "exchange", "routing_key")
+
+
+def _text(value: Any) -> Optional[str]:
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+
+
+def _epoch(value: Any) -> Optional[float]:
+    """x-death times arrive as datetimes from pika, as numbers elsewhere"""
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def first_death(headers: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str, str, str, Optional[float]]]:
+    """(reason, queue, exchange, routing_key, time) of a message's first
+    dead-lettering, None for messages that never were.
+
+    x-death is ordered most recent first, so the first death is its last
+    entry; the x-first-death-* headers (RabbitMQ 3.8+) win when present.
+    """
+    deaths = (headers or {}).get("x-death") or []
+    if not deaths:
+        return None
+    death = deaths[-1]
+    routing_keys = death.get("routing-keys") or []
+    return (
+        _text(headers.get("x-first-death-reason") or death.get("reason")) or "unknown",
+        _text(headers.get("x-first-death-queue") or death.get("queue")) or "",
+        _text(headers.get("x-first-death-exchange", death.get("exchange"))) or "",
+        _text(routing_keys[0]) if routing_keys else "",
+        _epoch(death.get("time"))
+    )
+
+
+class BoundedCounter:
+    """Counts per key for at most `limit` distinct keys; the rest go to OTHER"""
+
+    def __init__(self, limit: int = DLQ_MAX_GROUPS):
+        self.limit = limit
+        self.counts: Dict[Any, int] = {}
+        self.overflowed = False
+
+    def key_for(self, key: Any) -> Any:
+        if key in self.counts or len(self.counts) < self.limit:
+            return key
+        self.overflowed = True
+        return OTHER
+
+    def add(self, key: Any, count: int = 1) -> Any:
+        key = self.key_for(key)
+        self.counts[key] = self.counts.get(key, 0) + count
+        return key
+
+    def top(self) -> Dict[Any, int]:
+        return dict(sorted(self.counts.items(), key=lambda item: -item[1]))
+
+
+class DeadLetterAggregator:
+    """Streaming x-death statistics of a queue.
+
+    Each message updates counters and is then dropped; state is bounded by
+    DLQ_MAX_GROUPS keys per counter and `samples` message ids per group, so
+    it is the same for 1000 messages as for 10 million.
+    """
+
+    def __init__(self, bucket_seconds: int = 3600, samples: int = 5):
+        self.bucket_seconds = bucket_seconds
+        self.samples = samples
+        self.scanned = 0
+        self.dead_lettered = 0
+        self.deaths = 0
+        self.by_dimension = {dimension: BoundedCounter() for dimension in DIMENSIONS}
+        self.by_bucket = BoundedCounter()
+        self.groups = BoundedCounter()
+        self.group_samples: Dict[Any, List[str]] = {}
+        self.group_times: Dict[Any, List[float]] = {}
+
+    def add(self, properties, position: int):
+        self.scanned += 1
+        headers = properties.headers or {}
+        death = first_death(headers)
+        if death is None:
+            self.groups.add((NOT_DEAD_LETTERED, "", "", ""))
+            return
+
+        self.dead_lettered += 1
+        self.deaths += sum(int(entry.get("count") or 1) for entry in headers["x-death"])
+        *fields, died_at = death
+        for dimension, value in zip(DIMENSIONS, fields):
+            self.by_dimension[dimension].add(value)
+        if died_at is not None:
+            self.by_bucket.add(int(died_at // self.bucket_seconds * self.bucket_seconds))
+
+        group = self.groups.add(tuple(fields))
+        samples = self.group_samples.setdefault(group, [])
+        if len(samples) < self.samples:
+            samples.append(_text(properties.message_id) or f"#{position}")
+        if died_at is not None:
+            times = self.group_times.setdefault(group, [died_at, died_at])
+            times[0], times[1] = min(times[0], died_at), max(times[1], died_at)
+
+    @staticmethod
+    def _iso(epoch: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(epoch, timezone.utc).isoformat() if epoch is not None else None
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "scanned": self.scanned,
+            "dead_lettered": self.dead_lettered,
+            "by_reason": self.by_dimension["reason"].top()
+        }
+
+    def result(self) -> Dict[str, Any]:
+        groups = []
+        for key, count in self.groups.top().items():
+            times = self.group_times.get(key, [None, None])
+            groups.append({
+                **(dict(zip(DIMENSIONS, key)) if key != OTHER else {dimension: OTHER for dimension in DIMENSIONS}),
+                "count": count,
+                "first_death_min": self._iso(times[0]),
+                "first_death_max": self._iso(times[1]),
+                "sample_message_ids": self.group_samples.get(key, [])
+            })
+        buckets = sorted((key, count) for key, count in self.by_bucket.counts.items() if key != OTHER)
+        return {
+            "scanned": self.scanned,
+            "dead_lettered": self.dead_lettered,
+            "deaths": self.deaths,
+            "bucket_seconds": self.bucket_seconds,
+            **{f"by_{dimension}": counter.top() for dimension, counter in self.by_dimension.items()},
+            "by_first_death": [{"bucket": self._iso(key), "count": count} for key, count in buckets],
+            "groups": groups,
+            "truncated": self.groups.overflowed or self.by_bucket.overflowed or any(
+                counter.overflowed for counter in self.by_dimension.values()
+            )
+        }
+
+
+async def analyze_dead_letters(reader: MessageBatchReader, max_messages: int, bucket_seconds: int = 3600,
+                               samples: int = 5, progress_interval: float = 1.0) -> AsyncIterator[Dict[str, Any]]:
+    """Scan up to `max_messages` from an open non-destructive reader; yields
+    progress dicts, the last one with `"done": True` and the full breakdown"""
+    aggregator = DeadLetterAggregator(bucket_seconds, samples)
+    started = time.perf_counter()
+    last_report = started
+
+    def snapshot(done: bool, stats: Dict[str, Any]) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return dict(
+            stats,
+            queue=reader.queue_name,
+            done=done,
+            elapsed_seconds=round(elapsed, 3),
+            rate=round(aggregator.scanned / elapsed, 1) if elapsed else 0.0
+        )
+
+    while aggregator.scanned < max_messages:
+        batch = await run_in_threadpool(reader.read_batch, max_messages - aggregator.scanned)
+        if not batch:
+            break
+        for _, header_frame, _ in batch:
+            aggregator.add(header_frame, aggregator.scanned + 1)
+        # Bodies are never kept: only this batch is alive at a time
+        del batch
+        if time.perf_counter() - last_report >= progress_interval:
+            last_report = time.perf_counter()
+            yield snapshot(False, aggregator.progress())
+
+    yield snapshot(True, aggregator.result())
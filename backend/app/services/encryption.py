@@ -1,37 +1,80 @@
-from cryptography.fernet import Fernet
 import os
 import base64
+import threading
+
+# Generated keys are persisted here when ENCRYPTION_KEY is unset, so stored
+# passwords survive restarts (mount it on a volume in production)
+ENCRYPTION_KEY_FILE = os.getenv("ENCRYPTION_KEY_FILE", "./.encryption_key")
 
 
 class EncryptionService:
     def __init__(self):
-        # Get encryption key from environment or generate one
-        key = os.getenv("ENCRYPTION_KEY")
-        if not key:
-            # Generate a new key for development
-            key = Fernet.generate_key().decode()
-            print(f"Generated new encryption key: {key}")
-            print("Set ENCRYPTION_KEY environment variable for production!")
-        
+        # The key is resolved on first use so importing the app stays cheap
+        self._fernet = None
+        self._lock = threading.Lock()
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            with self._lock:
+                if self._fernet is None:
+                    self._fernet = self._load_fernet()
+        return self._fernet
+
+    @staticmethod
+    def _read_or_create_key() -> str:
+        """Key from ENCRYPTION_KEY_FILE, generating and saving one if missing"""
+        from cryptography.fernet import Fernet
+
+        try:
+            with open(ENCRYPTION_KEY_FILE) as f:
+                key = f.read().strip()
+            if key:
+                return key
+        except FileNotFoundError:
+            pass
+
+        key = Fernet.generate_key().decode()
+        try:
+            fd = os.open(ENCRYPTION_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(key)
+            print(f"Generated new encryption key in {ENCRYPTION_KEY_FILE}")
+        except FileExistsError:
+            # Another worker created it first; use theirs
+            with open(ENCRYPTION_KEY_FILE) as f:
+                return f.read().strip()
+        except OSError as e:
+            print(f"Could not persist encryption key to {ENCRYPTION_KEY_FILE}: {str(e)}")
+            print("Stored passwords will be unreadable after a restart")
+        print("Set ENCRYPTION_KEY environment variable for production!")
+        return key
+
+    def _load_fernet(self):
+        from cryptography.fernet import Fernet
+
+        # Get encryption key from environment, or the persisted key file
+        key = os.getenv("ENCRYPTION_KEY") or self._read_or_create_key()
+
         if isinstance(key, str):
             key = key.encode()
 
         # Try to create Fernet with the key, if invalid, derive a proper key
         try:
-            self.fernet = Fernet(key)
+            return Fernet(key)
         except ValueError:
             # Generate a proper Fernet key from the provided key using SHA256
             import hashlib
             derived_key = hashlib.sha256(key).digest()
             fernet_key = base64.urlsafe_b64encode(derived_key)
-            self.fernet = Fernet(fernet_key)
             print(f"Derived Fernet key from provided key")
-    
+            return Fernet(fernet_key)
+
     def encrypt(self, data: str) -> str:
         """Encrypt a string and return base64 encoded result"""
         encrypted = self.fernet.encrypt(data.encode())
         return base64.b64encode(encrypted).decode()
-    
+
     def decrypt(self, encrypted_data: str) -> str:
         """Decrypt base64 encoded encrypted data"""
         try:
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.models import ConnectionHealth
+from app.services.rabbitmq_service import RabbitMQService
+
+# Each probe (AMQP connect, Management API request) must finish within this
+CONNECTION_TEST_TIMEOUT_SECONDS = float(os.getenv("CONNECTION_TEST_TIMEOUT_SECONDS", "5"))
+# Connections probed at once by test-all
+CONNECTION_TEST_CONCURRENCY = int(os.getenv("CONNECTION_TEST_CONCURRENCY", "10"))
+
+
+class HealthChecker:
+    """Probes connections and keeps the latest result of each.
+
+    The AMQP and Management API probes of a connection run in parallel,
+    each under its own timeout, so a test takes as long as the slower
+    probe and never more than the timeout.
+    """
+
+    def __init__(self, timeout: float = CONNECTION_TEST_TIMEOUT_SECONDS,
+                 concurrency: int = CONNECTION_TEST_CONCURRENCY):
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.results: Dict[int, ConnectionHealth] = {}
+
+    async def _probe(self, probe) -> Tuple[Optional[float], object, Optional[str]]:
+        start = time.perf_counter()
+        try:
+            value = await asyncio.wait_for(probe, self.timeout)
+            return round((time.perf_counter() - start) * 1000, 1), value, None
+        except asyncio.TimeoutError:
+            return None, None, f"timed out after {self.timeout:g}s"
+        except Exception as e:
+            return None, None, str(e) or type(e).__name__
+
+    async def check(self, connection_id: int, name: str, rabbitmq_service: RabbitMQService) -> ConnectionHealth:
+        """Probe one connection and remember the result"""
+        (amqp_ms, _, amqp_error), (management_ms, overview, management_error) = await asyncio.gather(
+            self._probe(rabbitmq_service.probe_amqp_async(self.timeout)),
+            self._probe(asyncio.to_thread(rabbitmq_service.probe_management, self.timeout))
+        )
+
+        errors = []
+        if amqp_error:
+            errors.append(f"AMQP: {amqp_error}")
+        if management_error:
+            errors.append(f"Management API: {management_error}")
+        details = None
+        if overview:
+            details = {
+                "rabbitmq_version": overview.get("rabbitmq_version"),
+                "erlang_version": overview.get("erlang_version"),
+                "cluster_name": overview.get("cluster_name")
+            }
+
+        result = ConnectionHealth(
+            connection_id=connection_id,
+            name=name,
+            success=not errors,
+            message="Connection successful" if not errors else f"Connection failed: {'; '.join(errors)}",
+            details=details,
+            amqp_ok=amqp_error is None,
+            management_ok=management_error is None,
+            amqp_ms=amqp_ms,
+            management_ms=management_ms,
+            checked_at=datetime.utcnow()
+        )
+        self.results[connection_id] = result
+        return result
+
+    async def check_all(self, targets: List[Tuple[int, str, RabbitMQService]]) -> AsyncIterator[ConnectionHealth]:
+        """Probe many connections, at most `concurrency` at a time,
+        yielding results in completion order"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(target):
+            async with semaphore:
+                return await self.check(*target)
+
+        for result in asyncio.as_completed([limited(target) for target in targets]):
+            yield await result
+
+    def forget(self, connection_id: int):
+        self.results.pop(connection_id, None)
+
+
+# Global health checker instance
+health_checker = HealthChecker()
@@ -0,0 +1,101 @@
+import math
+from typing import Dict, Iterable, List
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of non-negative integer values.
+
+    Values below 2**precision_bits are counted exactly; above that every
+    power-of-two range is split into 2**(precision_bits - 1) equal buckets,
+    so the relative error stays under 2**-(precision_bits - 1) (~1.6% for
+    the default) at any magnitude while recording is O(1).
+    """
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self.counts: List[int] = []
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.precision_bits
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        """Largest value that lands in the bucket at `index`"""
+        if index < 2 * self._half:
+            return index
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        value = max(0, int(value))
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self.counts = []
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def percentile(self, percentile: float) -> int:
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(percentile / 100 * self.total))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def percentiles(self, percentiles: Iterable[float]) -> Dict[float, int]:
+        """Several percentiles in one pass over the buckets"""
+        wanted = sorted(percentiles)
+        result = {p: self.max for p in wanted}
+        if not self.total:
+            return {p: 0 for p in wanted}
+        targets = [(p, max(1, math.ceil(p / 100 * self.total))) for p in wanted]
+        seen = 0
+        position = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while position < len(targets) and seen >= targets[position][1]:
+                result[targets[position][0]] = min(self._highest_equivalent(index), self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
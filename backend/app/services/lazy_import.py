@@ -0,0 +1,31 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Keeps the AMQP and HTTP client stacks out of the import path of
+    `app.main`; attributes are looked up on the real module each time, so
+    patches applied to it (e.g. in benchmarks) are honoured.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional, Set
+
+from app.models import LOADTEST_MAX_MESSAGE_BYTES, LoadTestConfig, LoadTestStatus
+from app.services.audit import audit_log
+from app.services.histogram import LatencyHistogram
+from app.services.message_import import RateLimiter
+
+# Load tests allowed to run at once on a replica
+LOADTEST_MAX_JOBS = int(os.getenv("LOADTEST_MAX_JOBS", "4"))
+# Finished jobs kept for status queries
+LOADTEST_HISTORY = int(os.getenv("LOADTEST_HISTORY", "20"))
+# Interval between live status frames
+LOADTEST_REPORT_SECONDS = float(os.getenv("LOADTEST_REPORT_SECONDS", "1"))
+
+JOB_HEADER = "x-loadtest-job"
+SENT_AT_HEADER = "x-loadtest-sent-at"
+REPORTED_PERCENTILES = (50, 90, 99, 99.9)
+FINISHED_STATES = ("completed", "stopped", "failed")
+
+
+class LoadTestJob:
+    """Publishes synthetic messages and measures their end-to-end latency.
+
+    Every message carries the job id and its send time (ns since the epoch)
+    in headers; a consumer on `config.queue` records latency in microseconds
+    for messages of this job and ignores everything else.
+    """
+
+    def __init__(self, config: LoadTestConfig, rabbitmq_service, client: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.service = rabbitmq_service
+        self.client = client
+        self.state = "running"
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.published = 0
+        self.publish_errors = 0
+        self.received = 0
+        self.latency = LatencyHistogram()
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.task: Optional[asyncio.Task] = None
+        self._start = time.perf_counter()
+        self._publish_elapsed = 0.0
+        self._stop = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._payload = os.urandom(self._max_size())
+        self._templated = self._has_placeholders(config.properties or {})
+
+    def _max_size(self) -> int:
+        """Largest body the job generates; the shared payload is this long"""
+        config = self.config
+        if config.size_distribution == "normal":
+            return min(config.size_min + 6 * config.size_max, LOADTEST_MAX_MESSAGE_BYTES)
+        return max(config.size_min, config.size_max)
+
+    def _next_size(self) -> int:
+        config = self.config
+        if config.size_distribution == "uniform":
+            return random.randint(min(config.size_min, config.size_max), max(config.size_min, config.size_max))
+        if config.size_distribution == "normal":
+            return min(len(self._payload), max(0, int(random.gauss(config.size_min, config.size_max))))
+        return config.size_min
+
+    @staticmethod
+    def _has_placeholders(value: Any) -> bool:
+        if isinstance(value, str):
+            return "{" in value
+        if isinstance(value, dict):
+            return any(LoadTestJob._has_placeholders(v) for v in value.values())
+        return False
+
+    def _render(self, value: Any, seq: int) -> Any:
+        if isinstance(value, str):
+            return value.replace("{seq}", str(seq)).replace("{job}", self.id)
+        if isinstance(value, dict):
+            return {k: self._render(v, seq) for k, v in value.items()}
+        return value
+
+    def _build_batch(self, size: int) -> List[tuple]:
+        config = self.config
+        template = config.properties or {}
+        batch = []
+        for offset in range(size):
+            seq = self.published + self.publish_errors + offset
+            properties = self._render(template, seq) if self._templated else dict(template)
+            properties["headers"] = dict(
+                properties.get("headers") or {},
+                **{JOB_HEADER: self.id, SENT_AT_HEADER: time.time_ns()}
+            )
+            batch.append((config.exchange, config.routing_key, self._payload[:self._next_size()], properties))
+        return batch
+
+    async def on_message(self, message):
+        headers = message.headers or {}
+        if headers.get(JOB_HEADER) != self.id:
+            return
+        sent_at = headers.get(SENT_AT_HEADER)
+        if isinstance(sent_at, int):
+            self.latency.record((time.time_ns() - sent_at) // 1000)
+        self.received += 1
+        if self.state == "draining" and self.received >= self.published:
+            self._drained.set()
+
+    def stop(self):
+        self._stop.set()
+        self._drained.set()
+
+    async def run(self):
+        # Lazy import: the consumer helper lives with the WebSocket consumer
+        from app.websockets.consumer import open_queue_consumer
+
+        config = self.config
+        connection = None
+        reporter = asyncio.create_task(self._report())
+        try:
+            connection = await open_queue_consumer(
+                self.service, config.queue, self.on_message,
+                prefetch_count=1000, no_ack=True, vhost=config.vhost
+            )
+
+            limiter = RateLimiter(config.rate)
+            # ~10 batches per second keeps pacing smooth without per-message awaits
+            batch_size = max(1, min(1000, int(config.rate / 10)))
+            deadline = self._start + config.duration_seconds
+            while not self._stop.is_set() and time.perf_counter() < deadline:
+                size = batch_size
+                if config.message_count:
+                    size = min(size, config.message_count - self.published - self.publish_errors)
+                    if size <= 0:
+                        break
+                results = await self.service.publish_batch_async(self._build_batch(size), config.vhost)
+                failed = sum(1 for error in results if error is not None)
+                self.published += len(results) - failed
+                self.publish_errors += failed
+                await limiter.wait(self.published + self.publish_errors)
+            self._publish_elapsed = time.perf_counter() - self._start
+
+            if not self._stop.is_set():
+                self.state = "draining"
+                if self.received < self.published:
+                    try:
+                        await asyncio.wait_for(self._drained.wait(), config.drain_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+            self.state = "stopped" if self._stop.is_set() else "completed"
+        except asyncio.CancelledError:
+            self.state = "stopped"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+        finally:
+            if not self._publish_elapsed:
+                self._publish_elapsed = time.perf_counter() - self._start
+            if connection is not None:
+                await connection.close()
+            reporter.cancel()
+            self._broadcast()
+            # One summary event for the whole job; its consumer drains config.queue
+            await audit_log.record(
+                "loadtest", config.connection_id, self.client, vhost=config.vhost,
+                exchange=config.exchange, routing_key=config.routing_key, queue=config.queue,
+                message_count=self.published, success=self.state != "failed", error=self.error
+            )
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(LOADTEST_REPORT_SECONDS)
+            self._broadcast()
+
+    def _broadcast(self):
+        status = self.status()
+        for queue in list(self.subscribers):
+            # Slow viewers only need the latest frame
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        self.subscribers.add(queue)
+        queue.put_nowait(self.status())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def status(self) -> LoadTestStatus:
+        elapsed = time.perf_counter() - self._start
+        publish_elapsed = self._publish_elapsed or elapsed
+        percentiles = self.latency.percentiles(REPORTED_PERCENTILES)
+        latency_ms = {f"p{p:g}": percentiles[p] / 1000 for p in REPORTED_PERCENTILES}
+        latency_ms.update(
+            min=(self.latency.min or 0) / 1000,
+            max=self.latency.max / 1000,
+            mean=round(self.latency.mean / 1000, 3)
+        )
+        return LoadTestStatus(
+            id=self.id,
+            state=self.state,
+            config=self.config,
+            started_at=self.started_at,
+            elapsed_seconds=round(elapsed, 3),
+            published=self.published,
+            publish_errors=self.publish_errors,
+            received=self.received,
+            publish_rate=round(self.published / publish_elapsed, 1) if publish_elapsed else 0.0,
+            receive_rate=round(self.received / elapsed, 1) if elapsed else 0.0,
+            latency_ms=latency_ms,
+            error=self.error
+        )
+
+
+class LoadTestManager:
+    """Runs load-test jobs on this replica and keeps recent results"""
+
+    def __init__(self, max_jobs: int = LOADTEST_MAX_JOBS, history: int = LOADTEST_HISTORY):
+        self.max_jobs = max_jobs
+        self.history = history
+        self.jobs: "OrderedDict[str, LoadTestJob]" = OrderedDict()
+
+    def running(self) -> List[LoadTestJob]:
+        return [job for job in self.jobs.values() if job.state not in FINISHED_STATES]
+
+    def start(self, config: LoadTestConfig, rabbitmq_service, client: Optional[str] = None) -> LoadTestJob:
+        if len(self.running()) >= self.max_jobs:
+            raise RuntimeError(f"At most {self.max_jobs} load tests can run at once")
+
+        job = LoadTestJob(config, rabbitmq_service, client)
+        job.task = asyncio.create_task(job.run())
+        self.jobs[job.id] = job
+
+        finished = [job_id for job_id, j in self.jobs.items() if j.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[LoadTestJob]:
+        return self.jobs.get(job_id)
+
+    def stop(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if not job:
+            return False
+        job.stop()
+        return True
+
+    async def shutdown(self):
+        for job in self.running():
+            job.stop()
+            if job.task:
+                job.task.cancel()
+        await asyncio.gather(*(job.task for job in self.jobs.values() if job.task), return_exceptions=True)
+
+
+# Global load test manager instance
+loadtest_manager = LoadTestManager()
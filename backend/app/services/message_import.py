@@ -0,0 +1,234 @@
+import asyncio
+import base64
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+READ_CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+# Longest NDJSON line accepted by an import; longer lines are skipped
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(16 * 1024 * 1024)))
+# Header values JSON can't carry are exported as one-key objects naming
+# their AMQP field type, and turned back into that type on import
+HEADER_VALUE_TAGS = {
+    "$bytes": lambda value: base64.b64decode(value),
+    "$decimal": Decimal,
+    "$timestamp": datetime.fromisoformat,
+}
+
+
+def encode_header_value(value: Any) -> Any:
+    """A header value (or table) with byte arrays, decimals and timestamps
+    tagged, so the export is plain JSON and round-trips exactly"""
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    if isinstance(value, datetime):
+        return {"$timestamp": value.isoformat()}
+    if isinstance(value, dict):
+        return {key: encode_header_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_header_value(item) for item in value]
+    return value
+
+
+def decode_header_value(value: Any) -> Any:
+    """Inverse of encode_header_value"""
+    if isinstance(value, dict):
+        if len(value) == 1:
+            tag, item = next(iter(value.items()))
+            if tag in HEADER_VALUE_TAGS and isinstance(item, str):
+                return HEADER_VALUE_TAGS[tag](item)
+        return {key: decode_header_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_header_value(item) for item in value]
+    return value
+
+
+async def _upload_chunks(upload, chunk_size: int) -> AsyncIterator[bytes]:
+    """Chunks of an upload, gunzipped on the fly; a decompressed chunk is
+    never larger than `chunk_size`, however well the input compresses"""
+    decompressor = None
+    first = True
+
+    while True:
+        chunk = await upload.read(chunk_size)
+        if first:
+            first = False
+            if chunk.startswith(GZIP_MAGIC):
+                decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        if not chunk:
+            break
+        if decompressor is None:
+            yield chunk
+            continue
+
+        pending = chunk
+        while True:
+            data = decompressor.decompress(pending, chunk_size)
+            pending = decompressor.unconsumed_tail
+            # Concatenated gzip members (e.g. appended exports)
+            if decompressor.eof and decompressor.unused_data:
+                pending = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            if data:
+                yield data
+            elif not pending:
+                break
+
+    if decompressor is not None:
+        rest = decompressor.flush()
+        if rest:
+            yield rest
+
+
+async def iter_upload_lines(upload, chunk_size: int = READ_CHUNK_SIZE,
+                            max_line_bytes: int = IMPORT_MAX_LINE_BYTES) -> AsyncIterator[Optional[bytes]]:
+    """Yield lines from an uploaded NDJSON file, gunzipping on the fly.
+
+    Only one read chunk plus a partial line is held in memory at a time;
+    a line longer than `max_line_bytes` is dropped and yielded as None.
+    """
+    parts = []
+    size = 0
+    oversized = False
+
+    async for chunk in _upload_chunks(upload, chunk_size):
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            if oversized or size + end - start > max_line_bytes:
+                yield None
+            elif parts:
+                parts.append(chunk[start:end])
+                yield b"".join(parts)
+            else:
+                yield chunk[start:end]
+            parts = []
+            size = 0
+            oversized = False
+            start = end + 1
+
+        if start < len(chunk) and not oversized:
+            size += len(chunk) - start
+            if size > max_line_bytes:
+                oversized = True
+                parts = []
+            else:
+                parts.append(chunk[start:])
+
+    if oversized:
+        yield None
+    elif parts:
+        yield b"".join(parts)
+
+
+def parse_message_line(line: Dict[str, Any], exchange: Optional[str] = None,
+                       routing_key: Optional[str] = None) -> Tuple[str, str, bytes, Dict[str, Any]]:
+    """(exchange, routing_key, body, properties) from an exported or consumed
+    message; `exchange`/`routing_key` override the values in the line"""
+    body = line.get("body")
+    if line.get("body_encoding") == "base64":
+        body = base64.b64decode(body or "")
+    elif isinstance(body, (dict, list)):
+        body = json.dumps(body).encode()
+    elif body is None:
+        body = b""
+    else:
+        body = str(body).encode("utf-8")
+
+    delivery_info = line.get("delivery_info") or {}
+    target_exchange = exchange if exchange is not None else line.get("exchange", delivery_info.get("exchange", ""))
+    target_key = routing_key if routing_key is not None else line.get("routing_key", delivery_info.get("routing_key"))
+    if target_key is None:
+        raise ValueError("routing_key missing")
+
+    properties = line.get("properties") or {}
+    if properties.get("headers"):
+        properties = dict(properties, headers=decode_header_value(properties["headers"]))
+    return target_exchange or "", target_key, body, properties
+
+
+class RateLimiter:
+    """Paces a producer to `rate` items per second (no-op when rate is None)"""
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self.start = time.perf_counter()
+
+    async def wait(self, done: int):
+        if not self.rate:
+            return
+        ahead = done / self.rate - (time.perf_counter() - self.start)
+        if ahead > 0:
+            await asyncio.sleep(ahead)
+
+
+async def import_messages(rabbitmq_service, upload, vhost: str = None, exchange: Optional[str] = None,
+                          routing_key: Optional[str] = None, rate: Optional[float] = None,
+                          batch_size: int = 1000, progress_interval: float = 1.0) -> AsyncIterator[Dict[str, Any]]:
+    """Publish every line of an upload; yields progress dicts, the last one
+    with `"done": True`"""
+    summary = {"published": 0, "failed": 0, "skipped": 0, "lines": 0, "errors": []}
+    limiter = RateLimiter(rate)
+    started = time.perf_counter()
+    last_report = started
+    batch = []
+
+    def record_error(line_number: int, error: Exception):
+        if len(summary["errors"]) < 20:
+            summary["errors"].append({"line": line_number, "error": str(error)})
+
+    def snapshot(done: bool) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return dict(
+            summary,
+            done=done,
+            elapsed_seconds=round(elapsed, 3),
+            rate=round(summary["published"] / elapsed, 1) if elapsed else 0.0
+        )
+
+    async def flush():
+        line_numbers = [number for number, _ in batch]
+        results = await rabbitmq_service.publish_batch_async([message for _, message in batch], vhost)
+        for line_number, error in zip(line_numbers, results):
+            if error is None:
+                summary["published"] += 1
+            else:
+                summary["failed"] += 1
+                record_error(line_number, error)
+        batch.clear()
+        await limiter.wait(summary["published"] + summary["failed"])
+
+    async for raw in iter_upload_lines(upload):
+        summary["lines"] += 1
+        if raw is None:
+            summary["skipped"] += 1
+            record_error(summary["lines"], ValueError(f"Line longer than {IMPORT_MAX_LINE_BYTES} bytes"))
+            continue
+        if not raw.strip():
+            continue
+        try:
+            batch.append((summary["lines"], parse_message_line(json.loads(raw), exchange, routing_key)))
+        except Exception as e:
+            summary["skipped"] += 1
+            record_error(summary["lines"], e)
+            continue
+
+        # Keep batches small enough that pacing stays smooth at low rates
+        if len(batch) >= (min(batch_size, max(1, int(rate))) if rate else batch_size):
+            await flush()
+            if time.perf_counter() - last_report >= progress_interval:
+                last_report = time.perf_counter()
+                yield snapshot(done=False)
+
+    if batch:
+        await flush()
+    yield snapshot(done=True)
@@ -0,0 +1,214 @@
+import os
+import time
+from typing import Dict
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+)
+from prometheus_client import multiprocess
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BATCH_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+MANAGEMENT_API_SECONDS = Histogram(
+    "rabbitmq_webui_management_api_seconds",
+    "Latency of RabbitMQ Management API calls",
+    ["cluster", "endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+MANAGEMENT_API_ERRORS = Counter(
+    "rabbitmq_webui_management_api_errors_total",
+    "Failed RabbitMQ Management API calls",
+    ["cluster", "endpoint"]
+)
+AMQP_CONNECT_SECONDS = Histogram(
+    "rabbitmq_webui_amqp_connect_seconds",
+    "Time to open an AMQP connection",
+    ["cluster"],
+    buckets=LATENCY_BUCKETS
+)
+PUBLISH_SECONDS = Histogram(
+    "rabbitmq_webui_publish_seconds",
+    "Latency of publish calls (the _count series gives the publish rate)",
+    ["cluster"],
+    buckets=LATENCY_BUCKETS
+)
+MESSAGES_PER_CALL = Histogram(
+    "rabbitmq_webui_messages_per_call",
+    "Messages returned by a single browse/consume call",
+    ["operation"],
+    buckets=BATCH_BUCKETS
+)
+MESSAGES_TOTAL = Counter(
+    "rabbitmq_webui_messages_total",
+    "Messages handled, by operation",
+    ["operation"]
+)
+ACTIVE_CONSUMERS = Gauge(
+    "rabbitmq_webui_active_consumers",
+    "Active WebSocket consumers",
+    multiprocess_mode="livesum"
+)
+WEBSOCKET_SEND_QUEUE_DEPTH = Gauge(
+    "rabbitmq_webui_websocket_send_queue_depth",
+    "WebSocket frames waiting to be written to clients",
+    multiprocess_mode="livesum"
+)
+CACHE_LOOKUPS = Counter(
+    "rabbitmq_webui_cache_lookups_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "rabbitmq_webui_db_query_seconds",
+    "Latency of database queries",
+    buckets=LATENCY_BUCKETS
+)
+HTTP_COMPRESSION_BYTES = Counter(
+    "rabbitmq_webui_http_compression_bytes_total",
+    "HTTP response bytes before and after compression",
+    ["encoding", "stage"]
+)
+CONDITIONAL_RESPONSES = Counter(
+    "rabbitmq_webui_conditional_responses_total",
+    "Discovery responses by outcome (not_modified: 304 from a matching ETag)",
+    ["result"]
+)
+WATCH_EVALUATIONS = Counter(
+    "rabbitmq_webui_watch_evaluations_total",
+    "Queues evaluated against watch rules (queues unchanged since the last poll are skipped)"
+)
+WATCH_EVENTS = Counter(
+    "rabbitmq_webui_watch_events_total",
+    "Watch rule transitions and webhook delivery failures",
+    ["event"]
+)
+CIRCUIT_STATE = Gauge(
+    "rabbitmq_webui_circuit_state",
+    "Management API circuit breaker state per cluster (0 closed, 1 half-open, 2 open)",
+    ["cluster"],
+    multiprocess_mode="max"
+)
+REJECTED_OPERATIONS = Counter(
+    "rabbitmq_webui_rejected_operations_total",
+    "Operations refused by the circuit breaker or admission control",
+    ["cluster", "reason"]
+)
+NODE_FAILOVERS = Counter(
+    "rabbitmq_webui_node_failovers_total",
+    "Calls retried on another node of a multi-node connection",
+    ["cluster", "protocol"]
+)
+DECODE_SECONDS = Histogram(
+    "rabbitmq_webui_decode_seconds",
+    "Time to decode a message payload, per codec",
+    ["codec"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005) + LATENCY_BUCKETS
+)
+DECODE_ERRORS = Counter(
+    "rabbitmq_webui_decode_errors_total",
+    "Payloads a codec failed to decode (shown as text/base64 instead)",
+    ["codec"]
+)
+CAPTURE_FLUSH_SECONDS = Histogram(
+    "rabbitmq_webui_capture_flush_seconds",
+    "Time to write a batch of captured messages to the segment log",
+    buckets=(0.0001, 0.0005) + LATENCY_BUCKETS
+)
+AUDIT_EVENTS = Counter(
+    "rabbitmq_webui_audit_events_total",
+    "Audit events written, or dropped because the buffer was full or the write failed",
+    ["outcome"]
+)
+AUDIT_BUFFER_DEPTH = Gauge(
+    "rabbitmq_webui_audit_buffer_depth",
+    "Audit events waiting to be written",
+    multiprocess_mode="livesum"
+)
+AUDIT_WRITE_SECONDS = Histogram(
+    "rabbitmq_webui_audit_write_seconds",
+    "Time to insert one batch of audit events",
+    buckets=LATENCY_BUCKETS
+)
+WARMUP_SECONDS = Gauge(
+    "rabbitmq_webui_warmup_seconds",
+    "Time from application startup until the replica reported ready",
+    multiprocess_mode="max"
+)
+
+# Pre-bound children for label sets known up front
+WEBSOCKET_MESSAGES = MESSAGES_TOTAL.labels(operation="websocket")
+PUBLISHED_MESSAGES = MESSAGES_TOTAL.labels(operation="publish")
+CAPTURED_MESSAGES = MESSAGES_TOTAL.labels(operation="capture")
+COMPRESSION_BYTES = {
+    encoding: (
+        HTTP_COMPRESSION_BYTES.labels(encoding=encoding, stage="uncompressed"),
+        HTTP_COMPRESSION_BYTES.labels(encoding=encoding, stage="compressed")
+    )
+    for encoding in ("gzip", "br")
+}
+NOT_MODIFIED_RESPONSES = CONDITIONAL_RESPONSES.labels(result="not_modified")
+FULL_RESPONSES = CONDITIONAL_RESPONSES.labels(result="full")
+
+
+class ClusterMetrics:
+    """Label children bound once per cluster so hot paths don't allocate"""
+
+    def __init__(self, cluster: str):
+        self.cluster = cluster
+        self.amqp_connect = AMQP_CONNECT_SECONDS.labels(cluster=cluster)
+        self.publish = PUBLISH_SECONDS.labels(cluster=cluster)
+        self._management: Dict[str, tuple] = {}
+
+    def management(self, endpoint: str):
+        """(latency histogram, error counter) for a management endpoint"""
+        children = self._management.get(endpoint)
+        if children is None:
+            children = (
+                MANAGEMENT_API_SECONDS.labels(cluster=self.cluster, endpoint=endpoint),
+                MANAGEMENT_API_ERRORS.labels(cluster=self.cluster, endpoint=endpoint)
+            )
+            self._management[endpoint] = children
+        return children
+
+
+class CacheMetrics:
+    """Hit/miss counters for a named cache"""
+
+    def __init__(self, cache: str):
+        self.hit = CACHE_LOOKUPS.labels(cache=cache, result="hit")
+        self.miss = CACHE_LOOKUPS.labels(cache=cache, result="miss")
+
+
+def observe_batch(operation: str, count: int):
+    """Record the number of messages handled by one browse/consume call"""
+    MESSAGES_PER_CALL.labels(operation=operation).observe(count)
+    MESSAGES_TOTAL.labels(operation=operation).inc(count)
+
+
+def instrument_engine(sync_engine):
+    """Record query latency for a SQLAlchemy engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("query_start", None)
+        if start is not None:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    """Serialize all metrics in the Prometheus text format.
+
+    With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so each
+    worker writes to shared files and the scrape aggregates them.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,136 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from app.models import NodeStatus
+
+# Weight of the newest sample in a node's latency moving average
+NODE_LATENCY_ALPHA = float(os.getenv("NODE_LATENCY_ALPHA", "0.3"))
+# How long a node that failed is passed over before it is tried again
+NODE_RETRY_SECONDS = float(os.getenv("NODE_RETRY_SECONDS", "30"))
+
+PROTOCOLS = ("amqp", "management")
+
+
+def connection_addresses(connection) -> List[Tuple[str, int, int]]:
+    """(host, port, management_port) of every node of a saved connection,
+    the primary host first"""
+    addresses = [(connection.host, connection.port, connection.management_port)]
+    for node in json.loads(connection.nodes or "[]"):
+        address = (
+            node["host"],
+            node.get("port") or connection.port,
+            node.get("management_port") or connection.management_port
+        )
+        if address not in addresses:
+            addresses.append(address)
+    return addresses
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class Node:
+    """One node address and its measured health, per protocol"""
+
+    def __init__(self, host: str, port: int, management_port: int):
+        self.host = host
+        self.port = port
+        self.management_port = management_port
+        self.latency: Dict[str, Optional[float]] = {protocol: None for protocol in PROTOCOLS}
+        self.down_until: Dict[str, float] = {protocol: 0.0 for protocol in PROTOCOLS}
+        self.failures: Dict[str, int] = {protocol: 0 for protocol in PROTOCOLS}
+
+    def is_up(self, protocol: str, now: float) -> bool:
+        return self.down_until[protocol] <= now
+
+
+class NodeSelector:
+    """Orders the nodes of a cluster for each call.
+
+    Healthy nodes come first, fastest (by moving-average latency) first;
+    nodes that have never been measured rank ahead so they get measured.
+    A node that fails is skipped for NODE_RETRY_SECONDS but still tried
+    last, so a call only fails once every node has. With `spread`, the
+    first node is drawn among healthy nodes with probability inversely
+    proportional to latency, balancing load instead of always using the
+    fastest.
+    """
+
+    def __init__(self, addresses: List[Tuple[str, int, int]]):
+        self.addresses = addresses
+        self.nodes = [Node(*address) for address in addresses]
+        self._lock = threading.Lock()
+
+    def candidates(self, protocol: str, spread: bool = False) -> List[Node]:
+        if len(self.nodes) == 1:
+            return self.nodes
+        now = time.monotonic()
+        with self._lock:
+            up = sorted(
+                (node for node in self.nodes if node.is_up(protocol, now)),
+                key=lambda node: node.latency[protocol] or 0.0
+            )
+            down = sorted(
+                (node for node in self.nodes if not node.is_up(protocol, now)),
+                key=lambda node: node.down_until[protocol]
+            )
+        if spread and len(up) > 1:
+            weights = [1 / max(node.latency[protocol] or 0.0, 0.001) for node in up]
+            choice = random.choices(up, weights)[0]
+            up.remove(choice)
+            up.insert(0, choice)
+        return up + down
+
+    def record(self, node: Node, protocol: str, ok: bool, elapsed: float):
+        with self._lock:
+            if ok:
+                previous = node.latency[protocol]
+                node.latency[protocol] = elapsed if previous is None else \
+                    previous + NODE_LATENCY_ALPHA * (elapsed - previous)
+                node.down_until[protocol] = 0.0
+                node.failures[protocol] = 0
+            else:
+                node.down_until[protocol] = time.monotonic() + NODE_RETRY_SECONDS
+                node.failures[protocol] += 1
+
+    def state(self) -> List[NodeStatus]:
+        now = time.monotonic()
+        return [
+            NodeStatus(
+                host=node.host,
+                port=node.port,
+                management_port=node.management_port,
+                amqp_up=node.is_up("amqp", now),
+                amqp_ms=_ms(node.latency["amqp"]),
+                amqp_failures=node.failures["amqp"],
+                management_up=node.is_up("management", now),
+                management_ms=_ms(node.latency["management"]),
+                management_failures=node.failures["management"]
+            )
+            for node in self.nodes
+        ]
+
+
+class NodeSelectorRegistry:
+    """One selector per saved connection, kept across service rebuilds while
+    its node list is unchanged so measurements survive edits"""
+
+    def __init__(self):
+        self._selectors: Dict[int, NodeSelector] = {}
+        self._lock = threading.Lock()
+
+    def get(self, connection) -> NodeSelector:
+        addresses = connection_addresses(connection)
+        with self._lock:
+            selector = self._selectors.get(connection.id)
+            if selector is None or selector.addresses != addresses:
+                selector = self._selectors[connection.id] = NodeSelector(addresses)
+            return selector
+
+
+# Global node selector registry
+node_selectors = NodeSelectorRegistry()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models import ClusterOverview, NodeStats
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.metrics import CacheMetrics
+
+# Upstream /api/overview + /api/nodes polls happen at most this often per
+# cluster, however many dashboards are open
+OVERVIEW_REFRESH_SECONDS = float(os.getenv("OVERVIEW_REFRESH_SECONDS", "5"))
+
+# Cumulative counters in overview.message_stats that are turned into rates
+RATE_COUNTERS = (
+    "publish", "confirm", "return_unroutable", "deliver_get", "deliver", "deliver_no_ack",
+    "get", "get_no_ack", "redeliver", "ack"
+)
+
+
+def _node_stats(node: Dict[str, Any]) -> NodeStats:
+    uptime = node.get("uptime")
+    return NodeStats(
+        name=node["name"],
+        running=node.get("running", False),
+        uptime_seconds=uptime / 1000 if uptime is not None else None,
+        mem_used=node.get("mem_used"),
+        mem_limit=node.get("mem_limit"),
+        mem_alarm=node.get("mem_alarm", False),
+        disk_free=node.get("disk_free"),
+        disk_free_limit=node.get("disk_free_limit"),
+        disk_free_alarm=node.get("disk_free_alarm", False),
+        fd_used=node.get("fd_used"),
+        fd_total=node.get("fd_total"),
+        sockets_used=node.get("sockets_used"),
+        sockets_total=node.get("sockets_total"),
+        proc_used=node.get("proc_used"),
+        proc_total=node.get("proc_total")
+    )
+
+
+def _alarms(nodes: List[NodeStats]) -> List[str]:
+    alarms = []
+    for node in nodes:
+        if not node.running:
+            alarms.append(f"{node.name}: not running")
+        if node.mem_alarm:
+            alarms.append(f"{node.name}: memory alarm")
+        if node.disk_free_alarm:
+            alarms.append(f"{node.name}: disk free alarm")
+    return alarms
+
+
+class OverviewCache:
+    """Cluster overview of one connection, sampled at most every
+    OVERVIEW_REFRESH_SECONDS.
+
+    Concurrent requests for a stale overview share one upstream refresh.
+    Message rates are derived from the counters of successive samples; the
+    first sample falls back to the rates the Management API reports.
+    While the cluster's circuit is open the last sample is served as stale.
+    """
+
+    def __init__(self, sample: Callable[[], Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+                 interval: float = OVERVIEW_REFRESH_SECONDS):
+        self.sample = sample
+        self.interval = interval
+        self.snapshot: Optional[ClusterOverview] = None
+        self._sampled_at = 0.0
+        self._counters: Optional[Dict[str, int]] = None
+        self._refresh: Optional[asyncio.Future] = None
+        self._metrics = CacheMetrics("overview")
+
+    async def get(self) -> ClusterOverview:
+        if self.snapshot is not None and time.monotonic() - self._sampled_at < self.interval:
+            self._metrics.hit.inc()
+            return self.snapshot
+
+        if self._refresh is None:
+            self._metrics.miss.inc()
+            self._refresh = asyncio.ensure_future(self._load())
+            self._refresh.add_done_callback(self._refresh_done)
+        else:
+            # Someone else is already refreshing; wait for their result
+            self._metrics.hit.inc()
+        return await asyncio.shield(self._refresh)
+
+    def _refresh_done(self, future: asyncio.Future):
+        self._refresh = None
+        if not future.cancelled():
+            # Retrieve the exception so a failed refresh nobody awaited isn't logged
+            future.exception()
+
+    async def _load(self) -> ClusterOverview:
+        try:
+            overview, nodes = await asyncio.to_thread(self.sample)
+        except CircuitOpenError:
+            if self.snapshot is None:
+                raise
+            return self.snapshot.model_copy(update={"stale": True})
+        now = time.monotonic()
+        self.snapshot = self._build(overview, nodes, now)
+        self._sampled_at = now
+        return self.snapshot
+
+    def _build(self, overview: Dict[str, Any], nodes: List[Dict[str, Any]], now: float) -> ClusterOverview:
+        message_stats = overview.get("message_stats") or {}
+        counters = {name: message_stats[name] for name in RATE_COUNTERS if name in message_stats}
+        elapsed = now - self._sampled_at if self._counters is not None else None
+
+        if elapsed:
+            # Counters restart from zero when a node restarts; never report negative rates
+            rates = {
+                name: round(max(0, value - self._counters.get(name, value)) / elapsed, 2)
+                for name, value in counters.items()
+            }
+        else:
+            rates = {
+                name: message_stats.get(f"{name}_details", {}).get("rate", 0.0)
+                for name in counters
+            }
+        self._counters = counters
+
+        node_stats = [_node_stats(node) for node in nodes]
+        return ClusterOverview(
+            cluster_name=overview.get("cluster_name"),
+            rabbitmq_version=overview.get("rabbitmq_version"),
+            erlang_version=overview.get("erlang_version"),
+            object_totals=overview.get("object_totals") or {},
+            queue_totals={k: v for k, v in (overview.get("queue_totals") or {}).items() if isinstance(v, int)},
+            message_rates=rates,
+            nodes=node_stats,
+            alarms=_alarms(node_stats),
+            sampled_at=datetime.utcnow(),
+            sample_interval_seconds=round(elapsed, 3) if elapsed else None
+        )
@@ -0,0 +1,195 @@
+import os
+import time
+from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.services.histogram import LatencyHistogram
+from app.services.rabbitmq_service import MessageBatchReader
+from app.services.sketches import DistinctCounter, Reservoir, SpaceSaving
+
+# Header names profiled per scan; later ones are only counted
+PROFILE_MAX_HEADERS = int(os.getenv("PROFILE_MAX_HEADERS", "50"))
+# Distinct content types counted exactly; later ones are reported as "(other)"
+PROFILE_MAX_CONTENT_TYPES = int(os.getenv("PROFILE_MAX_CONTENT_TYPES", "100"))
+# Counters per heavy-hitter sketch for each requested top-k entry
+PROFILE_SKETCH_FACTOR = int(os.getenv("PROFILE_SKETCH_FACTOR", "10"))
+
+PERCENTILES = (50, 90, 99)
+# Upper bounds (seconds) of the reported age buckets
+AGE_BUCKETS = (("<1m", 60), ("<10m", 600), ("<1h", 3600), ("<1d", 86400), ("<7d", 604800))
+VALUE_PREVIEW_CHARS = 100
+
+
+def _value_key(value: Any) -> str:
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    text = value if isinstance(value, str) else repr(value)
+    return text[:VALUE_PREVIEW_CHARS]
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    return None
+
+
+class FieldProfile:
+    """Top values and distinct count of one field, in bounded memory"""
+
+    def __init__(self, top_k: int):
+        self.present = 0
+        self.values = SpaceSaving(top_k * PROFILE_SKETCH_FACTOR)
+        self.distinct = DistinctCounter()
+
+    def add(self, value: Any):
+        key = _value_key(value)
+        self.present += 1
+        self.values.add(key)
+        self.distinct.add(key)
+
+    def summary(self, top_k: int) -> Dict[str, Any]:
+        return {"present": self.present, "distinct": self.distinct.estimate(), "top": self.values.top(top_k)}
+
+
+class QueueProfiler:
+    """Compact statistics of queue contents.
+
+    Sizes and ages go to log-linear histograms, routing keys and header
+    values to heavy-hitter sketches with distinct-count estimates, and a
+    reservoir keeps a uniform sample of message summaries. Content types
+    have few distinct values, so their mix is counted exactly.
+    Bodies are only measured, so memory is independent of the scan length.
+    """
+
+    def __init__(self, top_k: int = 10, sample_size: int = 20, now: Optional[float] = None):
+        self.top_k = top_k
+        self.now = now if now is not None else time.time()
+        self.scanned = 0
+        self.redelivered = 0
+        self.queue_depth: Optional[int] = None
+        self.sizes = LatencyHistogram()
+        self.size_buckets: Dict[int, int] = {}
+        self.ages = LatencyHistogram()
+        self.age_buckets = {label: 0 for label, _ in AGE_BUCKETS}
+        self.age_buckets[">=7d"] = 0
+        self.without_timestamp = 0
+        self.routing_keys = FieldProfile(top_k)
+        self.content_types: Dict[str, int] = {}
+        self.headers: Dict[str, FieldProfile] = {}
+        self.untracked_headers = 0
+        self.sample = Reservoir(sample_size)
+
+    def add(self, method_frame, properties, body: bytes):
+        self.scanned += 1
+        if self.queue_depth is None and getattr(method_frame, "message_count", None) is not None:
+            # Messages still queued behind the first one read
+            self.queue_depth = method_frame.message_count + 1
+        self.redelivered += bool(method_frame.redelivered)
+
+        size = len(body or b"")
+        self.sizes.record(size)
+        # Smallest power of two >= size
+        bucket = 1 << max(0, size - 1).bit_length()
+        self.size_buckets[bucket] = self.size_buckets.get(bucket, 0) + 1
+
+        age = None
+        sent_at = _epoch(properties.timestamp)
+        if sent_at is None:
+            self.without_timestamp += 1
+        else:
+            age = max(0.0, self.now - sent_at)
+            self.ages.record(int(age))
+            label = next((label for label, limit in AGE_BUCKETS if age < limit), ">=7d")
+            self.age_buckets[label] += 1
+
+        self.routing_keys.add(method_frame.routing_key)
+        content_type = _value_key(properties.content_type or "(none)")
+        if content_type not in self.content_types and len(self.content_types) >= PROFILE_MAX_CONTENT_TYPES:
+            content_type = "(other)"
+        self.content_types[content_type] = self.content_types.get(content_type, 0) + 1
+        for name, value in (properties.headers or {}).items():
+            profile = self.headers.get(name)
+            if profile is None:
+                if len(self.headers) >= PROFILE_MAX_HEADERS:
+                    self.untracked_headers += 1
+                    continue
+                profile = self.headers[name] = FieldProfile(self.top_k)
+            profile.add(value)
+
+        self.sample.add({
+            "message_id": properties.message_id,
+            "routing_key": method_frame.routing_key,
+            "content_type": properties.content_type,
+            "size": size,
+            "age_seconds": round(age, 3) if age is not None else None
+        })
+
+    @staticmethod
+    def _distribution(histogram: LatencyHistogram) -> Dict[str, Any]:
+        if not histogram.total:
+            return {"count": 0}
+        return {
+            "count": histogram.total,
+            "min": histogram.min,
+            "max": histogram.max,
+            "mean": round(histogram.sum / histogram.total, 1),
+            **{f"p{p}": value for p, value in histogram.percentiles(PERCENTILES).items()}
+        }
+
+    def result(self) -> Dict[str, Any]:
+        """Statistics of the scanned messages.
+
+        Only the head of the queue is read. The `*_projected_from_head`
+        values scale the head's counts to the full depth, assuming the rest
+        of the queue looks like its oldest messages. Treat them as rough
+        when `coverage` is low.
+        """
+        depth = max(self.queue_depth or 0, self.scanned)
+        scale = depth / self.scanned if self.scanned else 0.0
+        sizes = self._distribution(self.sizes)
+        return {
+            "scanned": self.scanned,
+            "queue_depth": depth,
+            "coverage": round(self.scanned / depth, 4) if depth else 1.0,
+            "redelivered": self.redelivered,
+            "sizes": dict(
+                sizes,
+                histogram=[{"le": bound, "count": count} for bound, count in sorted(self.size_buckets.items())],
+                queue_bytes_projected_from_head=int(self.sizes.sum * scale)
+            ),
+            "ages": dict(
+                self._distribution(self.ages),
+                unit="seconds",
+                without_timestamp=self.without_timestamp,
+                buckets=self.age_buckets
+            ),
+            "content_types": [
+                {"value": value, "count": count, "projected_from_head": int(count * scale)}
+                for value, count in sorted(self.content_types.items(), key=lambda item: -item[1])
+            ],
+            "routing_keys": self.routing_keys.summary(self.top_k),
+            "headers": {
+                name: profile.summary(self.top_k)
+                for name, profile in sorted(self.headers.items(), key=lambda item: -item[1].present)
+            },
+            "untracked_header_values": self.untracked_headers,
+            "sample": self.sample.items
+        }
+
+
+async def profile_queue(reader: MessageBatchReader, max_messages: int, top_k: int = 10,
+                        sample_size: int = 20) -> Dict[str, Any]:
+    """Profile up to `max_messages` from an open non-destructive reader"""
+    profiler = QueueProfiler(top_k, sample_size)
+    started = time.perf_counter()
+    while profiler.scanned < max_messages:
+        batch = await run_in_threadpool(reader.read_batch, max_messages - profiler.scanned)
+        if not batch:
+            break
+        for delivery in batch:
+            profiler.add(*delivery)
+    result = profiler.result()
+    result["queue"] = reader.queue_name
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return result
@@ -1,15 +1,193 @@
-import pika
-import requests
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
-from requests.auth import HTTPBasicAuth
+import os
+import time
+import base64
+import threading
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 from datetime import datetime
 from app.models import (
-    QueueInfo, ExchangeInfo, VHostInfo, UserInfo, BindingInfo, 
+    BROWSE_MAX_MESSAGES, QueueInfo, ExchangeInfo, VHostInfo, UserInfo, BindingInfo, 
     ClusterDiscovery, ConnectionTestResult
 )
 from app.database import RabbitMQConnection
+from app.services.circuit_breaker import CircuitOpenError, circuit_breakers
+from app.services.decoders import PayloadDecoder, default_decoder
 from app.services.encryption import encryption_service
+from app.services.lazy_import import lazy_import
+from app.services.message_import import encode_header_value
+from app.services.metrics import ClusterMetrics, NODE_FAILOVERS, PUBLISHED_MESSAGES, observe_batch
+from app.services.node_selector import Node, node_selectors
+from app.services.overview import OverviewCache
+from app.services.tls import management_session, tls_contexts
+from app.services.topology_cache import TopologyCache
+
+# Client stacks are imported on first use to keep startup fast
+pika = lazy_import("pika")
+aio_pika = lazy_import("aio_pika")
+requests = lazy_import("requests")
+
+# Default timeout of Management API calls that don't pass their own
+MANAGEMENT_API_TIMEOUT_SECONDS = float(os.getenv("MANAGEMENT_API_TIMEOUT_SECONDS", "10"))
+
+# Only what queue alerting needs, so large clusters stay cheap to poll
+QUEUE_STATS_COLUMNS = (
+    "name,vhost,messages,consumers,state,"
+    "message_stats.publish_details.rate,message_stats.deliver_get_details.rate"
+)
+
+
+class QueueStats(NamedTuple):
+    vhost: str
+    name: str
+    messages: int
+    consumers: int
+    state: str
+    publish_rate: float
+    deliver_rate: float
+
+
+def message_properties(header_frame: "pika.BasicProperties") -> Dict[str, Any]:
+    """AMQP basic properties of a message as a plain dict"""
+    return {
+        "content_type": header_frame.content_type,
+        "content_encoding": header_frame.content_encoding,
+        "delivery_mode": header_frame.delivery_mode,
+        "priority": header_frame.priority,
+        "correlation_id": header_frame.correlation_id,
+        "reply_to": header_frame.reply_to,
+        "expiration": header_frame.expiration,
+        "message_id": header_frame.message_id,
+        "timestamp": header_frame.timestamp,
+        "type": header_frame.type,
+        "user_id": header_frame.user_id,
+        "app_id": header_frame.app_id,
+        "headers": header_frame.headers
+    }
+
+
+def decoded_message(decoder: PayloadDecoder, header_frame: "pika.BasicProperties", body: bytes) -> Dict[str, Any]:
+    """Body of a fetched message as display text, with the codec that read it"""
+    if not body:
+        return {"body": None}
+    decoded = decoder.text(body, header_frame.content_type, header_frame.headers)
+    message = {"body": decoded.value, "body_decoder": decoded.codec}
+    if decoded.error:
+        message["body_decode_error"] = decoded.error
+    return message
+
+
+def export_message(method_frame, header_frame: "pika.BasicProperties", body: bytes, queue_name: str) -> Dict[str, Any]:
+    """Lossless representation of a message: full properties with non-JSON
+    header values tagged by type, base64 body"""
+    properties = message_properties(header_frame)
+    if properties["headers"]:
+        properties["headers"] = encode_header_value(properties["headers"])
+    return {
+        "queue": queue_name,
+        "exchange": method_frame.exchange,
+        "routing_key": method_frame.routing_key,
+        "redelivered": method_frame.redelivered,
+        "properties": properties,
+        "body": base64.b64encode(body or b"").decode("ascii"),
+        "body_encoding": "base64"
+    }
+
+
+class MessageBatchReader:
+    """Reads a queue in batches over a single channel.
+
+    Both modes consume with a prefetch window rather than one basic_get
+    round-trip per message. Destructive readers use a window of
+    `batch_size` and ack each batch only when `commit()` is called, i.e.
+    after the caller has handed it on. Non-destructive readers can't ack,
+    so every message they read stays unacked on the broker until `close()`
+    requeues them all with one multiple-nack; their window is the whole
+    read, `limit` messages (at most BROWSE_MAX_MESSAGES), and the broker
+    may push that many to the client up front. The same message is never
+    read twice and the reader holds no per-message state.
+    """
+
+    def __init__(self, service: "RabbitMQService", queue_name: str, destructive: bool,
+                 batch_size: int = 100, vhost: str = None, inactivity_timeout: float = 1.0,
+                 limit: Optional[int] = None):
+        self.service = service
+        self.queue_name = queue_name
+        self.destructive = destructive
+        self.batch_size = batch_size
+        self.vhost = vhost
+        self.inactivity_timeout = inactivity_timeout
+        self.limit = None if destructive else min(limit or BROWSE_MAX_MESSAGES, BROWSE_MAX_MESSAGES)
+        self.read = 0
+        self.connection = None
+        self.channel = None
+        self._deliveries = None
+        self._last_tag = 0
+        # Closing from a cleanup task must not interleave with a read in a
+        # worker thread; pika channels are not thread-safe
+        self._lock = threading.Lock()
+
+    def open(self):
+        self.connection = self.service._open_blocking_connection(self.vhost)
+        self.channel = self.connection.channel()
+        self.channel.basic_qos(prefetch_count=self.batch_size if self.destructive else self.limit)
+        self._deliveries = self.channel.consume(
+            self.queue_name,
+            auto_ack=False,
+            inactivity_timeout=self.inactivity_timeout
+        )
+
+    def read_batch(self, size: Optional[int] = None) -> List[tuple]:
+        """Next (method, properties, body) triples; empty when the queue is
+        drained or a non-destructive reader has read `limit` messages"""
+        size = min(size or self.batch_size, self.batch_size)
+        if self.limit is not None:
+            size = min(size, self.limit - self.read)
+        batch = []
+        with self._lock:
+            if self._deliveries is None:
+                return batch
+            while len(batch) < size:
+                method_frame, header_frame, body = next(self._deliveries)
+                if method_frame is None:
+                    break
+                self._last_tag = method_frame.delivery_tag
+                batch.append((method_frame, header_frame, body))
+        self.read += len(batch)
+        return batch
+
+    def commit(self):
+        """Settle everything read so far (ack when destructive)"""
+        with self._lock:
+            if self.destructive and self._last_tag and self.channel and self.channel.is_open:
+                self.channel.basic_ack(delivery_tag=self._last_tag, multiple=True)
+
+    def close(self):
+        """Requeue what a non-destructive reader holds and disconnect; safe
+        to call more than once"""
+        with self._lock:
+            try:
+                if self.channel and self.channel.is_open and self._deliveries is not None:
+                    if not self.destructive and self._last_tag:
+                        self.channel.basic_nack(delivery_tag=self._last_tag, multiple=True, requeue=True)
+                    # Rejects deliveries still buffered in the client
+                    self.channel.cancel()
+            finally:
+                self._deliveries = None
+                if self.connection and self.connection.is_open:
+                    self.connection.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of a failed requests call, None when no response came back"""
+    return getattr(getattr(error, "response", None), "status_code", None)
 
 
 class RabbitMQService:
@@ -23,33 +201,135 @@ class RabbitMQService:
         self.vhost = connection.virtual_host
         self.use_ssl = connection.use_ssl
         
-        # Management API base URL
-        protocol = "https" if self.use_ssl else "http"
-        self.management_url = f"{protocol}://{self.host}:{self.management_port}/api"
-        self.auth = HTTPBasicAuth(self.username, self.password)
+        # Management API base URL (of the primary node)
+        self.management_scheme = "https" if self.use_ssl else "http"
+        self.management_url = f"{self.management_scheme}://{self.host}:{self.management_port}/api"
+        # requests treats a (user, password) tuple as HTTP basic auth
+        self.auth = (self.username, self.password)
+        # Cached per connection so TLS sessions are resumed across connects
+        self.amqp_tls = tls_contexts.get(connection, "amqp") if self.use_ssl else None
+        self._http = management_session(tls_contexts.get(connection, "management")) if self.use_ssl else requests
+        self.verify_tls = connection.ssl_verify is not False
+        self.metrics = ClusterMetrics(connection.name)
+        # All node addresses of the cluster, ordered by measured health per call
+        self.nodes = node_selectors.get(connection)
+        self.balance_management = bool(connection.balance_management)
+        self._failovers = {
+            protocol: NODE_FAILOVERS.labels(cluster=connection.name, protocol=protocol)
+            for protocol in ("amqp", "management")
+        }
+        self.breaker = circuit_breakers.get(connection.id, connection.name)
+        self.topology = TopologyCache(self.discover_cluster)
+        self.overview = OverviewCache(self.get_overview_sample)
+    
+    def _management_get(self, endpoint: str, timeout: Optional[float] = None,
+                        params: Optional[Dict[str, str]] = None) -> "requests.Response":
+        """GET a Management API endpoint through the cluster's circuit breaker,
+        recording latency and errors"""
+        self.breaker.before_call()
+        latency, errors = self.metrics.management(endpoint)
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self._management_request(endpoint, timeout or MANAGEMENT_API_TIMEOUT_SECONDS, params)
+            ok = True
+            return response
+        except Exception as e:
+            errors.inc()
+            # A 4xx is the caller's problem, not a sign the cluster is struggling
+            status = _status_code(e)
+            ok = status is not None and status < 500
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            latency.observe(elapsed)
+            self.breaker.record(ok, elapsed)
+    
+    def _management_request(self, endpoint: str, timeout: float,
+                            params: Optional[Dict[str, str]]) -> "requests.Response":
+        """GET from the best node, failing over to the next on connection
+        errors, timeouts and 5xx answers"""
+        candidates = self.nodes.candidates("management", spread=self.balance_management)
+        for attempt, node in enumerate(candidates):
+            if attempt:
+                self._failovers["management"].inc()
+            start = time.perf_counter()
+            try:
+                response = self._http.get(
+                    f"{self.management_scheme}://{node.host}:{node.management_port}/api/{endpoint}",
+                    auth=self.auth, timeout=timeout, params=params, verify=self.verify_tls
+                )
+                response.raise_for_status()
+            except Exception as e:
+                status = _status_code(e)
+                node_ok = status is not None and status < 500
+                self.nodes.record(node, "management", node_ok, time.perf_counter() - start)
+                if node_ok or attempt == len(candidates) - 1:
+                    raise
+                continue
+            self.nodes.record(node, "management", True, time.perf_counter() - start)
+            return response
+    
+    def _open_blocking_connection(self, vhost: str = None) -> "pika.BlockingConnection":
+        """Open a blocking AMQP connection to the best reachable node,
+        recording connect time"""
+        candidates = self.nodes.candidates("amqp")
+        for attempt, node in enumerate(candidates):
+            if attempt:
+                self._failovers["amqp"].inc()
+            params = self.get_connection_params(node)
+            if vhost:
+                params.virtual_host = vhost
+            start = time.perf_counter()
+            try:
+                connection = pika.BlockingConnection(params)
+            except Exception:
+                self.nodes.record(node, "amqp", False, time.perf_counter() - start)
+                if attempt == len(candidates) - 1:
+                    raise
+                continue
+            elapsed = time.perf_counter() - start
+            self.nodes.record(node, "amqp", True, elapsed)
+            self.metrics.amqp_connect.observe(elapsed)
+            return connection
+    
+    async def connect_async(self, vhost: str = None, robust: bool = True, timeout: Optional[float] = None):
+        """Open an aio-pika connection to the best reachable node, recording
+        connect time. Robust connections reconnect to the node they were
+        opened on; callers that lose one for good simply open another."""
+        connect = aio_pika.connect_robust if robust else aio_pika.connect
+        candidates = self.nodes.candidates("amqp")
+        for attempt, node in enumerate(candidates):
+            if attempt:
+                self._failovers["amqp"].inc()
+            kwargs = self.aio_connection_kwargs(vhost, node)
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            start = time.perf_counter()
+            try:
+                if timeout is not None:
+                    connection = await asyncio.wait_for(connect(**kwargs), timeout)
+                else:
+                    connection = await connect(**kwargs)
+            except Exception:
+                self.nodes.record(node, "amqp", False, time.perf_counter() - start)
+                if attempt == len(candidates) - 1:
+                    raise
+                continue
+            elapsed = time.perf_counter() - start
+            self.nodes.record(node, "amqp", True, elapsed)
+            self.metrics.amqp_connect.observe(elapsed)
+            return connection
     
     def test_connection(self) -> ConnectionTestResult:
         """Test both AMQP and Management API connections"""
         try:
             # Test AMQP connection
-            credentials = pika.PlainCredentials(self.username, self.password)
-            connection_params = pika.ConnectionParameters(
-                host=self.host,
-                port=self.port,
-                virtual_host=self.vhost,
-                credentials=credentials
-            )
-            
-            connection = pika.BlockingConnection(connection_params)
+            connection = self._open_blocking_connection()
             connection.close()
             
             # Test Management API
-            response = requests.get(
-                f"{self.management_url}/overview",
-                auth=self.auth,
-                timeout=10
-            )
-            response.raise_for_status()
+            response = self._management_get("overview", timeout=10)
             
             overview = response.json()
             return ConnectionTestResult(
@@ -68,6 +348,18 @@ class RabbitMQService:
                 message=f"Connection failed: {str(e)}"
             )
     
+    async def probe_amqp_async(self, timeout: float) -> float:
+        """Open and close an AMQP connection; returns the connect time"""
+        start = time.perf_counter()
+        connection = await self.connect_async(robust=False, timeout=timeout)
+        elapsed = time.perf_counter() - start
+        await connection.close()
+        return elapsed
+    
+    def probe_management(self, timeout: float) -> Dict[str, Any]:
+        """GET /api/overview with a timeout; returns the payload"""
+        return self._management_get("overview", timeout=timeout).json()
+    
     def discover_cluster(self) -> ClusterDiscovery:
         """Discover all objects in the RabbitMQ cluster"""
         try:
@@ -77,20 +369,22 @@ class RabbitMQService:
             users = self._get_users()
             bindings = self._get_bindings()
             
-            return ClusterDiscovery(
+            # Entities were validated as they were built; skip the second pass
+            return ClusterDiscovery.model_construct(
                 queues=queues,
                 exchanges=exchanges,
                 vhosts=vhosts,
                 users=users,
                 bindings=bindings
             )
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to discover cluster: {str(e)}")
     
     def _get_queues(self) -> List[QueueInfo]:
         """Get all queues from the cluster"""
-        response = requests.get(f"{self.management_url}/queues", auth=self.auth)
-        response.raise_for_status()
+        response = self._management_get("queues")
         
         queues = []
         for queue_data in response.json():
@@ -109,8 +403,7 @@ class RabbitMQService:
     
     def _get_exchanges(self) -> List[ExchangeInfo]:
         """Get all exchanges from the cluster"""
-        response = requests.get(f"{self.management_url}/exchanges", auth=self.auth)
-        response.raise_for_status()
+        response = self._management_get("exchanges")
         
         exchanges = []
         for exchange_data in response.json():
@@ -127,8 +420,7 @@ class RabbitMQService:
     
     def _get_vhosts(self) -> List[VHostInfo]:
         """Get all virtual hosts from the cluster"""
-        response = requests.get(f"{self.management_url}/vhosts", auth=self.auth)
-        response.raise_for_status()
+        response = self._management_get("vhosts")
         
         vhosts = []
         for vhost_data in response.json():
@@ -142,8 +434,7 @@ class RabbitMQService:
     
     def _get_users(self) -> List[UserInfo]:
         """Get all users from the cluster"""
-        response = requests.get(f"{self.management_url}/users", auth=self.auth)
-        response.raise_for_status()
+        response = self._management_get("users")
         
         users = []
         for user_data in response.json():
@@ -156,8 +447,7 @@ class RabbitMQService:
     
     def _get_bindings(self) -> List[BindingInfo]:
         """Get all bindings from the cluster"""
-        response = requests.get(f"{self.management_url}/bindings", auth=self.auth)
-        response.raise_for_status()
+        response = self._management_get("bindings")
         
         bindings = []
         for binding_data in response.json():
@@ -171,19 +461,45 @@ class RabbitMQService:
         
         return bindings
     
+    def get_overview_sample(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Raw /api/overview and /api/nodes payloads"""
+        try:
+            overview = self._management_get("overview", timeout=10).json()
+            nodes = self._management_get("nodes", timeout=10).json()
+            return overview, nodes
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to get cluster overview: {str(e)}")
+    
+    def get_queue_stats(self) -> List[QueueStats]:
+        """Depth, consumers, state and publish/deliver rates of every queue"""
+        try:
+            response = self._management_get("queues", timeout=30, params={"columns": QUEUE_STATS_COLUMNS})
+            stats = []
+            for queue_data in response.json():
+                message_stats = queue_data.get("message_stats") or {}
+                stats.append(QueueStats(
+                    queue_data["vhost"],
+                    queue_data["name"],
+                    queue_data.get("messages") or 0,
+                    queue_data.get("consumers") or 0,
+                    queue_data.get("state", "running"),
+                    message_stats.get("publish_details", {}).get("rate", 0.0),
+                    message_stats.get("deliver_get_details", {}).get("rate", 0.0)
+                ))
+            return stats
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to get queue stats: {str(e)}")
+    
     def publish_message(self, exchange: str, routing_key: str, message: str,
                        properties: Optional[Dict[str, Any]] = None, vhost: str = None) -> bool:
         """Publish a message to RabbitMQ"""
+        start = time.perf_counter()
         try:
-            credentials = pika.PlainCredentials(self.username, self.password)
-            connection_params = pika.ConnectionParameters(
-                host=self.host,
-                port=self.port,
-                virtual_host=vhost or self.vhost,
-                credentials=credentials
-            )
-            
-            connection = pika.BlockingConnection(connection_params)
+            connection = self._open_blocking_connection(vhost)
             channel = connection.channel()
 
             # Convert properties to pika BasicProperties
@@ -199,33 +515,67 @@ class RabbitMQService:
             )
             
             connection.close()
+            PUBLISHED_MESSAGES.inc()
             return True
             
         except Exception as e:
             raise Exception(f"Failed to publish message: {str(e)}")
+        finally:
+            self.metrics.publish.observe(time.perf_counter() - start)
     
-    def get_connection_params(self) -> pika.ConnectionParameters:
-        """Get pika connection parameters"""
+    def get_connection_params(self, node: Optional[Node] = None) -> "pika.ConnectionParameters":
+        """Get pika connection parameters for a node (default: the best one)"""
+        node = node or self.nodes.candidates("amqp")[0]
         credentials = pika.PlainCredentials(self.username, self.password)
         return pika.ConnectionParameters(
-            host=self.host,
-            port=self.port,
+            host=node.host,
+            port=node.port,
             virtual_host=self.vhost,
-            credentials=credentials
+            credentials=credentials,
+            ssl_options=pika.SSLOptions(self.amqp_tls, server_hostname=node.host) if self.amqp_tls else None
         )
 
-    def consume_messages(self, queue_name: str, max_messages: int = 10, auto_ack: bool = True, vhost: str = None) -> List[Dict[str, Any]]:
-        """Consume messages from a queue (removes them from queue)"""
+    def aio_connection_kwargs(self, vhost: str = None, node: Optional[Node] = None) -> Dict[str, Any]:
+        """Keyword arguments for aio_pika.connect_robust (default: the best node)"""
+        node = node or self.nodes.candidates("amqp")[0]
+        kwargs = {
+            "host": node.host,
+            "port": node.port,
+            "login": self.username,
+            "password": self.password,
+            "virtualhost": vhost or self.vhost
+        }
+        if self.amqp_tls:
+            kwargs["ssl"] = True
+            kwargs["ssl_context"] = self.amqp_tls
+        return kwargs
+
+    async def publish_batch_async(self, messages: List[tuple], vhost: str = None) -> List[Optional[Exception]]:
+        """Publish (exchange, routing_key, body, properties) tuples through
+        the pooled confirm channel. Publishes are pipelined and the result
+        holds None or the exception for each message, in order."""
+        from app.services.channel_pool import channel_pool
+
+        start = time.perf_counter()
         try:
-            credentials = pika.PlainCredentials(self.username, self.password)
-            connection_params = pika.ConnectionParameters(
-                host=self.host,
-                port=self.port,
-                virtual_host=vhost or self.vhost,
-                credentials=credentials
-            )
+            return await channel_pool.publish_batch(self, messages, vhost)
+        finally:
+            self.metrics.publish.observe(time.perf_counter() - start)
+            PUBLISHED_MESSAGES.inc(len(messages))
 
-            connection = pika.BlockingConnection(connection_params)
+    async def rpc_call_async(self, exchange: str, routing_key: str, body: bytes,
+                             properties: Dict[str, Any] = None, timeout: float = 5.0, vhost: str = None):
+        """Request/reply over direct reply-to on the pooled channel"""
+        from app.services.channel_pool import channel_pool
+
+        PUBLISHED_MESSAGES.inc()
+        return await channel_pool.rpc_call(self, exchange, routing_key, body, properties, timeout, vhost)
+
+    def consume_messages(self, queue_name: str, max_messages: int = 10, auto_ack: bool = True, vhost: str = None,
+                         decoder: PayloadDecoder = default_decoder) -> List[Dict[str, Any]]:
+        """Consume messages from a queue (removes them from queue)"""
+        try:
+            connection = self._open_blocking_connection(vhost)
             channel = connection.channel()
 
             messages = []
@@ -245,27 +595,14 @@ class RabbitMQService:
                     if not auto_ack and method_frame:
                         channel.basic_ack(delivery_tag=method_frame.delivery_tag)
 
-                    message = {
-                        "body": body.decode('utf-8') if body else None,
-                        "properties": {
-                            "content_type": header_frame.content_type,
-                            "delivery_mode": header_frame.delivery_mode,
-                            "priority": header_frame.priority,
-                            "correlation_id": header_frame.correlation_id,
-                            "reply_to": header_frame.reply_to,
-                            "expiration": header_frame.expiration,
-                            "message_id": header_frame.message_id,
-                            "timestamp": header_frame.timestamp,
-                            "type": header_frame.type,
-                            "user_id": header_frame.user_id,
-                            "app_id": header_frame.app_id,
-                            "headers": header_frame.headers
-                        },
+                    message = decoded_message(decoder, header_frame, body)
+                    message.update({
+                        "properties": message_properties(header_frame),
                         "routing_key": method_frame.routing_key,
                         "exchange": method_frame.exchange,
                         "queue": queue_name,
                         "timestamp": datetime.utcnow().isoformat()
-                    }
+                    })
                     messages.append(message)
 
                 except Exception as msg_error:
@@ -273,23 +610,17 @@ class RabbitMQService:
                     continue
 
             connection.close()
+            observe_batch("consume", len(messages))
             return messages
 
         except Exception as e:
             raise Exception(f"Failed to consume messages: {str(e)}")
 
-    def browse_messages(self, queue_name: str, max_messages: int = 10, vhost: str = None) -> List[Dict[str, Any]]:
+    def browse_messages(self, queue_name: str, max_messages: int = 10, vhost: str = None,
+                        decoder: PayloadDecoder = default_decoder) -> List[Dict[str, Any]]:
         """Browse messages in a queue (messages remain in queue)"""
         try:
-            credentials = pika.PlainCredentials(self.username, self.password)
-            connection_params = pika.ConnectionParameters(
-                host=self.host,
-                port=self.port,
-                virtual_host=vhost or self.vhost,
-                credentials=credentials
-            )
-
-            connection = pika.BlockingConnection(connection_params)
+            connection = self._open_blocking_connection(vhost)
             channel = connection.channel()
 
             messages = []
@@ -308,27 +639,14 @@ class RabbitMQService:
                 # Store delivery tag for later rejection
                 temp_messages.append(method_frame.delivery_tag)
 
-                message = {
-                    "body": body.decode('utf-8') if body else None,
-                    "properties": {
-                        "content_type": header_frame.content_type,
-                        "delivery_mode": header_frame.delivery_mode,
-                        "priority": header_frame.priority,
-                        "correlation_id": header_frame.correlation_id,
-                        "reply_to": header_frame.reply_to,
-                        "expiration": header_frame.expiration,
-                        "message_id": header_frame.message_id,
-                        "timestamp": header_frame.timestamp,
-                        "type": header_frame.type,
-                        "user_id": header_frame.user_id,
-                        "app_id": header_frame.app_id,
-                        "headers": header_frame.headers
-                    },
+                message = decoded_message(decoder, header_frame, body)
+                message.update({
+                    "properties": message_properties(header_frame),
                     "routing_key": method_frame.routing_key,
                     "exchange": method_frame.exchange,
                     "queue": queue_name,
                     "timestamp": datetime.utcnow().isoformat()
-                }
+                })
                 messages.append(message)
 
             # Reject all messages to put them back in the queue
@@ -336,6 +654,7 @@ class RabbitMQService:
                 channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
 
             connection.close()
+            observe_batch("browse", len(messages))
             return messages
 
         except Exception as e:
@@ -0,0 +1,327 @@
+import asyncio
+import fnmatch
+import gzip
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from app.models import ReplayConfig, ReplayStatus
+from app.services.audit import audit_log
+from app.services.capture import capture_store
+from app.services.message_import import GZIP_MAGIC, parse_message_line
+
+# Replays allowed to run at once on a replica
+REPLAY_MAX_JOBS = int(os.getenv("REPLAY_MAX_JOBS", "2"))
+# Finished replays kept for status queries
+REPLAY_HISTORY = int(os.getenv("REPLAY_HISTORY", "20"))
+# Batches read ahead of the publisher
+REPLAY_READ_AHEAD_BATCHES = int(os.getenv("REPLAY_READ_AHEAD_BATCHES", "4"))
+
+FINISHED_STATES = ("completed", "stopped", "failed")
+# Messages due within this much of each other are published together
+SCHEDULE_SLACK_SECONDS = 0.002
+
+# (recorded time or None, exchange, routing key, body, properties)
+ReplayRecord = Tuple[Optional[float], str, str, bytes, Dict[str, Any]]
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def capture_records(name: str, offset: Optional[int] = None, since: Optional[float] = None,
+                    until: Optional[float] = None) -> Iterator[ReplayRecord]:
+    """Messages of a capture with their capture times"""
+    with capture_store.reader(name) as reader:
+        records = reader.scan(offset, since)
+        body = None
+        try:
+            for _, timestamp, meta, body in records:
+                if until is not None and timestamp > until:
+                    break
+                yield (timestamp, meta.get("exchange") or "", meta.get("routing_key") or "",
+                       bytes(body), meta.get("properties") or {})
+        finally:
+            # The mmap cannot close while a view into it is alive
+            body = None
+            records.close()
+
+
+def file_records(path: str, since: Optional[float] = None,
+                 until: Optional[float] = None) -> Iterator[Optional[ReplayRecord]]:
+    """Messages of an NDJSON (optionally gzipped) export or capture page.
+
+    Times come from `captured_at` when the line has one, else from the
+    message timestamp; lines without either are replayed untimed. Lines
+    that cannot be parsed yield None so the job can count them as skipped.
+    """
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == GZIP_MAGIC
+        raw.seek(0)
+        stream = gzip.GzipFile(fileobj=raw) if compressed else raw
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                record = parse_message_line(message)
+            except (ValueError, TypeError, AttributeError):
+                yield None
+                continue
+            recorded = _epoch(message.get("captured_at")) or _epoch(record[3].get("timestamp"))
+            if recorded is not None:
+                if since is not None and recorded < since:
+                    continue
+                if until is not None and recorded > until:
+                    break
+            yield (recorded, *record)
+
+
+class RoutingKeyMap:
+    """Exact routing keys first, then globs in the order given"""
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.exact = {key: value for key, value in mapping.items() if not any(c in key for c in "*?[")}
+        self.patterns = [(key, value) for key, value in mapping.items() if key not in self.exact]
+
+    def __call__(self, routing_key: str) -> str:
+        mapped = self.exact.get(routing_key)
+        if mapped is not None:
+            return mapped
+        for pattern, value in self.patterns:
+            if fnmatch.fnmatchcase(routing_key, pattern):
+                return value
+        return routing_key
+
+
+class ReplayJob:
+    """Republishes recorded messages on their original schedule.
+
+    A reader task pulls batches from the source in a worker thread and
+    keeps up to REPLAY_READ_AHEAD_BATCHES of them queued, so file and
+    segment I/O never stalls publishing. Message i is due at
+    (recorded_i - recorded_0) / speed after the start, and no earlier than
+    i / max_rate; messages due together go out as one batch on the pooled
+    publisher-confirm channel.
+    """
+
+    def __init__(self, config: ReplayConfig, rabbitmq_service, source: str,
+                 records: Iterator[Optional[ReplayRecord]], cleanup: Optional[str] = None,
+                 client: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.config = config
+        self.service = rabbitmq_service
+        self.client = client
+        self.source = source
+        self.records = records
+        self.cleanup = cleanup
+        self.state = "running"
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.published = 0
+        self.publish_errors = 0
+        self.skipped = 0
+        self.scheduled = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self._start = time.perf_counter()
+        self._last_due = 0.0
+        self._finished_at: Optional[float] = None
+        self._stop = asyncio.Event()
+        self._routing_keys = RoutingKeyMap(config.routing_key_map)
+
+    def stop(self):
+        self._stop.set()
+
+    def _read_batch(self) -> List[Optional[ReplayRecord]]:
+        batch = []
+        for record in self.records:
+            batch.append(record)
+            if len(batch) >= self.config.batch_size:
+                break
+        return batch
+
+    async def _read_ahead(self, batches: asyncio.Queue):
+        try:
+            while True:
+                batch = await run_in_threadpool(self._read_batch)
+                await batches.put(batch)
+                if not batch:
+                    return
+        except Exception as e:
+            await batches.put(e)
+
+    def _due(self, recorded: Optional[float], first: Optional[float]) -> float:
+        config = self.config
+        due = self._start
+        if config.timing == "original" and recorded is not None and first is not None:
+            due += max(0.0, recorded - first) / config.speed
+        if config.max_rate:
+            due = max(due, self._start + self.scheduled / config.max_rate)
+        return due
+
+    async def _publish(self, pending: List[tuple]):
+        results = await self.service.publish_batch_async(pending, self.config.vhost)
+        failed = sum(1 for error in results if error is not None)
+        self.published += len(results) - failed
+        self.publish_errors += failed
+        pending.clear()
+
+    def _limit_reached(self) -> bool:
+        return bool(self.config.message_count) and self.scheduled >= self.config.message_count
+
+    async def run(self):
+        config = self.config
+        batches = asyncio.Queue(maxsize=REPLAY_READ_AHEAD_BATCHES)
+        reader = asyncio.create_task(self._read_ahead(batches))
+        pending: List[tuple] = []
+        first: Optional[float] = None
+        try:
+            while not self._stop.is_set() and not self._limit_reached():
+                batch = await batches.get()
+                if isinstance(batch, Exception):
+                    raise batch
+                if not batch:
+                    break
+                for record in batch:
+                    if self._stop.is_set() or self._limit_reached():
+                        break
+                    if record is None:
+                        self.skipped += 1
+                        continue
+                    recorded, exchange, routing_key, body, properties = record
+                    if first is None and recorded is not None:
+                        first = recorded
+                    due = self._due(recorded, first)
+                    ahead = due - time.perf_counter()
+                    if ahead > SCHEDULE_SLACK_SECONDS:
+                        # Anything already due goes out before waiting
+                        if pending:
+                            await self._publish(pending)
+                            ahead = due - time.perf_counter()
+                        if ahead > 0:
+                            await asyncio.sleep(ahead)
+                    self.lag = max(0.0, time.perf_counter() - due)
+                    self.max_lag = max(self.max_lag, self.lag)
+                    self._last_due = due - self._start
+                    self.scheduled += 1
+                    pending.append((
+                        config.exchange if config.exchange is not None else exchange,
+                        self._routing_keys(routing_key),
+                        body,
+                        properties
+                    ))
+                    if len(pending) >= config.batch_size:
+                        await self._publish(pending)
+            if pending:
+                await self._publish(pending)
+            self.state = "stopped" if self._stop.is_set() else "completed"
+        except asyncio.CancelledError:
+            self.state = "stopped"
+            raise
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+        finally:
+            self._finished_at = time.perf_counter()
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            close = getattr(self.records, "close", None)
+            if close is not None:
+                await run_in_threadpool(close)
+            if self.cleanup:
+                try:
+                    os.remove(self.cleanup)
+                except OSError:
+                    pass
+            # One summary event for the whole replay
+            await audit_log.record(
+                "replay", config.connection_id, self.client, vhost=config.vhost,
+                exchange=config.exchange, message_count=self.published,
+                success=self.state != "failed" and not self.publish_errors,
+                error=self.error or (f"{self.publish_errors} message(s) failed to publish"
+                                     if self.publish_errors else None)
+            )
+
+    def status(self) -> ReplayStatus:
+        elapsed = (self._finished_at or time.perf_counter()) - self._start
+        target_rate = None
+        if self._last_due > 0:
+            target_rate = round(self.scheduled / self._last_due, 1)
+        return ReplayStatus(
+            id=self.id,
+            state=self.state,
+            source=self.source,
+            config=self.config,
+            started_at=self.started_at,
+            elapsed_seconds=round(elapsed, 3),
+            published=self.published,
+            publish_errors=self.publish_errors,
+            skipped=self.skipped,
+            target_rate=target_rate,
+            achieved_rate=round(self.published / elapsed, 1) if elapsed else 0.0,
+            lag_ms=round(self.lag * 1000, 3),
+            max_lag_ms=round(self.max_lag * 1000, 3),
+            error=self.error
+        )
+
+
+class ReplayManager:
+    """Runs replay jobs on this replica and keeps recent results"""
+
+    def __init__(self, max_jobs: int = REPLAY_MAX_JOBS, history: int = REPLAY_HISTORY):
+        self.max_jobs = max_jobs
+        self.history = history
+        self.jobs: "OrderedDict[str, ReplayJob]" = OrderedDict()
+
+    def running(self) -> List[ReplayJob]:
+        return [job for job in self.jobs.values() if job.state not in FINISHED_STATES]
+
+    def start(self, config: ReplayConfig, rabbitmq_service, source: str,
+              records: Iterator[Optional[ReplayRecord]], cleanup: Optional[str] = None,
+              client: Optional[str] = None) -> ReplayJob:
+        if len(self.running()) >= self.max_jobs:
+            raise RuntimeError(f"At most {self.max_jobs} replays can run at once")
+
+        job = ReplayJob(config, rabbitmq_service, source, records, cleanup, client)
+        job.task = asyncio.create_task(job.run())
+        self.jobs[job.id] = job
+
+        finished = [job_id for job_id, j in self.jobs.items() if j.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[ReplayJob]:
+        return self.jobs.get(job_id)
+
+    def stop(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if not job:
+            return False
+        job.stop()
+        return True
+
+    async def shutdown(self):
+        for job in self.running():
+            job.stop()
+            if job.task:
+                job.task.cancel()
+        await asyncio.gather(*(job.task for job in self.jobs.values() if job.task), return_exceptions=True)
+
+
+# Global replay manager instance
+replay_manager = ReplayManager()
@@ -0,0 +1,46 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # pydantic-core dumps without re-validating models we built ourselves
+        return obj.__pydantic_serializer__.to_python(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="replace")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize API payloads (dicts, lists, Pydantic models) to JSON bytes"""
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+def loads(data):
+    """Parse JSON; raises json.JSONDecodeError (orjson subclasses it)"""
+    return orjson.loads(data)
+
+
+def dumps_text(content: Any) -> str:
+    """dumps() as str, for WebSocket text frames"""
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson/pydantic-core.
+
+    Returning it from a route also bypasses FastAPI's response_model
+    validation and jsonable_encoder pass; keep `response_model` on the
+    route for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
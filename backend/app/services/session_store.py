@@ -0,0 +1,301 @@
+import json
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete, select, update
+from app.database import AsyncSessionLocal, ConsumerReplica, ConsumerSession
+from app.models import ConsumerSessionInfo
+
+
+# Identity of this process in the shared registry
+REPLICA_ID = os.getenv("REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+SESSION_STORE = os.getenv("SESSION_STORE", "database")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_HEARTBEAT_SECONDS = float(os.getenv("SESSION_HEARTBEAT_SECONDS", "5"))
+# A replica that has not heartbeated for this long is considered gone
+SESSION_REPLICA_TTL_SECONDS = float(os.getenv("SESSION_REPLICA_TTL_SECONDS", "30"))
+
+
+class SessionStore(ABC):
+    """Registry of WebSocket consumers shared by all replicas.
+
+    Each replica registers the consumers it owns and heartbeats its consumer
+    count. Stop requests for consumers owned elsewhere are recorded here and
+    collected by the owner on its next heartbeat.
+    """
+
+    @abstractmethod
+    async def register(self, session: ConsumerSessionInfo):
+        """Record a consumer owned by session.replica_id"""
+
+    @abstractmethod
+    async def remove(self, consumer_id: str):
+        """Forget a consumer that has stopped"""
+
+    @abstractmethod
+    async def get(self, consumer_id: str) -> Optional[ConsumerSessionInfo]:
+        """A consumer by id, on any replica"""
+
+    @abstractmethod
+    async def list_sessions(self) -> List[ConsumerSessionInfo]:
+        """Consumers owned by live replicas"""
+
+    @abstractmethod
+    async def request_stop(self, consumer_id: str):
+        """Ask the owning replica to stop a consumer"""
+
+    @abstractmethod
+    async def heartbeat(self, replica_id: str, consumers: int) -> List[str]:
+        """Record liveness, forget sessions of replicas that stopped
+        heartbeating, and return consumer ids this replica must stop"""
+
+    @abstractmethod
+    async def replica_loads(self) -> Dict[str, int]:
+        """Consumer count of each live replica"""
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store; for single-replica deployments and tests"""
+
+    def __init__(self, replica_ttl: float = SESSION_REPLICA_TTL_SECONDS):
+        self.replica_ttl = replica_ttl
+        self.sessions: Dict[str, ConsumerSessionInfo] = {}
+        self.stops: Dict[str, set] = {}
+        self.replicas: Dict[str, tuple] = {}
+
+    def _live_replicas(self) -> Dict[str, int]:
+        cutoff = time.monotonic() - self.replica_ttl
+        return {rid: count for rid, (count, seen) in self.replicas.items() if seen >= cutoff}
+
+    async def register(self, session: ConsumerSessionInfo):
+        self.sessions[session.id] = session
+
+    async def remove(self, consumer_id: str):
+        session = self.sessions.pop(consumer_id, None)
+        if session:
+            self.stops.get(session.replica_id, set()).discard(consumer_id)
+
+    async def get(self, consumer_id: str) -> Optional[ConsumerSessionInfo]:
+        return self.sessions.get(consumer_id)
+
+    async def list_sessions(self) -> List[ConsumerSessionInfo]:
+        live = self._live_replicas()
+        return [s for s in self.sessions.values() if s.replica_id in live]
+
+    async def request_stop(self, consumer_id: str):
+        session = self.sessions.get(consumer_id)
+        if session:
+            self.stops.setdefault(session.replica_id, set()).add(consumer_id)
+
+    async def heartbeat(self, replica_id: str, consumers: int) -> List[str]:
+        self.replicas[replica_id] = (consumers, time.monotonic())
+
+        # Forget sessions of replicas that died without cleaning up
+        live = self._live_replicas()
+        for dead in [rid for rid in self.replicas if rid not in live]:
+            del self.replicas[dead]
+            self.stops.pop(dead, None)
+        self.sessions = {cid: s for cid, s in self.sessions.items() if s.replica_id in live}
+        return list(self.stops.pop(replica_id, set()))
+
+    async def replica_loads(self) -> Dict[str, int]:
+        return self._live_replicas()
+
+
+class DatabaseSessionStore(SessionStore):
+    """Store backed by the application database (SQLite or Postgres)"""
+
+    def __init__(self, replica_ttl: float = SESSION_REPLICA_TTL_SECONDS):
+        self.replica_ttl = replica_ttl
+
+    def _cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.replica_ttl)
+
+    @staticmethod
+    def _to_info(row: ConsumerSession) -> ConsumerSessionInfo:
+        return ConsumerSessionInfo(
+            id=row.consumer_id,
+            replica_id=row.replica_id,
+            connection_id=row.connection_id,
+            queue=row.queue,
+            vhost=row.vhost,
+            started_at=row.started_at
+        )
+
+    async def register(self, session: ConsumerSessionInfo):
+        async with AsyncSessionLocal() as db:
+            db.add(ConsumerSession(
+                consumer_id=session.id,
+                replica_id=session.replica_id,
+                connection_id=session.connection_id,
+                queue=session.queue,
+                vhost=session.vhost,
+                started_at=session.started_at
+            ))
+            await db.commit()
+
+    async def remove(self, consumer_id: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ConsumerSession).where(ConsumerSession.consumer_id == consumer_id))
+            await db.commit()
+
+    async def get(self, consumer_id: str) -> Optional[ConsumerSessionInfo]:
+        async with AsyncSessionLocal() as db:
+            row = await db.get(ConsumerSession, consumer_id)
+            return self._to_info(row) if row else None
+
+    async def list_sessions(self) -> List[ConsumerSessionInfo]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(ConsumerSession)
+                .join(ConsumerReplica, ConsumerReplica.replica_id == ConsumerSession.replica_id)
+                .where(ConsumerReplica.last_seen >= self._cutoff())
+            )).scalars().all()
+            return [self._to_info(row) for row in rows]
+
+    async def request_stop(self, consumer_id: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ConsumerSession)
+                .where(ConsumerSession.consumer_id == consumer_id)
+                .values(stop_requested=True)
+            )
+            await db.commit()
+
+    async def heartbeat(self, replica_id: str, consumers: int) -> List[str]:
+        async with AsyncSessionLocal() as db:
+            replica = await db.get(ConsumerReplica, replica_id)
+            if replica is None:
+                db.add(ConsumerReplica(replica_id=replica_id, consumers=consumers, last_seen=datetime.utcnow()))
+            else:
+                replica.consumers = consumers
+                replica.last_seen = datetime.utcnow()
+            # The liveness update must reach the database before the sweep
+            # below, or this replica's own sessions look dead
+            await db.flush()
+
+            # Forget sessions of replicas that died without cleaning up
+            dead = select(ConsumerReplica.replica_id).where(ConsumerReplica.last_seen < self._cutoff())
+            await db.execute(delete(ConsumerSession).where(ConsumerSession.replica_id.in_(dead)))
+
+            stops = (await db.execute(
+                select(ConsumerSession.consumer_id).where(
+                    ConsumerSession.replica_id == replica_id,
+                    ConsumerSession.stop_requested == True
+                )
+            )).scalars().all()
+            await db.commit()
+            return list(stops)
+
+    async def replica_loads(self) -> Dict[str, int]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(ConsumerReplica.replica_id, ConsumerReplica.consumers)
+                .where(ConsumerReplica.last_seen >= self._cutoff())
+            )).all()
+            return {row.replica_id: row.consumers for row in rows}
+
+
+class RedisSessionStore(SessionStore):
+    """Store backed by Redis (or any server speaking the Redis protocol)"""
+
+    PREFIX = "rabbitmq-webui:consumers"
+
+    def __init__(self, url: str = REDIS_URL, replica_ttl: float = SESSION_REPLICA_TTL_SECONDS):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise Exception("SESSION_STORE=redis requires the 'redis' package")
+        self.redis = redis.from_url(url, decode_responses=True)
+        self.replica_ttl = replica_ttl
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.PREFIX,) + parts)
+
+    async def _live_replicas(self) -> List[str]:
+        return await self.redis.zrangebyscore(self._key("replicas", "seen"), time.time() - self.replica_ttl, "+inf")
+
+    async def register(self, session: ConsumerSessionInfo):
+        async with self.redis.pipeline() as pipe:
+            pipe.set(self._key("session", session.id), session.model_dump_json())
+            pipe.sadd(self._key("index"), session.id)
+            await pipe.execute()
+
+    async def remove(self, consumer_id: str):
+        async with self.redis.pipeline() as pipe:
+            pipe.delete(self._key("session", consumer_id))
+            pipe.srem(self._key("index"), consumer_id)
+            await pipe.execute()
+
+    async def get(self, consumer_id: str) -> Optional[ConsumerSessionInfo]:
+        data = await self.redis.get(self._key("session", consumer_id))
+        return ConsumerSessionInfo(**json.loads(data)) if data else None
+
+    async def list_sessions(self) -> List[ConsumerSessionInfo]:
+        ids = await self.redis.smembers(self._key("index"))
+        if not ids:
+            return []
+        live = set(await self._live_replicas())
+        values = await self.redis.mget([self._key("session", cid) for cid in ids])
+        sessions = [ConsumerSessionInfo(**json.loads(v)) for v in values if v]
+        return [s for s in sessions if s.replica_id in live]
+
+    async def request_stop(self, consumer_id: str):
+        session = await self.get(consumer_id)
+        if session:
+            await self.redis.sadd(self._key("stops", session.replica_id), consumer_id)
+
+    async def heartbeat(self, replica_id: str, consumers: int) -> List[str]:
+        stops_key = self._key("stops", replica_id)
+        async with self.redis.pipeline() as pipe:
+            pipe.zadd(self._key("replicas", "seen"), {replica_id: time.time()})
+            pipe.hset(self._key("replicas", "load"), replica_id, consumers)
+            pipe.smembers(stops_key)
+            pipe.delete(stops_key)
+            results = await pipe.execute()
+        await self._expire_dead_replicas()
+        return list(results[2])
+
+    async def _expire_dead_replicas(self):
+        """Forget replicas that died without cleaning up, and their sessions"""
+        seen_key = self._key("replicas", "seen")
+        dead = set(await self.redis.zrangebyscore(seen_key, "-inf", f"({time.time() - self.replica_ttl}"))
+        if not dead:
+            return
+        ids = list(await self.redis.smembers(self._key("index")))
+        values = await self.redis.mget([self._key("session", cid) for cid in ids]) if ids else []
+        # Index entries whose session key is gone are dropped as well
+        expired = [cid for cid, v in zip(ids, values)
+                   if not v or ConsumerSessionInfo(**json.loads(v)).replica_id in dead]
+        async with self.redis.pipeline() as pipe:
+            pipe.zrem(seen_key, *dead)
+            pipe.hdel(self._key("replicas", "load"), *dead)
+            pipe.delete(*(self._key("stops", rid) for rid in dead))
+            if expired:
+                pipe.delete(*(self._key("session", cid) for cid in expired))
+                pipe.srem(self._key("index"), *expired)
+            await pipe.execute()
+
+    async def replica_loads(self) -> Dict[str, int]:
+        live = await self._live_replicas()
+        if not live:
+            return {}
+        counts = await self.redis.hmget(self._key("replicas", "load"), live)
+        return {rid: int(count or 0) for rid, count in zip(live, counts)}
+
+
+def create_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    """Build the session store selected by SESSION_STORE"""
+    if kind == "redis":
+        return RedisSessionStore()
+    if kind == "memory":
+        return InMemorySessionStore()
+    return DatabaseSessionStore()
+
+
+# Global session store instance
+session_store = create_session_store()
@@ -0,0 +1,97 @@
+import hashlib
+import heapq
+import random
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in `capacity` counters (Metwally et al.).
+
+    When a new key arrives and every counter is taken, the smallest counter
+    is reassigned to it and keeps its count as the new key's error bound.
+    Any key more frequent than total/capacity is guaranteed to be tracked,
+    and a reported count overestimates by at most its `error`.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self.total = 0
+        self.evictions = 0
+
+    def add(self, key: Hashable, count: int = 1):
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            return
+        evicted = min(self.counts, key=self.counts.__getitem__)
+        floor = self.counts.pop(evicted)
+        self.errors.pop(evicted)
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+        self.evictions += 1
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """Up to k most frequent keys. Counts are exact until the first
+        eviction; after it, only keys certain to occur in more than
+        1/capacity of the stream are kept, as others may be eviction noise"""
+        floor = self.total / self.capacity if self.evictions else 0
+        ranked = heapq.nlargest(
+            k,
+            ((key, count) for key, count in self.counts.items() if count - self.errors[key] > floor),
+            key=lambda item: item[1]
+        )
+        return [{"value": key, "count": count, "error": self.errors[key]} for key, count in ranked]
+
+
+class DistinctCounter:
+    """Estimated number of distinct values from the k smallest hashes seen
+    (KMV); exact below k values, about 1/sqrt(k) relative error above"""
+
+    _SPACE = float(1 << 64)
+
+    def __init__(self, k: int = 256):
+        self.k = k
+        self._heap: List[int] = []  # negated, so the largest kept hash is on top
+        self._kept = set()
+
+    def add(self, value: Any):
+        digest = int.from_bytes(hashlib.blake2b(repr(value).encode(), digest_size=8).digest(), "big")
+        if digest in self._kept:
+            return
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, -digest)
+            self._kept.add(digest)
+        elif digest < -self._heap[0]:
+            self._kept.discard(-heapq.heappushpop(self._heap, -digest))
+            self._kept.add(digest)
+
+    def estimate(self) -> int:
+        if len(self._heap) < self.k:
+            return len(self._heap)
+        return int((self.k - 1) * self._SPACE / -self._heap[0])
+
+
+class Reservoir:
+    """Uniform sample of `size` items from a stream of unknown length
+    (Algorithm R)"""
+
+    def __init__(self, size: int = 100, rng: Optional[random.Random] = None):
+        self.size = size
+        self.items: List[Any] = []
+        self.seen = 0
+        self._rng = rng or random.Random()
+
+    def add(self, item: Any):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        slot = self._rng.randrange(self.seen)
+        if slot < self.size:
+            self.items[slot] = item
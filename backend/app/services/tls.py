@@ -0,0 +1,174 @@
+import hashlib
+import os
+import ssl
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+from app.services.encryption import encryption_service
+from app.services.lazy_import import lazy_import
+
+requests = lazy_import("requests")
+
+# Offer the last session of a server on reconnect so it can skip the full handshake
+TLS_SESSION_RESUMPTION = os.getenv("TLS_SESSION_RESUMPTION", "true").lower() == "true"
+
+
+def _remember_session(tls) -> bool:
+    """Store the session of a TLS socket/object on its context; True once
+    it is final (TLS 1.3 tickets only arrive after the handshake)"""
+    session = tls.session
+    if session is None:
+        return False
+    tls.context.sessions[tls.server_hostname] = session
+    return session.has_ticket or tls.version() != "TLSv1.3"
+
+
+class _ResumingSSLSocket(ssl.SSLSocket):
+    """Blocking sockets (pika, requests)"""
+
+    _session_final = False
+
+    def do_handshake(self, *args, **kwargs):
+        super().do_handshake(*args, **kwargs)
+        self._session_final = _remember_session(self)
+
+    def recv(self, *args, **kwargs):
+        data = super().recv(*args, **kwargs)
+        if not self._session_final:
+            self._session_final = _remember_session(self)
+        return data
+
+    def recv_into(self, *args, **kwargs):
+        received = super().recv_into(*args, **kwargs)
+        if not self._session_final:
+            self._session_final = _remember_session(self)
+        return received
+
+
+class _ResumingSSLObject(ssl.SSLObject):
+    """Memory-BIO TLS used by asyncio (aio-pika)"""
+
+    _session_final = False
+
+    def do_handshake(self):
+        super().do_handshake()
+        self._session_final = _remember_session(self)
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        if not self._session_final:
+            self._session_final = _remember_session(self)
+        return data
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client context that resumes the last TLS session of each server.
+
+    Python only resumes sessions that are passed in explicitly; this
+    context keeps the latest one per server name and offers it on the next
+    connect, for blocking sockets and asyncio alike.
+    """
+
+    sslsocket_class = _ResumingSSLSocket
+    sslobject_class = _ResumingSSLObject
+
+    def __new__(cls, *args, **kwargs):
+        context = super().__new__(cls, *args, **kwargs)
+        context.sessions = {}
+        return context
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_socket(sock, server_side, do_handshake_on_connect, suppress_ragged_eofs,
+                                   server_hostname, session)
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+
+def build_context(ca_cert: Optional[str] = None, client_cert: Optional[str] = None,
+                  client_key: Optional[str] = None, verify: bool = True,
+                  resumption: bool = TLS_SESSION_RESUMPTION) -> ssl.SSLContext:
+    """Client SSLContext from PEM strings; the system CAs are used without `ca_cert`"""
+    context = (ResumingSSLContext if resumption else ssl.SSLContext)(ssl.PROTOCOL_TLS_CLIENT)
+    if ca_cert:
+        context.load_verify_locations(cadata=ca_cert)
+    else:
+        context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+
+    if client_cert:
+        # load_cert_chain only reads files; keep them just long enough to load
+        with tempfile.TemporaryDirectory() as directory:
+            cert_path = os.path.join(directory, "cert.pem")
+            with open(cert_path, "w") as f:
+                f.write(client_cert)
+            key_path = None
+            if client_key:
+                key_path = os.path.join(directory, "key.pem")
+                with open(os.open(key_path, os.O_WRONLY | os.O_CREAT, 0o600), "w") as f:
+                    f.write(client_key)
+            context.load_cert_chain(cert_path, key_path)
+
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def management_session(context: ssl.SSLContext) -> "requests.Session":
+    """requests session whose HTTPS connections use `context` (and are kept alive)"""
+    class _ContextAdapter(requests.adapters.HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["ssl_context"] = context
+            return super().init_poolmanager(*args, **kwargs)
+
+    session = requests.Session()
+    session.mount("https://", _ContextAdapter())
+    return session
+
+
+class TLSContextCache:
+    """SSLContexts per saved connection and protocol.
+
+    Building a context loads certificates, and its session store is what
+    makes resumption work, so contexts outlive service rebuilds until the
+    connection's TLS settings change.
+    """
+
+    def __init__(self):
+        self._contexts: Dict[Tuple[int, str], Tuple[str, ssl.SSLContext]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(connection) -> str:
+        material = "\0".join(str(value) for value in (
+            connection.ssl_ca_cert, connection.ssl_client_cert,
+            connection.ssl_client_key_encrypted, connection.ssl_verify
+        ))
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, connection, protocol: str) -> ssl.SSLContext:
+        """Context for "amqp" or "management"; each keeps its own sessions"""
+        key = (connection.id, protocol)
+        fingerprint = self._fingerprint(connection)
+        with self._lock:
+            cached = self._contexts.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+            client_key = connection.ssl_client_key_encrypted
+            context = build_context(
+                connection.ssl_ca_cert,
+                connection.ssl_client_cert,
+                encryption_service.decrypt(client_key) if client_key else None,
+                connection.ssl_verify is not False
+            )
+            self._contexts[key] = (fingerprint, context)
+            return context
+
+
+# Global TLS context cache instance
+tls_contexts = TLSContextCache()
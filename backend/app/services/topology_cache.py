@@ -0,0 +1,200 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from app.models import ClusterDiscovery
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.metrics import CacheMetrics
+
+# How long a discovered topology is served before the Management API is
+# asked again; 0 re-fetches on every request (ETags still avoid the body)
+TOPOLOGY_CACHE_SECONDS = float(os.getenv("TOPOLOGY_CACHE_SECONDS", "2"))
+# Encoded views kept per connection; views are keyed by the requested vhost,
+# so the least recently served ones are evicted past this
+TOPOLOGY_CACHE_MAX_BODIES = int(os.getenv("TOPOLOGY_CACHE_MAX_BODIES", "64"))
+
+KINDS = ("queues", "exchanges", "vhosts", "users", "bindings")
+# Kinds that belong to a vhost and can be filtered by one
+VHOST_KINDS = ("queues", "exchanges", "bindings")
+
+_MASK = (1 << 64) - 1
+
+
+def _fields(entity) -> tuple:
+    return tuple(tuple(v) if isinstance(v, list) else v for v in entity.__dict__.values())
+
+
+def _flat_fields(entity) -> tuple:
+    return tuple(entity.__dict__.values())
+
+
+def _digest(kind: str, fields: tuple) -> int:
+    return int.from_bytes(hashlib.blake2b(repr((kind, fields)).encode(), digest_size=8).digest(), "big")
+
+
+class TopologySnapshot:
+    """One discovery result plus fingerprints per (kind, vhost) group.
+
+    A group's fingerprint is the sum of its entities' 64-bit digests, so it
+    does not depend on the order the Management API lists them in and is
+    the same on every replica for the same topology.
+    """
+
+    def __init__(self, discovery: ClusterDiscovery, groups: Dict[tuple, Tuple[int, int]],
+                 changed_at: Dict[tuple, float]):
+        self.discovery = discovery
+        self.groups = groups
+        self.changed_at = changed_at
+        self.fetched_at = time.monotonic()
+        # Set on snapshots served past their TTL because the cluster's circuit is open
+        self.stale = False
+
+    def age(self) -> int:
+        return int(time.monotonic() - self.fetched_at)
+
+    def validators(self, kinds: Iterable[str], vhost: Optional[str] = None) -> Tuple[str, float]:
+        """(weak ETag, last-modified epoch seconds) for a view of the snapshot"""
+        fingerprint, count, modified = 0, 0, 0.0
+        for kind in kinds:
+            matched = False
+            for key, (group_sum, group_count) in self.groups.items():
+                if key[0] == kind and (vhost is None or key[1] == vhost):
+                    fingerprint = (fingerprint + group_sum) & _MASK
+                    count += group_count
+                    modified = max(modified, self.changed_at[key])
+                    matched = True
+            if vhost is None or not matched:
+                modified = max(modified, self.changed_at[(kind, None)])
+        return f'W/"{fingerprint:016x}-{count}"', modified
+
+
+class TopologyCache:
+    """Discovery results of one connection, refreshed at most every
+    TOPOLOGY_CACHE_SECONDS and fingerprinted incrementally.
+
+    Entity digests are memoized by field values, so a refresh only hashes
+    entities that were added or changed since the previous one. Encoded
+    response bodies are kept per view and reused while their ETag holds.
+    """
+
+    def __init__(self, discover: Callable[[], ClusterDiscovery], ttl: float = TOPOLOGY_CACHE_SECONDS,
+                 max_bodies: int = TOPOLOGY_CACHE_MAX_BODIES):
+        self.discover = discover
+        self.ttl = ttl
+        self.max_bodies = max_bodies
+        self.snapshot: Optional[TopologySnapshot] = None
+        self._digests: Dict[str, Dict[tuple, int]] = {}
+        self._bodies: "OrderedDict[tuple, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = CacheMetrics("topology")
+        self._body_metrics = CacheMetrics("topology_body")
+
+    def get(self) -> TopologySnapshot:
+        """The current snapshot, re-discovering the cluster once it is stale.
+
+        While the cluster's circuit is open the last snapshot is served
+        (marked stale) instead of failing; without one the error propagates.
+        """
+        snapshot = self.snapshot
+        if snapshot is not None and time.monotonic() - snapshot.fetched_at < self.ttl:
+            self._metrics.hit.inc()
+            return snapshot
+
+        with self._lock:
+            snapshot = self.snapshot
+            if snapshot is not None and time.monotonic() - snapshot.fetched_at < self.ttl:
+                self._metrics.hit.inc()
+                return snapshot
+            self._metrics.miss.inc()
+            try:
+                discovery = self.discover()
+            except CircuitOpenError:
+                if snapshot is None:
+                    raise
+                snapshot.stale = True
+                return snapshot
+            self.snapshot = self._build(discovery, snapshot)
+            return self.snapshot
+
+    def body(self, view: tuple, etag: str, encode: Callable[[], bytes]) -> bytes:
+        """Encoded body of a view, re-encoded only when its ETag changed"""
+        cached = self._bodies.get(view)
+        if cached is not None and cached[0] == etag:
+            self._body_metrics.hit.inc()
+            self._move_to_end(view)
+            return cached[1]
+        self._body_metrics.miss.inc()
+        body = encode()
+        self._bodies[view] = (etag, body)
+        self._move_to_end(view)
+        while len(self._bodies) > self.max_bodies:
+            try:
+                self._bodies.popitem(last=False)
+            except KeyError:
+                break
+        return body
+
+    def _move_to_end(self, view: tuple):
+        # Another request thread may have evicted the view meanwhile
+        try:
+            self._bodies.move_to_end(view)
+        except KeyError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self.snapshot = None
+            self._digests.clear()
+            self._bodies.clear()
+
+    def _build(self, discovery: ClusterDiscovery, previous: Optional[TopologySnapshot]) -> TopologySnapshot:
+        groups: Dict[tuple, Tuple[int, int]] = {}
+        digests: Dict[str, Dict[tuple, int]] = {}
+
+        for kind in KINDS:
+            by_vhost = kind in VHOST_KINDS
+            # Vhost-scoped entities only hold scalars; the others carry tag lists
+            fields_of = _flat_fields if by_vhost else _fields
+            previous_digests = self._digests.get(kind, {})
+            current = digests[kind] = {}
+            sums: Dict[Optional[str], int] = {}
+            counts: Dict[Optional[str], int] = {}
+
+            for entity in getattr(discovery, kind):
+                fields = fields_of(entity)
+                digest = current.get(fields)
+                if digest is None:
+                    digest = previous_digests.get(fields)
+                    if digest is None:
+                        digest = _digest(kind, fields)
+                    current[fields] = digest
+                vhost = entity.vhost if by_vhost else None
+                sums[vhost] = sums.get(vhost, 0) + digest
+                counts[vhost] = counts.get(vhost, 0) + 1
+
+            for vhost, total in sums.items():
+                groups[(kind, vhost)] = (total & _MASK, counts[vhost])
+
+        # Only digests of entities still present are kept for the next refresh
+        self._digests = digests
+
+        now = time.time()
+        changed_at: Dict[tuple, float] = {}
+        for key, group in groups.items():
+            unchanged = previous is not None and previous.groups.get(key) == group
+            changed_at[key] = previous.changed_at[key] if unchanged else now
+        for kind in VHOST_KINDS:
+            # Per-kind stamp; it also moves when a vhost's group disappears
+            unchanged = previous is not None and all(
+                previous.groups.get(key) == group for key, group in groups.items() if key[0] == kind
+            ) and all(key in groups for key in previous.groups if key[0] == kind)
+            changed_at[(kind, None)] = previous.changed_at[(kind, None)] if unchanged else now
+        for kind in KINDS:
+            if (kind, None) not in changed_at:
+                # Kind with no entities at all
+                unchanged = previous is not None and (kind, None) not in previous.groups
+                changed_at[(kind, None)] = previous.changed_at[(kind, None)] if unchanged else now
+
+        return TopologySnapshot(discovery, groups, changed_at)
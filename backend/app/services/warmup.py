@@ -0,0 +1,87 @@
+import asyncio
+import importlib
+import os
+import time
+from typing import Dict, Optional
+
+from app.database import AsyncSessionLocal, DB_POOL_SIZE, prime_async_pool, prime_pool
+from app.services.connection_registry import connection_registry
+from app.services.metrics import WARMUP_SECONDS
+from app.services.session_store import session_store
+
+# Pooled database connections opened before the replica reports ready
+DB_WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", "2"))
+# Delay before retrying a failed warm-up (e.g. database not reachable yet)
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))
+
+# Client stacks imported lazily by the app, loaded here before traffic arrives
+CLIENT_MODULES = ("pika", "requests", "aio_pika", "cryptography.fernet")
+
+
+class Readiness:
+    """Warm-up progress reported by /ready"""
+
+    def __init__(self):
+        self.ready = False
+        self.started = time.monotonic()
+        self.steps: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.connections = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "steps_ms": {name: round(seconds * 1000, 1) for name, seconds in self.steps.items()},
+            "connections_loaded": self.connections,
+            "error": self.error,
+        }
+
+
+async def _load_client_modules():
+    for name in CLIENT_MODULES:
+        await asyncio.to_thread(importlib.import_module, name)
+
+
+async def _prime_database():
+    count = min(DB_WARM_CONNECTIONS, DB_POOL_SIZE)
+    if count > 0:
+        await asyncio.to_thread(prime_pool, count)
+        await prime_async_pool(count)
+
+
+async def _load_registry(readiness: Readiness):
+    async with AsyncSessionLocal() as db:
+        readiness.connections = await connection_registry.preload_async(db)
+
+
+async def warm_up(readiness: Readiness):
+    """Prime pools, caches and imports, then mark the replica ready.
+
+    Retries until it succeeds so a replica started before its database
+    simply stays unready instead of crashing.
+    """
+    steps = (
+        ("client_modules", _load_client_modules),
+        ("database_pool", _prime_database),
+        ("connection_registry", lambda: _load_registry(readiness)),
+        ("session_store", session_store.replica_loads),
+    )
+    while True:
+        try:
+            for name, step in steps:
+                start = time.perf_counter()
+                await step()
+                readiness.steps[name] = time.perf_counter() - start
+            break
+        except Exception as e:
+            readiness.error = f"{name}: {str(e)}"
+            print(f"Warm-up failed, retrying: {readiness.error}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+    readiness.error = None
+    readiness.ready = True
+    WARMUP_SECONDS.set(time.monotonic() - readiness.started)
+
+
+# Global readiness state
+readiness = Readiness()
@@ -0,0 +1,290 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from app.database import AsyncSessionLocal, WatchRule as DBWatchRule
+from app.models import WatchEvent
+from app.services.connection_registry import connection_registry
+from app.services.lazy_import import lazy_import
+from app.services.metrics import WATCH_EVALUATIONS, WATCH_EVENTS
+from app.services.rabbitmq_service import QueueStats
+from app.services.serialization import dumps
+from app.services.session_store import REPLICA_ID, SessionStore, session_store
+
+requests = lazy_import("requests")
+
+# Interval between Management API polls of connections that have rules
+WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "10"))
+WATCH_WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WATCH_WEBHOOK_TIMEOUT_SECONDS", "5"))
+# Events buffered per WebSocket subscriber before the oldest are dropped
+WATCH_SUBSCRIBER_BUFFER = int(os.getenv("WATCH_SUBSCRIBER_BUFFER", "1000"))
+
+_GLOB_CHARS = set("*?[")
+
+
+def _observe(condition: str, threshold: float, stats: QueueStats) -> Tuple[bool, float]:
+    """(firing, observed value) of a condition for one queue"""
+    if condition == "depth_above":
+        return stats.messages > threshold, float(stats.messages)
+    if condition == "no_consumers":
+        return stats.consumers == 0, float(stats.consumers)
+    if condition == "rate_imbalance":
+        imbalance = (stats.publish_rate or 0.0) - (stats.deliver_rate or 0.0)
+        return imbalance > threshold, round(imbalance, 3)
+    # not_running
+    return stats.state != "running", 0.0 if stats.state == "running" else 1.0
+
+
+class RuleIndex:
+    """Maps a queue to the rules that watch it.
+
+    Exact queue names are dict lookups; glob patterns are grouped by vhost
+    and matched once per queue, then memoized until the rules change.
+    """
+
+    def __init__(self, rules: Iterable[DBWatchRule]):
+        self.exact: Dict[tuple, List[DBWatchRule]] = defaultdict(list)
+        self.patterns: Dict[Optional[str], List[Tuple[str, DBWatchRule]]] = defaultdict(list)
+        for rule in rules:
+            pattern = rule.queue_pattern or "*"
+            if _GLOB_CHARS.intersection(pattern):
+                self.patterns[rule.vhost].append((pattern, rule))
+            else:
+                self.exact[(rule.vhost, pattern)].append(rule)
+        self._memo: Dict[tuple, tuple] = {}
+
+    def rules_for(self, vhost: str, name: str) -> tuple:
+        key = (vhost, name)
+        rules = self._memo.get(key)
+        if rules is None:
+            rules = (
+                self.exact.get(key, []) + self.exact.get((None, name), []) +
+                [rule for pattern, rule in self.patterns.get(vhost, []) + self.patterns.get(None, [])
+                 if fnmatchcase(name, pattern)]
+            )
+            rules = self._memo[key] = tuple(rules)
+        return rules
+
+    def forget(self, vhost: str, name: str):
+        self._memo.pop((vhost, name), None)
+
+
+class ConnectionWatch:
+    """Rule state of one connection between polls"""
+
+    def __init__(self, connection_id: int, rules: List[DBWatchRule]):
+        self.connection_id = connection_id
+        self.signature = None
+        self.index = RuleIndex([])
+        self.last: Dict[tuple, QueueStats] = {}
+        self.firing: Dict[tuple, WatchEvent] = {}
+        self.set_rules(rules)
+
+    @staticmethod
+    def _signature(rules: List[DBWatchRule]) -> tuple:
+        return tuple(sorted((rule.id, rule.updated_at) for rule in rules))
+
+    def set_rules(self, rules: List[DBWatchRule]) -> bool:
+        """Swap in a new rule set; returns False when nothing changed"""
+        signature = self._signature(rules)
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        self.index = RuleIndex(rules)
+        self.rules = {rule.id: rule for rule in rules}
+        # Alerts of deleted rules are dropped; every queue is re-evaluated
+        self.firing = {key: event for key, event in self.firing.items() if key[0] in self.rules}
+        self.last = {}
+        return True
+
+    def _event(self, state: str, rule: DBWatchRule, stats: QueueStats, value: float) -> WatchEvent:
+        return WatchEvent(
+            state=state,
+            rule_id=rule.id,
+            rule_name=rule.name,
+            connection_id=self.connection_id,
+            vhost=stats.vhost,
+            queue=stats.name,
+            condition=rule.condition,
+            threshold=rule.threshold or 0.0,
+            value=value,
+            at=datetime.utcnow()
+        )
+
+    def evaluate(self, queues: List[QueueStats]) -> List[Tuple[WatchEvent, Optional[str]]]:
+        """Apply the rules to queues that changed since the last poll.
+
+        Returns (event, webhook_url) for each firing/resolved transition.
+        """
+        events = []
+        current: Dict[tuple, QueueStats] = {}
+        evaluated = 0
+
+        for stats in queues:
+            key = (stats.vhost, stats.name)
+            current[key] = stats
+            if self.last.get(key) == stats:
+                continue
+            evaluated += 1
+            for rule in self.index.rules_for(*key):
+                firing, value = _observe(rule.condition, rule.threshold or 0.0, stats)
+                alert_key = (rule.id,) + key
+                if firing and alert_key not in self.firing:
+                    event = self.firing[alert_key] = self._event("firing", rule, stats, value)
+                    events.append((event, rule.webhook_url))
+                elif not firing and alert_key in self.firing:
+                    del self.firing[alert_key]
+                    events.append((self._event("resolved", rule, stats, value), rule.webhook_url))
+
+        # Deleted queues resolve their alerts
+        for key in self.last.keys() - current.keys():
+            for rule in self.index.rules_for(*key):
+                event = self.firing.pop((rule.id,) + key, None)
+                if event is not None:
+                    resolved = event.model_copy(update={"state": "resolved", "at": datetime.utcnow()})
+                    events.append((resolved, rule.webhook_url))
+            self.index.forget(*key)
+
+        self.last = current
+        WATCH_EVALUATIONS.inc(evaluated)
+        return events
+
+
+class WatchService:
+    """Polls connections that have watch rules and pushes alert transitions.
+
+    One poller per replica replaces per-tab discovery polling. Webhooks are
+    only sent by the lowest-named live replica so each transition is
+    delivered once; other replicas poll only while they have WebSocket
+    subscribers of their own.
+    """
+
+    def __init__(self, poll_seconds: float = WATCH_POLL_SECONDS, store: SessionStore = session_store,
+                 replica_id: str = REPLICA_ID):
+        self.poll_seconds = poll_seconds
+        self.store = store
+        self.replica_id = replica_id
+        self.watches: Dict[int, ConnectionWatch] = {}
+        self.subscribers: Dict[asyncio.Queue, Optional[int]] = {}
+        self._wake: Optional[asyncio.Event] = None
+
+    def wake(self):
+        """Poll now instead of waiting for the interval (e.g. after a rule change)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    def subscribe(self, connection_id: Optional[int] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=WATCH_SUBSCRIBER_BUFFER)
+        self.subscribers[queue] = connection_id
+        for event in self.alerts(connection_id):
+            queue.put_nowait(event)
+        if len(self.subscribers) == 1:
+            self.wake()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.pop(queue, None)
+
+    def alerts(self, connection_id: Optional[int] = None) -> List[WatchEvent]:
+        """Alerts currently firing on this replica"""
+        return [
+            event for watch in self.watches.values()
+            if connection_id is None or watch.connection_id == connection_id
+            for event in watch.firing.values()
+        ][:WATCH_SUBSCRIBER_BUFFER]
+
+    async def _is_leader(self) -> bool:
+        replicas = await self.store.replica_loads()
+        return not replicas or min(replicas) == self.replica_id
+
+    async def _load_rules(self) -> Dict[int, List[DBWatchRule]]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(DBWatchRule).where(DBWatchRule.is_active == True)
+            )).scalars().all()
+        rules = defaultdict(list)
+        for row in rows:
+            rules[row.connection_id].append(row)
+        return rules
+
+    async def _poll_connection(self, watch: ConnectionWatch) -> List[tuple]:
+        async with AsyncSessionLocal() as db:
+            rabbitmq_service = await connection_registry.get_service_async(db, watch.connection_id)
+        if rabbitmq_service is None:
+            return []
+        queues = await asyncio.to_thread(rabbitmq_service.get_queue_stats)
+        return watch.evaluate(queues)
+
+    async def poll(self, send_webhooks: bool = True):
+        """Reload rules, poll every watched connection and publish transitions"""
+        rules = await self._load_rules()
+        for connection_id in list(self.watches):
+            if connection_id not in rules:
+                del self.watches[connection_id]
+        for connection_id, connection_rules in rules.items():
+            watch = self.watches.get(connection_id)
+            if watch is None:
+                self.watches[connection_id] = ConnectionWatch(connection_id, connection_rules)
+            else:
+                watch.set_rules(connection_rules)
+
+        watches = list(self.watches.values())
+        results = await asyncio.gather(*(self._poll_connection(watch) for watch in watches), return_exceptions=True)
+
+        webhooks = []
+        for watch, result in zip(watches, results):
+            if isinstance(result, Exception):
+                print(f"Watch poll failed for connection {watch.connection_id}: {str(result)}")
+                continue
+            for event, webhook_url in result:
+                WATCH_EVENTS.labels(event=event.state).inc()
+                self._publish(event)
+                if webhook_url and send_webhooks:
+                    webhooks.append(asyncio.to_thread(self._post_webhook, webhook_url, event))
+        await asyncio.gather(*webhooks)
+
+    def _publish(self, event: WatchEvent):
+        for queue, connection_id in list(self.subscribers.items()):
+            if connection_id is not None and connection_id != event.connection_id:
+                continue
+            # Slow viewers lose the oldest events rather than stall the poller
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @staticmethod
+    def _post_webhook(url: str, event: WatchEvent):
+        try:
+            response = requests.post(url, data=dumps(event), timeout=WATCH_WEBHOOK_TIMEOUT_SECONDS,
+                                     headers={"Content-Type": "application/json"})
+            response.raise_for_status()
+        except Exception as e:
+            WATCH_EVENTS.labels(event="webhook_failed").inc()
+            print(f"Watch webhook to {url} failed: {str(e)}")
+
+    async def run(self):
+        """Background loop started with the application"""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                leader = await self._is_leader()
+                if leader or self.subscribers:
+                    await self.poll(send_webhooks=leader)
+                else:
+                    self.watches.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Watch poll failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+# Global watch service instance
+watch_service = WatchService()
@@ -0,0 +1,71 @@
+import os
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import OP_BINARY, OP_TEXT
+from websockets.server import WebSocketServerProtocol
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+
+# permessage-deflate tuning for the consumer WebSocket
+WS_DEFLATE_ENABLED = os.getenv("WS_DEFLATE_ENABLED", "true").lower() == "true"
+WS_DEFLATE_PATH_PREFIX = os.getenv("WS_DEFLATE_PATH_PREFIX", "/api/consumer/consume/")
+WS_DEFLATE_LEVEL = int(os.getenv("WS_DEFLATE_LEVEL", "6"))
+# zlib window (2**bits bytes) and memLevel set the per-connection memory cost:
+# roughly 2**(bits + 2) + 2**(mem_level + 9) bytes for the compressor
+WS_DEFLATE_WINDOW_BITS = int(os.getenv("WS_DEFLATE_WINDOW_BITS", "13"))
+WS_DEFLATE_MEM_LEVEL = int(os.getenv("WS_DEFLATE_MEM_LEVEL", "6"))
+# Context takeover lets each frame reference earlier ones, which is where
+# most of the gain on repetitive JSON comes from; disable to save memory
+WS_DEFLATE_CONTEXT_TAKEOVER = os.getenv("WS_DEFLATE_CONTEXT_TAKEOVER", "true").lower() == "true"
+# Frames smaller than this are sent uncompressed
+WS_DEFLATE_MIN_SIZE = int(os.getenv("WS_DEFLATE_MIN_SIZE", "128"))
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves small messages uncompressed.
+
+    RFC 7692 allows this per message (RSV1 unset); with context takeover the
+    compressor simply never sees the skipped message.
+    """
+
+    min_size = 0
+
+    def encode(self, frame):
+        if frame.fin and frame.opcode in (OP_TEXT, OP_BINARY) and len(frame.data) < self.min_size:
+            return frame
+        return super().encode(frame)
+
+
+class TunedDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, min_size: int = WS_DEFLATE_MIN_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        extension.__class__ = ThresholdPerMessageDeflate
+        extension.min_size = self.min_size
+        return response_params, extension
+
+
+def consumer_deflate_factory(level: int = WS_DEFLATE_LEVEL, window_bits: int = WS_DEFLATE_WINDOW_BITS,
+                             mem_level: int = WS_DEFLATE_MEM_LEVEL,
+                             context_takeover: bool = WS_DEFLATE_CONTEXT_TAKEOVER,
+                             min_size: int = WS_DEFLATE_MIN_SIZE) -> TunedDeflateFactory:
+    return TunedDeflateFactory(
+        min_size=min_size,
+        server_no_context_takeover=not context_takeover,
+        server_max_window_bits=window_bits,
+        compress_settings={"level": level, "memLevel": mem_level},
+    )
+
+
+class TunedWebSocketProtocol(WebSocketProtocol):
+    """uvicorn's websockets protocol with tuned permessage-deflate on the
+    consumer endpoint; other paths keep uvicorn's default negotiation"""
+
+    consumer_extensions = [consumer_deflate_factory()] if WS_DEFLATE_ENABLED else []
+
+    def process_extensions(self, headers, available_extensions):
+        # self.scope is filled in by process_request, which runs first
+        if self.scope and self.scope["path"].startswith(WS_DEFLATE_PATH_PREFIX):
+            available_extensions = self.consumer_extensions
+        return WebSocketServerProtocol.process_extensions(headers, available_extensions)
@@ -1,65 +1,193 @@
 from fastapi import WebSocket
 import asyncio
-import aio_pika
+import math
+import os
+import time
+import uuid
 from datetime import datetime
-import json
 from typing import Dict, Optional
+from app.models import ConsumerSessionInfo
+from app.services.admission import client_of
+from app.services.audit import AUDIT_MAX_MESSAGE_IDS, audit_log
+from app.services.capture import capture_properties, capture_store
+from app.services.decoders import PayloadDecoder, default_decoder
 from app.services.rabbitmq_service import RabbitMQService
+from app.services.serialization import dumps_text
+from app.services.metrics import ACTIVE_CONSUMERS, WEBSOCKET_MESSAGES, WEBSOCKET_SEND_QUEUE_DEPTH
+from app.services.lazy_import import lazy_import
+from app.services.session_store import (
+    SessionStore, session_store, REPLICA_ID, SESSION_HEARTBEAT_SECONDS
+)
+
+aio_pika = lazy_import("aio_pika")
+
+# Extra consumers a replica may hold above its fair share before it turns
+# new WebSocket sessions away so the load balancer retries elsewhere
+CONSUMER_BALANCE_SLACK = int(os.getenv("CONSUMER_BALANCE_SLACK", "2"))
+
+
+async def open_queue_consumer(rabbitmq_service: RabbitMQService, queue_name: str, callback,
+                              prefetch_count: int = 1, no_ack: bool = False, vhost: str = None):
+    """Connect with aio-pika and start consuming an existing queue.
+
+    Returns the connection; closing it stops the consumer.
+    """
+    connection = await rabbitmq_service.connect_async(vhost)
+    try:
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=prefetch_count)
+
+        # Declare queue (passive=True means we only check if it exists)
+        queue = await channel.declare_queue(queue_name, passive=True)
+        await queue.consume(callback, no_ack=no_ack)
+    except Exception:
+        await connection.close()
+        raise
+    return connection
+
 
 class RabbitMQConsumerManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
-        self.active_consumers: Dict[int, asyncio.Task] = {}
+    def __init__(self, store: SessionStore = session_store, replica_id: str = REPLICA_ID):
+        self.store = store
+        self.replica_id = replica_id
+        self.active_connections: Dict[str, WebSocket] = {}
+        self.active_consumers: Dict[str, asyncio.Task] = {}
+        self.connection_ids: Dict[str, int] = {}
+
+    async def has_capacity(self) -> bool:
+        """Whether this replica should take another consumer.
+
+        Compares the local consumer count with the fair share across live
+        replicas; store errors fail open so consuming keeps working.
+        """
+        try:
+            loads = await self.store.replica_loads()
+        except Exception as e:
+            print(f"Session store unavailable: {str(e)}")
+            return True
+        loads[self.replica_id] = len(self.active_connections)
+        if len(loads) < 2:
+            return True
+        fair_share = math.ceil((sum(loads.values()) + 1) / len(loads))
+        return len(self.active_connections) + 1 <= fair_share + CONSUMER_BALANCE_SLACK
 
-    async def connect(self, websocket: WebSocket, connection_id: int):
-        """Establish WebSocket connection"""
+    async def connect(self, websocket: WebSocket, connection_id: int) -> str:
+        """Establish WebSocket connection and return its consumer id"""
         await websocket.accept()
-        self.active_connections[connection_id] = websocket
+        consumer_id = uuid.uuid4().hex
+        self.active_connections[consumer_id] = websocket
+        self.connection_ids[consumer_id] = connection_id
+        return consumer_id
 
-    def disconnect(self, connection_id: int):
-        """Remove WebSocket connection and stop consumer"""
-        self.active_connections.pop(connection_id, None)
-        if connection_id in self.active_consumers:
-            self.active_consumers[connection_id].cancel()
-            self.active_consumers.pop(connection_id)
+    async def disconnect(self, consumer_id: str):
+        """Remove WebSocket connection, stop consumer and deregister it"""
+        self.active_connections.pop(consumer_id, None)
+        self.connection_ids.pop(consumer_id, None)
+        if consumer_id in self.active_consumers:
+            self.active_consumers[consumer_id].cancel()
+            self.active_consumers.pop(consumer_id)
+        try:
+            await self.store.remove(consumer_id)
+        except Exception as e:
+            print(f"Failed to deregister consumer {consumer_id}: {str(e)}")
 
-    async def consume(self, connection_id: int, queue_name: str, rabbitmq_service: RabbitMQService):
-        """Start consuming messages from RabbitMQ queue"""
+    async def stop(self, consumer_id: str) -> bool:
+        """Stop a consumer owned by this replica and close its WebSocket"""
+        websocket = self.active_connections.pop(consumer_id, None)
+        if websocket is None:
+            return False
         try:
-            # Get connection parameters
-            params = rabbitmq_service.get_connection_params()
-            
-            # Create asynchronous connection
-            connection = await aio_pika.connect_robust(
-                host=params.host,
-                port=params.port,
-                login=params.credentials.username,
-                password=params.credentials.password,
-                virtualhost=params.virtual_host
-            )
-
-            # Create channel
-            channel = await connection.channel()
-            await channel.set_qos(prefetch_count=1)
-
-            # Declare queue (passive=True means we only check if it exists)
-            queue = await channel.declare_queue(queue_name, passive=True)
+            await websocket.close(code=1000, reason="Consumer stopped")
+        except Exception:
+            pass
+        return True
+
+    async def run_heartbeat(self):
+        """Publish this replica's load and apply stop requests routed to it"""
+        while True:
+            try:
+                stops = await self.store.heartbeat(self.replica_id, len(self.active_connections))
+                for consumer_id in stops:
+                    await self.stop(consumer_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Session heartbeat failed: {str(e)}")
+            await asyncio.sleep(SESSION_HEARTBEAT_SECONDS)
+
+    async def shutdown(self):
+        """Close all local consumers (they reconnect to another replica)"""
+        for consumer_id in list(self.active_connections):
+            await self.stop(consumer_id)
+            await self.disconnect(consumer_id)
+
+    async def consume(self, consumer_id: str, queue_name: str, rabbitmq_service: RabbitMQService,
+                      decoder: PayloadDecoder = default_decoder, capture: Optional[str] = None):
+        """Start consuming messages from RabbitMQ queue, optionally
+        recording them to the named capture"""
+        writer = None
+        # Acked messages not yet in the audit log; recorded once per second
+        consumed = {"count": 0, "message_ids": []}
+        client = None
+        connection_id = self.connection_ids.get(consumer_id)
+
+        async def audit_consumed():
+            count, message_ids = consumed["count"], consumed["message_ids"]
+            if count and connection_id is not None:
+                consumed["count"], consumed["message_ids"] = 0, []
+                await audit_log.record(
+                    "websocket_consume", connection_id, client, vhost=rabbitmq_service.vhost,
+                    queue=queue_name, message_count=count, message_ids=message_ids
+                )
+
+        try:
+            if connection_id is None:
+                connection_id = rabbitmq_service.connection.id
+            websocket = self.active_connections.get(consumer_id)
+            client = client_of(websocket) if websocket else None
+            await self.store.register(ConsumerSessionInfo(
+                id=consumer_id,
+                replica_id=self.replica_id,
+                connection_id=connection_id,
+                queue=queue_name,
+                vhost=rabbitmq_service.vhost,
+                started_at=datetime.utcnow()
+            ))
+            if capture:
+                writer = await asyncio.to_thread(capture_store.open_writer, capture, {
+                    "connection_id": connection_id,
+                    "queue": queue_name,
+                    "vhost": rabbitmq_service.vhost,
+                    "consumer_id": consumer_id
+                })
 
             async def process_message(message: aio_pika.IncomingMessage):
                 """Process each received message"""
                 async with message.process():
-                    websocket = self.active_connections.get(connection_id)
+                    consumed["count"] += 1
+                    if len(consumed["message_ids"]) < AUDIT_MAX_MESSAGE_IDS:
+                        consumed["message_ids"].append(message.message_id)
+                    if writer is not None:
+                        writer.append(time.time(), {
+                            "queue": queue_name,
+                            "exchange": message.exchange,
+                            "routing_key": message.routing_key,
+                            "properties": capture_properties(message)
+                        }, message.body)
+                        if writer.should_flush():
+                            await asyncio.to_thread(writer.flush)
+                    websocket = self.active_connections.get(consumer_id)
                     if websocket:
                         try:
-                            body = message.body.decode()
-                            # Try to parse JSON if the message is JSON formatted
-                            try:
-                                body = json.loads(body)
-                            except json.JSONDecodeError:
-                                pass  # Keep body as string if not JSON
+                            # Large payloads are decoded off the event loop
+                            decoded = await decoder.decode_async(
+                                message.body, message.content_type, message.headers
+                            )
 
                             msg_data = {
-                                "body": body,
+                                "body": decoded.value,
+                                "body_decoder": decoded.codec,
+                                "body_decode_error": decoded.error,
                                 "routing_key": message.routing_key,
                                 "exchange": message.exchange,
                                 "properties": {
@@ -79,23 +207,38 @@ class RabbitMQConsumerManager:
                                 },
                                 "received_timestamp": datetime.utcnow().isoformat()
                             }
-                            await websocket.send_json(msg_data)
+                            WEBSOCKET_SEND_QUEUE_DEPTH.inc()
+                            try:
+                                await websocket.send_text(dumps_text(msg_data))
+                            finally:
+                                WEBSOCKET_SEND_QUEUE_DEPTH.dec()
+                            WEBSOCKET_MESSAGES.inc()
                         except Exception as e:
                             await websocket.send_json({"error": f"Error processing message: {str(e)}"})
 
             # Start consuming
-            consumer_tag = await queue.consume(process_message)
+            connection = await open_queue_consumer(rabbitmq_service, queue_name, process_message)
+            ACTIVE_CONSUMERS.inc()
             
             # Keep connection alive until disconnect
-            while connection_id in self.active_connections:
-                await asyncio.sleep(1)
+            try:
+                while consumer_id in self.active_connections:
+                    await asyncio.sleep(1)
+                    if writer is not None and writer.pending_bytes:
+                        await asyncio.to_thread(writer.flush)
+                    await audit_consumed()
+            finally:
+                ACTIVE_CONSUMERS.dec()
 
         except Exception as e:
-            websocket = self.active_connections.get(connection_id)
+            websocket = self.active_connections.get(consumer_id)
             if websocket:
                 await websocket.send_json({"error": f"Consumer error: {str(e)}"})
         finally:
             # Cleanup
             if 'connection' in locals():
                 await connection.close()
-            self.disconnect(connection_id)
+            if writer is not None:
+                await asyncio.to_thread(capture_store.close_writer, capture)
+            await audit_consumed()
+            await self.disconnect(consumer_id)
@@ -0,0 +1,101 @@
+"""Latency an audit trail adds to publish/consume calls, and writer throughput.
+
+Records events the way the publish and consume routes do, from concurrent
+callers, and compares:
+
+  - inline: every event inserted and committed before the caller continues
+  - buffered: AuditLog.record, with the background writer inserting batches
+
+Both report per-call latency; buffered also reports drops (buffer full
+after the backpressure wait) and how long the writer takes to catch up.
+
+    cd backend
+    python -m benchmarks.bench_audit --events 20000 --concurrency 20
+
+DATABASE_URL may point at Postgres; it defaults to a throwaway SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="bench-audit-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("ENCRYPTION_KEY", "benchmark-key")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import AsyncSessionLocal, AuditEvent, ensure_schema  # noqa: E402
+from app.services.audit import AuditLog  # noqa: E402
+from app.services.serialization import dumps_text  # noqa: E402
+from benchmarks.common import summarize, write_results  # noqa: E402
+
+
+async def inline_record(operation: str, connection_id: int, message_ids=(), **fields):
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(AuditEvent).values(
+            operation=operation, connection_id=connection_id, message_ids=dumps_text(list(message_ids)), **fields
+        ))
+        await db.commit()
+
+
+async def callers(record, events: int, concurrency: int):
+    durations = []
+    per_caller = events // concurrency
+
+    async def caller(index: int):
+        for i in range(per_caller):
+            start = time.perf_counter()
+            await record("publish", 1, client=f"10.0.0.{index}", exchange="", routing_key="orders",
+                         message_ids=[f"{index}-{i}"])
+            durations.append(time.perf_counter() - start)
+            # Stand-in for the rest of the request
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(caller(index) for index in range(concurrency)))
+    return durations
+
+
+async def run_inline(events: int, concurrency: int):
+    started = time.perf_counter()
+    durations = await callers(inline_record, events, concurrency)
+    return summarize("inline", durations, len(durations), elapsed_seconds=round(time.perf_counter() - started, 3))
+
+
+async def run_buffered(events: int, concurrency: int, buffer_size: int, batch_size: int):
+    audit = AuditLog(buffer_size=buffer_size, batch_size=batch_size, enabled=True)
+    writer = asyncio.create_task(audit.run())
+    started = time.perf_counter()
+    durations = await callers(audit.record, events, concurrency)
+    recorded = time.perf_counter() - started
+    audit.stop()
+    await writer
+    return summarize(
+        f"buffered[buffer={buffer_size},batch={batch_size}]", durations, len(durations),
+        elapsed_seconds=round(recorded, 3),
+        drain_seconds=round(time.perf_counter() - started - recorded, 3),
+        written=audit.written,
+        dropped=audit.dropped
+    )
+
+
+def main(args):
+    ensure_schema()
+    results = [asyncio.run(run_inline(args.events, args.concurrency))]
+    for buffer_size in [int(s) for s in args.buffer_sizes.split(",")]:
+        results.append(asyncio.run(run_buffered(args.events, args.concurrency, buffer_size, args.batch_size)))
+    write_results("audit", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000, help="Events recorded per variant")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent callers")
+    parser.add_argument("--buffer-sizes", default="1000,10000", help="AUDIT_BUFFER_SIZE values to compare")
+    parser.add_argument("--batch-size", type=int, default=500, help="AUDIT_BATCH_SIZE")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    main(parser.parse_args())
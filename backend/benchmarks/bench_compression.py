@@ -0,0 +1,124 @@
+"""Bandwidth and CPU cost of response and WebSocket compression.
+
+For discovery payloads of several sizes, reports the encoded size, ratio
+and encode/decode time of identity, gzip and brotli at a few levels. For
+consumer WebSocket frames, reports bytes and CPU per message through the
+tuned permessage-deflate extension with and without context takeover and
+across window sizes:
+
+    cd backend
+    python -m benchmarks.bench_compression --entities 1000,10000 --frames 2000
+"""
+import argparse
+import os
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websockets.frames import Frame, OP_TEXT  # noqa: E402
+
+from app.services.compression import _brotli  # noqa: E402
+from app.services.serialization import dumps, dumps_text  # noqa: E402
+from app.websockets.compression import consumer_deflate_factory  # noqa: E402
+from benchmarks.bench_serialization import build_discovery, websocket_frames  # noqa: E402
+from benchmarks.common import Timer, summarize, write_results  # noqa: E402
+from benchmarks.stubs import synthesize_topology  # noqa: E402
+
+
+def codecs(brotli):
+    yield "identity", lambda data: data, lambda data: data
+    for level in (1, 6, 9):
+        yield (f"gzip-{level}",
+               lambda data, level=level: _gzip(data, level),
+               lambda data: zlib.decompress(data, zlib.MAX_WBITS | 16))
+    if brotli is not None:
+        for quality in (1, 4, 6, 9):
+            yield (f"br-{quality}",
+                   lambda data, quality=quality: brotli.compress(data, quality=quality, mode=brotli.MODE_TEXT),
+                   brotli.decompress)
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return compressor.compress(data) + compressor.flush()
+
+
+def timed(iterations: int, fn, arg):
+    durations, result = [], None
+    for _ in range(iterations):
+        with Timer() as t:
+            result = fn(arg)
+        durations.append(t.elapsed)
+    return durations, result
+
+
+def bench_responses(entities: int, iterations: int, brotli):
+    topology = synthesize_topology(queues=entities // 2, bindings=entities // 2)
+    payload = dumps(build_discovery(topology, True))
+    results = []
+    for name, encode, decode in codecs(brotli):
+        encode_times, encoded = timed(iterations, encode, payload)
+        decode_times, decoded = timed(iterations, decode, encoded)
+        assert decoded == payload
+        result = summarize(f"response[{name}]", encode_times, len(encode_times), entities=entities,
+                           bytes=len(encoded), ratio=round(len(payload) / len(encoded), 2))
+        result["encode_ms"] = round(min(encode_times) * 1000, 3)
+        result["decode_ms"] = round(min(decode_times) * 1000, 3)
+        results.append(result)
+    return results
+
+
+def bench_frames(count: int, iterations: int):
+    frames = [dumps_text(frame).encode() for frame in websocket_frames(count)]
+    raw_bytes = sum(len(frame) for frame in frames)
+    variants = [("off", None)]
+    for takeover in (True, False):
+        for window_bits in (9, 13, 15):
+            label = f"deflate-w{window_bits}-{'takeover' if takeover else 'no_takeover'}"
+            variants.append((label, dict(window_bits=window_bits, context_takeover=takeover)))
+
+    results = []
+    for label, settings in variants:
+        durations, sent = [], 0
+        for _ in range(iterations):
+            if settings is None:
+                encode = None
+            else:
+                # A fresh extension per run, as negotiated for a new connection
+                _, extension = consumer_deflate_factory(min_size=0, **settings).process_request_params([], [])
+                encode = extension.encode
+            sent = 0
+            with Timer() as t:
+                for data in frames:
+                    frame = Frame(OP_TEXT, data)
+                    if encode is not None:
+                        frame = encode(frame)
+                    sent += len(frame.data)
+            durations.append(t.elapsed)
+        result = summarize(f"websocket[{label}]", durations, count * len(durations), frames=count,
+                           bytes_per_msg=round(sent / count, 1), ratio=round(raw_bytes / sent, 2))
+        result["us_per_msg"] = round(min(durations) * 1e6 / count, 2)
+        results.append(result)
+    return results
+
+
+def main(args):
+    brotli = _brotli()
+    if brotli is None:
+        print("brotli is not installed; skipping br codecs")
+
+    results = []
+    for entities in [int(v) for v in args.entities.split(",") if v]:
+        results.extend(bench_responses(entities, args.iterations, brotli))
+    results.extend(bench_frames(args.frames, args.iterations))
+    write_results("compression", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", default="1000,10000", help="Entities per discovery payload")
+    parser.add_argument("--frames", type=int, default=2000, help="Consumer frames per WebSocket run")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    main(parser.parse_args())
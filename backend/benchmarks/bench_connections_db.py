@@ -0,0 +1,130 @@
+"""Concurrent list/get throughput of the connections API.
+
+Compares the AsyncSession-backed routes in app.api.connections against a
+baseline that runs the same queries on the synchronous Session inside
+`async def` routes (the previous implementation).
+
+    cd backend
+    python -m benchmarks.bench_connections_db --concurrency 50 --requests 2000
+
+DATABASE_URL may point at Postgres to benchmark the tuned pool; it defaults
+to a throwaway SQLite file. The sync baseline is capped at the pool capacity:
+beyond it, a checkout blocks the event loop while the sessions holding
+connections wait on that same loop, and the run stalls until pool_timeout.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="bench-db-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("ENCRYPTION_KEY", "benchmark-key")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.api import connections  # noqa: E402
+from app.database import (  # noqa: E402
+    Base, SessionLocal, engine, get_db, RabbitMQConnection as DBConnection,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
+from app.services.encryption import encryption_service  # noqa: E402
+from benchmarks.common import Timer, summarize, write_results  # noqa: E402
+
+
+def build_apps():
+    async_app = FastAPI()
+    async_app.include_router(connections.router, prefix="/api/connections")
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/api/connections/")
+    async def list_sync(db: Session = Depends(get_db)):
+        rows = db.query(DBConnection).filter(DBConnection.is_active == True).all()
+        return [{"id": r.id, "name": r.name, "host": r.host} for r in rows]
+
+    @sync_app.get("/api/connections/{connection_id}")
+    async def get_sync(connection_id: int, db: Session = Depends(get_db)):
+        row = db.query(DBConnection).filter(
+            DBConnection.id == connection_id,
+            DBConnection.is_active == True
+        ).first()
+        return {"id": row.id, "name": row.name, "host": row.host}
+
+    return {"async": async_app, "sync": sync_app}
+
+
+def seed(count: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(DBConnection).count() >= count:
+            return
+        password = encryption_service.encrypt("guest")
+        for i in range(count):
+            db.add(DBConnection(
+                name=f"bench-{i}",
+                host=f"rabbit-{i}.example",
+                username="guest",
+                password_encrypted=password
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_load(app, path_for, total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                with Timer() as t:
+                    response = await client.get(path_for(i))
+                response.raise_for_status()
+                latencies.append(t.elapsed)
+
+        with Timer() as wall:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return latencies, wall.elapsed
+
+
+async def main(args):
+    seed(args.connections)
+    results = []
+    for variant, app in build_apps().items():
+        concurrency = args.concurrency
+        if variant == "sync":
+            concurrency = min(concurrency, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+        for operation, path_for in (
+            ("list", lambda i: "/api/connections/"),
+            ("get", lambda i: f"/api/connections/{i % args.connections + 1}"),
+        ):
+            latencies, wall = await run_load(app, path_for, args.requests, concurrency)
+            result = summarize(
+                f"connections_{operation}_{variant}",
+                latencies,
+                len(latencies),
+                concurrency=concurrency,
+                connections=args.connections,
+            )
+            result["ops_per_second"] = round(len(latencies) / wall, 2)
+            results.append(result)
+    write_results("connections_db", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    asyncio.run(main(parser.parse_args()))
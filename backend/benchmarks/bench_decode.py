@@ -0,0 +1,85 @@
+"""Payload decode cost per codec and event-loop stalls with and without offloading.
+
+Decodes batches of messages the way the WebSocket consumer does
+(PayloadDecoder.decode_async) while a ticker task measures how late the
+event loop wakes it up:
+
+  - inline: every payload decoded on the event loop
+  - thread / process: payloads of DECODE_OFFLOAD_BYTES or more run in the
+    decode executor
+
+    cd backend
+    python -m benchmarks.bench_decode --sizes 1024,65536,1048576 --messages 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import decoders  # noqa: E402
+from app.services.serialization import dumps  # noqa: E402
+from benchmarks.common import percentile, summarize, write_results  # noqa: E402
+
+TICK_SECONDS = 0.001
+
+
+def payloads(size: int):
+    """(codec, content_type, body) of a record list about `size` bytes long"""
+    records = [{"id": i, "name": f"item-{i}", "tags": ["a", "b"], "price": i * 0.5}
+               for i in range(max(1, size // 60))]
+    yield "json", "application/json", dumps(records)
+    yield "msgpack", "application/x-msgpack", decoders.msgpack.packb(records)
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - start - TICK_SECONDS)
+
+
+async def run(mode: str, codec: str, content_type: str, body: bytes, messages: int):
+    decoder = decoders.PayloadDecoder()
+    decoders.DECODE_OFFLOAD_BYTES = float("inf") if mode == "inline" else 0
+    decoders.DECODE_EXECUTOR = mode
+    decoders.shutdown_executor()
+    # Warm the executor so worker start-up isn't measured
+    await decoder.decode_async(body, content_type)
+
+    stop, lags, durations = asyncio.Event(), [], []
+    tick = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(TICK_SECONDS * 2)
+    for _ in range(messages):
+        start = time.perf_counter()
+        await decoder.decode_async(body, content_type)
+        durations.append(time.perf_counter() - start)
+        # Let the loop breathe between messages, as between deliveries
+        await asyncio.sleep(0)
+    stop.set()
+    await tick
+    decoders.shutdown_executor()
+    return summarize(
+        f"{mode}[{codec},{len(body)}B]", durations, messages,
+        p99_loop_lag_ms=round(percentile(lags, 99) * 1000, 3),
+        max_loop_lag_ms=round(max(lags, default=0.0) * 1000, 3)
+    )
+
+
+def main(args):
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for codec, content_type, body in payloads(size):
+            for mode in ("inline", "thread", "process"):
+                results.append(asyncio.run(run(mode, codec, content_type, body, args.messages)))
+    write_results("decode", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1024,65536,1048576", help="Approximate payload sizes in bytes")
+    parser.add_argument("--messages", type=int, default=50, help="Messages per variant")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    main(parser.parse_args())
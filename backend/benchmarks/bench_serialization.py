@@ -0,0 +1,115 @@
+"""Encode time of discovery responses and WebSocket frames.
+
+Compares FastAPI's default path (response_model validation, then
+jsonable_encoder-style serialization and json.dumps) with
+FastJSONResponse, and json.dumps with the orjson encoder for consumer
+WebSocket frames. Model construction with and without validation is timed
+too. Results are reported per 10k entities:
+
+    cd backend
+    python -m benchmarks.bench_serialization --entities 10000,50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app.models import BindingInfo, ClusterDiscovery, ExchangeInfo, QueueInfo  # noqa: E402
+from app.services.serialization import FastJSONResponse, dumps_text  # noqa: E402
+from benchmarks.common import Timer, summarize, write_results  # noqa: E402
+from benchmarks.stubs import synthesize_topology  # noqa: E402
+
+
+def build_discovery(topology, construct: bool) -> ClusterDiscovery:
+    def make(model, data):
+        return model.model_construct(**data) if construct else model(**data)
+
+    queues = [make(QueueInfo, {k: q[k] for k in QueueInfo.model_fields}) for q in topology["queues"]]
+    exchanges = [make(ExchangeInfo, {k: e[k] for k in ExchangeInfo.model_fields}) for e in topology["exchanges"]]
+    bindings = [
+        make(BindingInfo, {k: b[k] for k in BindingInfo.model_fields}) for b in topology["bindings"]
+    ]
+    build = ClusterDiscovery.model_construct if construct else ClusterDiscovery
+    return build(queues=queues, exchanges=exchanges, vhosts=[], users=[], bindings=bindings)
+
+
+def websocket_frames(count: int):
+    now = datetime.utcnow().isoformat()
+    return [
+        {
+            "body": {"order_id": i, "items": [{"sku": f"sku-{i}", "qty": 1}], "total": 9.99},
+            "routing_key": "orders.created",
+            "exchange": "orders",
+            "properties": {
+                "content_type": "application/json",
+                "headers": {"x-trace": f"trace-{i}"},
+                "delivery_mode": 2,
+                "message_id": str(i),
+                "timestamp": now,
+            },
+            "received_timestamp": now,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(iterations: int, fn):
+    durations = []
+    for _ in range(iterations):
+        with Timer() as t:
+            fn()
+        durations.append(t.elapsed)
+    return durations
+
+
+def per_10k(name, durations, entities, **extra):
+    result = summarize(name, durations, entities * len(durations), entities=entities, **extra)
+    result["ms_per_10k"] = round(min(durations) * 1000 * 10000 / entities, 3)
+    return result
+
+
+def main(args):
+    field = create_response_field(name="Response_discover_cluster", type_=ClusterDiscovery, mode="serialization")
+    results = []
+
+    for entities in [int(v) for v in args.entities.split(",") if v]:
+        # Queues + bindings make up the bulk of a discovery payload
+        topology = synthesize_topology(queues=entities // 2, bindings=entities // 2)
+        total = len(topology["queues"]) + len(topology["exchanges"]) + len(topology["bindings"])
+
+        results.append(per_10k("build[validated]", timed(args.iterations, lambda: build_discovery(topology, False)), total))
+        results.append(per_10k("build[model_construct]", timed(args.iterations, lambda: build_discovery(topology, True)), total))
+
+        discovery = build_discovery(topology, True)
+
+        def fastapi_default():
+            content = asyncio.run(serialize_response(field=field, response_content=discovery))
+            return JSONResponse(content).body
+
+        results.append(per_10k("encode[fastapi_default]", timed(args.iterations, fastapi_default), total))
+        results.append(per_10k("encode[FastJSONResponse]", timed(args.iterations, lambda: FastJSONResponse(discovery).body), total))
+        assert json.loads(fastapi_default()) == json.loads(FastJSONResponse(discovery).body)
+
+        frames = websocket_frames(entities)
+        results.append(per_10k("websocket_frames[json.dumps]", timed(
+            args.iterations, lambda: [json.dumps(frame) for frame in frames]), entities))
+        results.append(per_10k("websocket_frames[dumps_text]", timed(
+            args.iterations, lambda: [dumps_text(frame) for frame in frames]), entities))
+
+    write_results("serialization", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", default="10000,50000", help="Entities per payload")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    main(parser.parse_args())
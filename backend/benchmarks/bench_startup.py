@@ -0,0 +1,126 @@
+"""Cold-start time of the backend.
+
+Measures, in fresh interpreters:
+- import time of app.main, and which client stacks it pulled in;
+- time from spawning uvicorn until /health answers (process up) and until
+  /ready returns 200 (pools, registry and client stacks warm).
+
+    cd backend
+    python -m benchmarks.bench_startup --runs 5 --connections 200
+
+Uses a throwaway SQLite database seeded with --connections rows.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.common import summarize, write_results  # noqa: E402
+
+HEAVY_MODULES = ("pika", "aio_pika", "requests", "cryptography")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+SEED = """
+from app.database import SessionLocal, ensure_schema, RabbitMQConnection
+from app.services.encryption import encryption_service
+ensure_schema()
+db = SessionLocal()
+password = encryption_service.encrypt("guest")
+db.add_all([RabbitMQConnection(name=f"conn-{i}", host="127.0.0.1", username="guest",
+                               password_encrypted=password) for i in range(%d)])
+db.commit()
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def measure_server(env, timeout: float = 60.0):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    healthy = ready = None
+    try:
+        while time.perf_counter() - start < timeout and ready is None:
+            if healthy is None and status(f"{base}/health") == 200:
+                healthy = time.perf_counter() - start
+            if healthy is not None and status(f"{base}/ready") == 200:
+                ready = time.perf_counter() - start
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+    if ready is None:
+        raise RuntimeError("Backend did not become ready")
+    return healthy, ready
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{workdir}/startup.db")
+    env.setdefault("ENCRYPTION_KEY", "benchmark-key")
+    subprocess.run([sys.executable, "-c", SEED % args.connections], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+    imports, loaded = [], []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        imports.append(probe["seconds"])
+        loaded = probe["loaded"]
+
+    healthy, ready = [], []
+    for _ in range(args.runs):
+        h, r = measure_server(env)
+        healthy.append(h)
+        ready.append(r)
+
+    results = [
+        summarize("import_app_main", imports, len(imports), eagerly_loaded=loaded),
+        summarize("spawn_to_health", healthy, len(healthy)),
+        summarize("spawn_to_ready", ready, len(ready), connections=args.connections),
+    ]
+    write_results("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--connections", type=int, default=200, help="Connections seeded into the database")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    main(parser.parse_args())
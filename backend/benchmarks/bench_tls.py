@@ -0,0 +1,102 @@
+"""AMQPS connect latency with and without SSLContext caching and session reuse.
+
+Connects to a local TLS stand-in for an AMQPS port (handshake, protocol
+header round trip, close) the way pika (blocking socket) and aio-pika
+(asyncio) do, with:
+
+  - new_context: an SSLContext built for every connect (CA bundle loaded
+    each time, no resumption possible)
+  - cached_context: one context per connection, full handshake every time
+  - cached_context+resumption: the cached context from app.services.tls,
+    offering the previous session so the server can skip the full handshake
+
+    cd backend
+    python -m benchmarks.bench_tls --connects 200
+    python -m benchmarks.bench_tls --tls-version TLSv1_2
+"""
+import argparse
+import asyncio
+import os
+import socket
+import ssl
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.tls import build_context  # noqa: E402
+from benchmarks.common import Timer, summarize, write_results  # noqa: E402
+from benchmarks.stubs import TLSStandIn  # noqa: E402
+
+PROTOCOL_HEADER = b"AMQP\x00\x00\x09\x01"
+
+
+def variants(ca_pem: str):
+    yield "new_context", lambda: build_context(ca_pem, resumption=False)
+    cached = build_context(ca_pem, resumption=False)
+    yield "cached_context", lambda: cached
+    resuming = build_context(ca_pem)
+    yield "cached_context+resumption", lambda: resuming
+
+
+def connect_blocking(port: int, context) -> bool:
+    with socket.create_connection(("127.0.0.1", port)) as raw:
+        # As pika does; without it Nagle delays the abbreviated handshake
+        raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with context.wrap_socket(raw, server_hostname="localhost") as tls:
+            tls.sendall(PROTOCOL_HEADER)
+            tls.recv(8)
+            return tls.session_reused
+
+
+async def connect_async(port: int, context) -> bool:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, ssl=context, server_hostname="localhost")
+    writer.write(PROTOCOL_HEADER)
+    await reader.read(8)
+    reused = writer.get_extra_info("ssl_object").session_reused
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (ConnectionError, ssl.SSLError):
+        # The stand-in hangs up without a close_notify
+        pass
+    return reused
+
+
+def run(name: str, connects: int, connect, stand_in: TLSStandIn):
+    durations, reused = [], 0
+    before = stand_in.resumed
+    for _ in range(connects):
+        with Timer() as t:
+            reused += connect()
+        durations.append(t.elapsed)
+    result = summarize(name, durations, connects, resumed=reused, server_resumed=stand_in.resumed - before)
+    result["mean_ms"] = round(sum(durations) / len(durations) * 1000, 3)
+    return result
+
+
+def main(args):
+    results = []
+    with TLSStandIn(args.tls_version) as stand_in:
+        for label, context_for in variants(stand_in.cert_pem):
+            results.append(run(f"blocking[{label}]", args.connects,
+                               lambda: connect_blocking(stand_in.port, context_for()), stand_in))
+
+        loop = asyncio.new_event_loop()
+        try:
+            for label, context_for in variants(stand_in.cert_pem):
+                results.append(run(f"asyncio[{label}]", args.connects,
+                                   lambda: loop.run_until_complete(connect_async(stand_in.port, context_for())),
+                                   stand_in))
+        finally:
+            loop.close()
+    for result in results:
+        result["tls_version"] = args.tls_version or "default"
+    write_results("tls", results, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connects", type=int, default=200, help="Connects per variant")
+    parser.add_argument("--tls-version", choices=["TLSv1_2", "TLSv1_3"], help="Pin the stand-in's TLS version")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    main(parser.parse_args())
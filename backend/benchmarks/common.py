@@ -0,0 +1,74 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+def git_revision() -> Optional[str]:
+    """Current commit hash, so results can be compared across commits"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, durations: List[float], operations: int, **extra) -> Dict[str, Any]:
+    """Build a result record from per-iteration wall times (seconds)"""
+    total = sum(durations)
+    result = {
+        "name": name,
+        "iterations": len(durations),
+        "operations": operations,
+        "total_seconds": round(total, 6),
+        "ops_per_second": round(operations / total, 2) if total else None,
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+    }
+    result.update(extra)
+    return result
+
+
+class Timer:
+    """Context manager recording elapsed wall time in seconds"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def write_results(suite: str, results: List[Dict[str, Any]], output: Optional[str] = None):
+    """Print results as JSON and optionally write them to a file"""
+    document = {
+        "suite": suite,
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created_at": datetime.utcnow().isoformat(),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return document
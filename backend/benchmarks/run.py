@@ -0,0 +1,301 @@
+"""Offline benchmark suite for the RabbitMQService hot paths.
+
+Runs against StubManagementAPI and FakeBroker (see benchmarks/stubs.py), so
+no RabbitMQ is needed:
+
+    cd backend
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --suite discovery --sizes 1000,10000,100000
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+
+--compare prints the ops/sec change per benchmark against an earlier results
+file and exits non-zero when any benchmark regressed by more than the
+threshold.
+"""
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-')}/bench.db")
+os.environ.setdefault("ENCRYPTION_KEY", "benchmark-key")
+
+from app.database import RabbitMQConnection, WatchRule  # noqa: E402
+from app.services.channel_pool import channel_pool  # noqa: E402
+from app.services.encryption import encryption_service  # noqa: E402
+from app.services.message_import import import_messages  # noqa: E402
+from app.services.rabbitmq_service import QueueStats, RabbitMQService  # noqa: E402
+from app.services.session_store import InMemorySessionStore  # noqa: E402
+from app.services.topology_cache import KINDS, TopologyCache  # noqa: E402
+from app.services.watch import ConnectionWatch  # noqa: E402
+from app.websockets.consumer import RabbitMQConsumerManager  # noqa: E402
+from benchmarks.common import Timer, summarize, write_results  # noqa: E402
+from benchmarks.stubs import (  # noqa: E402
+    FakeBroker, FakeWebSocket, StubManagementAPI, patch_aio_pika, patch_pika
+)
+
+
+def make_service(management_port: int = 15672) -> RabbitMQService:
+    connection = RabbitMQConnection(
+        id=1,
+        name="bench",
+        host="127.0.0.1",
+        port=5672,
+        management_port=management_port,
+        username="guest",
+        password_encrypted=encryption_service.encrypt("guest"),
+        virtual_host="/",
+        use_ssl=False,
+    )
+    return RabbitMQService(connection)
+
+
+def bench_discovery(sizes, iterations):
+    results = []
+    for size in sizes:
+        with StubManagementAPI(queues=size) as stub:
+            service = make_service(stub.port)
+            durations = []
+            for _ in range(iterations):
+                with Timer() as t:
+                    discovery = service.discover_cluster()
+                durations.append(t.elapsed)
+            entities = len(discovery.queues) + len(discovery.exchanges) + len(discovery.bindings)
+            results.append(summarize(
+                f"discover_cluster[{size}]", durations, entities * iterations, entities=entities
+            ))
+
+            # Re-discovery plus fingerprinting, as done when a poll revalidates an ETag
+            topology = TopologyCache(service.discover_cluster, ttl=0)
+            topology.get()
+            durations = []
+            for _ in range(iterations):
+                with Timer() as t:
+                    topology.get().validators(KINDS)
+                durations.append(t.elapsed)
+            results.append(summarize(
+                f"topology_refresh[{size}]", durations, entities * iterations, entities=entities
+            ))
+    return results
+
+
+def bench_publish(count):
+    broker = FakeBroker()
+    broker.declare_queue("bench")
+    with patch_pika(broker):
+        service = make_service()
+        durations = []
+        for i in range(count):
+            with Timer() as t:
+                service.publish_message("", "bench", f'{{"n": {i}}}', {"message_id": str(i)})
+            durations.append(t.elapsed)
+    return [summarize("publish_message", durations, count)]
+
+
+class _Upload:
+    """Minimal UploadFile stand-in reading from an in-memory buffer"""
+
+    def __init__(self, data: bytes):
+        self.buffer = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.buffer.read(size)
+
+
+def bench_import(count, batch_sizes):
+    lines = b"".join(
+        json.dumps({"routing_key": "bench", "body": f'{{"n": {i}}}', "properties": {"message_id": str(i)}}).encode() + b"\n"
+        for i in range(count)
+    )
+    results = []
+    for batch in batch_sizes:
+        for compressed in (False, True):
+            broker = FakeBroker()
+            broker.declare_queue("bench")
+            payload = gzip.compress(lines) if compressed else lines
+
+            async def run():
+                service = make_service()
+                async for summary in import_messages(service, _Upload(payload), batch_size=batch):
+                    pass
+                await channel_pool.close_all()
+                return summary
+
+            with patch_aio_pika(broker):
+                with Timer() as t:
+                    summary = asyncio.run(run())
+            assert summary["published"] == count, summary
+            name = f"import[{batch}{',gzip' if compressed else ''}]"
+            results.append(summarize(name, [t.elapsed], count, batch=batch, gzip=compressed))
+    return results
+
+
+def bench_browse_consume(batch_sizes, iterations):
+    results = []
+    for batch in batch_sizes:
+        for operation in ("browse", "consume"):
+            broker = FakeBroker()
+            broker.fill("bench", batch * (iterations if operation == "consume" else 1))
+            with patch_pika(broker):
+                service = make_service()
+                durations = []
+                for _ in range(iterations):
+                    with Timer() as t:
+                        if operation == "browse":
+                            messages = service.browse_messages("bench", max_messages=batch)
+                        else:
+                            messages = service.consume_messages("bench", max_messages=batch)
+                    durations.append(t.elapsed)
+                    assert len(messages) == batch
+            results.append(summarize(f"{operation}_messages[{batch}]", durations, batch * iterations, batch=batch))
+    return results
+
+
+async def _fanout(consumers: int, messages: int):
+    broker = FakeBroker()
+    manager = RabbitMQConsumerManager(store=InMemorySessionStore())
+    service = make_service()
+    sockets = []
+
+    with patch_aio_pika(broker):
+        consumer_ids = []
+        for i in range(consumers):
+            queue = f"fanout-{i}"
+            broker.declare_queue(queue)
+            websocket = FakeWebSocket()
+            websocket.expected = messages
+            consumer_id = await manager.connect(websocket, service.connection.id)
+            consumer_ids.append(consumer_id)
+            sockets.append(websocket)
+            asyncio.create_task(manager.consume(consumer_id, queue, service))
+        await asyncio.sleep(0.05)
+
+        with Timer() as t:
+            for i in range(consumers):
+                broker.fill(f"fanout-{i}", messages)
+            await asyncio.gather(*(ws.received.wait() for ws in sockets))
+
+        for consumer_id in consumer_ids:
+            await manager.disconnect(consumer_id)
+        await asyncio.sleep(0)
+    return t.elapsed
+
+
+def bench_websocket_fanout(consumer_counts, messages):
+    results = []
+    for consumers in consumer_counts:
+        elapsed = asyncio.run(_fanout(consumers, messages))
+        results.append(summarize(
+            f"websocket_fanout[{consumers}x{messages}]", [elapsed], consumers * messages,
+            consumers=consumers, messages_per_consumer=messages
+        ))
+    return results
+
+
+def compare(results, baseline_path: str, threshold: float) -> bool:
+    """Print ops/sec deltas against a baseline file; True if no regressions"""
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"{'benchmark':40} {'baseline':>12} {'current':>12} {'change':>8}", file=sys.stderr)
+    for result in results:
+        before = baseline.get(result["name"])
+        if not before or not before.get("ops_per_second") or not result.get("ops_per_second"):
+            continue
+        change = result["ops_per_second"] / before["ops_per_second"] - 1
+        flag = ""
+        if change < -threshold:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{result['name']:40} {before['ops_per_second']:>12} {result['ops_per_second']:>12} "
+              f"{change:>+8.1%}{flag}", file=sys.stderr)
+    return ok
+
+
+def bench_watch(queue_counts, rule_count, changed_fraction, iterations):
+    rules = [
+        WatchRule(id=i, connection_id=1, name=f"rule-{i}", vhost=None if i % 2 else "/",
+                  queue_pattern=f"queue-{i}*" if i % 3 else f"queue-{i}", condition="depth_above",
+                  threshold=50)
+        for i in range(rule_count)
+    ]
+    results = []
+    for count in queue_counts:
+        queues = [QueueStats("/", f"queue-{i}", i % 100, i % 3, "running", 1.0, 1.0) for i in range(count)]
+        watch = ConnectionWatch(1, rules)
+        watch.evaluate(queues)
+        changed = max(1, int(count * changed_fraction))
+        durations = []
+        for n in range(iterations):
+            # Depth changes on a slice of the queues between polls
+            for i in range(changed):
+                queues[i] = queues[i]._replace(messages=(queues[i].messages + 1 + n) % 100)
+            with Timer() as t:
+                watch.evaluate(queues)
+            durations.append(t.elapsed)
+        results.append(summarize(f"watch_evaluate[{count}]", durations, count * iterations,
+                                 rules=rule_count, changed_per_poll=changed))
+    return results
+
+
+SUITES = ("discovery", "publish", "import", "browse", "fanout", "watch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", action="append", choices=SUITES,
+                        help="Suite to run (repeatable, default: all)")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Queue counts for discover_cluster")
+    parser.add_argument("--import-count", type=int, default=50000)
+    parser.add_argument("--import-batch-sizes", default="100,1000",
+                        help="Publish window sizes for the file import")
+    parser.add_argument("--batch-sizes", default="10,100,1000",
+                        help="Message counts per browse/consume call")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--publish-count", type=int, default=2000)
+    parser.add_argument("--fanout", default="1,10,100", help="WebSocket consumer counts")
+    parser.add_argument("--fanout-messages", type=int, default=200)
+    parser.add_argument("--watch-queues", default="10000,100000", help="Queue counts for watch evaluation")
+    parser.add_argument("--watch-rules", type=int, default=200)
+    parser.add_argument("--watch-changed", type=float, default=0.01,
+                        help="Fraction of queues that change between polls")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed ops/sec drop before --compare fails")
+    args = parser.parse_args()
+
+    def ints(value):
+        return [int(v) for v in value.split(",") if v]
+
+    suites = args.suite or SUITES
+    results = []
+    if "discovery" in suites:
+        results += bench_discovery(ints(args.sizes), args.iterations)
+    if "publish" in suites:
+        results += bench_publish(args.publish_count)
+    if "import" in suites:
+        results += bench_import(args.import_count, ints(args.import_batch_sizes))
+    if "browse" in suites:
+        results += bench_browse_consume(ints(args.batch_sizes), args.iterations)
+    if "fanout" in suites:
+        results += bench_websocket_fanout(ints(args.fanout), args.fanout_messages)
+    if "watch" in suites:
+        results += bench_watch(ints(args.watch_queues), args.watch_rules, args.watch_changed, args.iterations)
+
+    write_results("service_hot_paths", results, args.output)
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+"""Offline stand-ins for the RabbitMQ Management API and AMQP broker.
+
+StubManagementAPI serves synthesized queues/exchanges/bindings over HTTP (or
+HTTPS) on a local port; TLSStandIn accepts TLS connections like an AMQPS
+port. FakeBroker is an in-process message store exposed through the subset
+of the pika BlockingConnection and aio-pika APIs that the service layer
+uses; `patch_pika()` / `patch_aio_pika()` swap it in.
+"""
+import asyncio
+import itertools
+import json
+import socket
+import ssl
+import tempfile
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, Optional, Tuple
+from unittest import mock
+
+import pika
+from pamqp.commands import Basic
+
+
+def synthesize_topology(queues: int, exchanges: Optional[int] = None,
+                        bindings: Optional[int] = None, vhosts: int = 4) -> Dict[str, list]:
+    """Build Management API style payloads for a cluster of the given size"""
+    exchanges = max(1, queues // 10) if exchanges is None else exchanges
+    bindings = queues if bindings is None else bindings
+    vhost_names = ["/"] + [f"vhost-{i}" for i in range(1, vhosts)]
+
+    return {
+        "vhosts": [{"name": name, "description": "", "tags": []} for name in vhost_names],
+        "users": [{"name": "guest", "tags": ["administrator"]}],
+        "queues": [
+            {
+                "name": f"queue-{i}",
+                "vhost": vhost_names[i % vhosts],
+                "durable": True,
+                "auto_delete": False,
+                "exclusive": False,
+                "messages": i % 100,
+                "consumers": i % 3,
+                "state": "running",
+                "message_stats": {
+                    "publish": i * 10,
+                    "publish_details": {"rate": float(i % 7)},
+                    "deliver_get": i * 9,
+                    "deliver_get_details": {"rate": float(i % 5)},
+                },
+            }
+            for i in range(queues)
+        ],
+        "exchanges": [
+            {
+                "name": f"exchange-{i}",
+                "vhost": vhost_names[i % vhosts],
+                "type": ("direct", "topic", "fanout")[i % 3],
+                "durable": True,
+                "auto_delete": False,
+                "internal": False,
+            }
+            for i in range(exchanges)
+        ],
+        "bindings": [
+            {
+                "source": f"exchange-{i % exchanges}",
+                "destination": f"queue-{i % max(1, queues)}",
+                "destination_type": "queue",
+                "routing_key": f"key.{i}",
+                "vhost": vhost_names[i % vhosts],
+            }
+            for i in range(bindings)
+        ],
+    }
+
+
+class StubManagementAPI:
+    """Local HTTP server answering /api/<endpoint> from pre-encoded payloads"""
+
+    def __init__(self, queues: int = 1000, exchanges: Optional[int] = None,
+                 bindings: Optional[int] = None, latency: float = 0.0, ssl_context=None):
+        topology = synthesize_topology(queues, exchanges, bindings)
+        topology["overview"] = {
+            "rabbitmq_version": "3.12.0",
+            "erlang_version": "26.0",
+            "cluster_name": "rabbit@stub",
+            "object_totals": {"queues": queues, "exchanges": len(topology["exchanges"]), "consumers": 0},
+            "queue_totals": {"messages": 0, "messages_ready": 0, "messages_unacknowledged": 0},
+            "message_stats": {"publish": 0, "deliver_get": 0, "ack": 0},
+        }
+        topology["nodes"] = [
+            {
+                "name": f"rabbit@stub-{i}",
+                "running": True,
+                "uptime": 3600000,
+                "mem_used": 200 * 2 ** 20,
+                "mem_limit": 2 ** 31,
+                "mem_alarm": False,
+                "disk_free": 2 ** 34,
+                "disk_free_limit": 50 * 2 ** 20,
+                "disk_free_alarm": False,
+                "fd_used": 100,
+                "fd_total": 65536,
+                "sockets_used": 10,
+                "sockets_total": 58893,
+                "proc_used": 500,
+                "proc_total": 1048576,
+            }
+            for i in range(3)
+        ]
+        self.payloads = {f"/api/{key}": json.dumps(value).encode() for key, value in topology.items()}
+        self.latency = latency
+        # Server-side SSLContext to serve HTTPS instead of HTTP
+        self.ssl_context = ssl_context
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    threading.Event().wait(stub.latency)
+                body = stub.payloads.get(self.path.split("?")[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        if self.ssl_context is not None:
+            self._server.socket = self.ssl_context.wrap_socket(self._server.socket, server_side=True)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeBroker:
+    """In-process queues shared by the fake pika and aio-pika clients"""
+
+    def __init__(self):
+        self.queues: Dict[str, Deque[Tuple[bytes, Dict[str, Any], str, str]]] = {}
+        self.bindings: Dict[str, list] = {}
+        self.published = 0
+        self._lock = threading.Lock()
+
+    def declare_queue(self, name: str):
+        self.queues.setdefault(name, deque())
+
+    def bind(self, exchange: str, queue: str):
+        self.declare_queue(queue)
+        self.bindings.setdefault(exchange, []).append(queue)
+
+    def fill(self, queue: str, count: int, body: bytes = b'{"hello": "world"}'):
+        self.declare_queue(queue)
+        for i in range(count):
+            self.queues[queue].append((body, {"message_id": str(i), "content_type": "application/json"}, "", queue))
+
+    def route(self, exchange: str, routing_key: str, body: bytes, properties: Dict[str, Any]):
+        with self._lock:
+            self.published += 1
+            targets = [routing_key] if exchange == "" else self.bindings.get(exchange, [])
+            for queue in targets:
+                if queue in self.queues:
+                    self.queues[queue].append((body, properties, exchange, routing_key))
+
+    def get(self, queue: str):
+        with self._lock:
+            messages = self.queues.get(queue)
+            return messages.popleft() if messages else None
+
+    def requeue(self, queue: str, message):
+        with self._lock:
+            self.queues[queue].appendleft(message)
+
+
+class _FakeBlockingChannel:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+        self._tags = itertools.count(1)
+        self._unacked: Dict[int, Tuple[str, tuple]] = {}
+        self.is_open = True
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        props = {}
+        if properties is not None:
+            props = {k: v for k, v in vars(properties).items() if v is not None}
+        self.broker.route(exchange, routing_key, body, props)
+
+    def basic_get(self, queue, auto_ack=False):
+        message = self.broker.get(queue)
+        if message is None:
+            return None, None, None
+        body, props, exchange, routing_key = message
+        tag = next(self._tags)
+        if not auto_ack:
+            self._unacked[tag] = (queue, message)
+        method = pika.spec.Basic.GetOk(delivery_tag=tag, exchange=exchange, routing_key=routing_key,
+                                       message_count=len(self.broker.queues.get(queue, ())))
+        return method, pika.BasicProperties(**props), body
+
+    def _settle(self, delivery_tag, multiple, requeue):
+        tags = [t for t in list(self._unacked) if t <= delivery_tag] if multiple else [delivery_tag]
+        # Requeue in reverse so the original order is restored at the head
+        for tag in sorted(tags, reverse=True):
+            queue, message = self._unacked.pop(tag, (None, None))
+            if requeue and queue is not None:
+                self.broker.requeue(queue, message)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self._settle(delivery_tag, multiple, requeue=False)
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self._settle(delivery_tag, multiple, requeue)
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        pass
+
+    def consume(self, queue, auto_ack=False, inactivity_timeout=None, **kwargs):
+        while True:
+            method, properties, body = self.basic_get(queue, auto_ack=auto_ack)
+            if method is not None:
+                method = pika.spec.Basic.Deliver(
+                    delivery_tag=method.delivery_tag, exchange=method.exchange, routing_key=method.routing_key
+                )
+            yield method, properties, body
+
+    def cancel(self):
+        self.basic_nack(delivery_tag=max(self._unacked, default=0), multiple=True, requeue=True)
+
+    def confirm_delivery(self):
+        pass
+
+    def close(self):
+        for tag in sorted(self._unacked, reverse=True):
+            queue, message = self._unacked.pop(tag)
+            self.broker.requeue(queue, message)
+        self.is_open = False
+
+
+class FakeBlockingConnection:
+    """pika.BlockingConnection replacement bound to a FakeBroker"""
+
+    broker: FakeBroker = None
+
+    def __init__(self, parameters=None):
+        self.parameters = parameters
+        self._channels = []
+        self.is_open = True
+
+    def channel(self):
+        channel = _FakeBlockingChannel(self.broker)
+        self._channels.append(channel)
+        return channel
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        for channel in self._channels:
+            channel.close()
+        self.is_open = False
+
+
+@contextmanager
+def patch_pika(broker: FakeBroker):
+    """Route pika.BlockingConnection in the service layer to the fake broker"""
+    connection_class = type("BoundFakeBlockingConnection", (FakeBlockingConnection,), {"broker": broker})
+    with mock.patch("pika.BlockingConnection", connection_class):
+        yield broker
+
+
+class FakeIncomingMessage:
+    """Subset of aio_pika.IncomingMessage read by the WebSocket consumer"""
+
+    def __init__(self, body: bytes, properties: Dict[str, Any], exchange: str, routing_key: str):
+        self.body = body
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.content_type = properties.get("content_type")
+        self.content_encoding = properties.get("content_encoding")
+        self.headers = properties.get("headers") or {}
+        self.delivery_mode = properties.get("delivery_mode")
+        self.priority = properties.get("priority")
+        self.correlation_id = properties.get("correlation_id")
+        self.reply_to = properties.get("reply_to")
+        self.expiration = None
+        self.message_id = properties.get("message_id")
+        timestamp = properties.get("timestamp")
+        self.timestamp = datetime.utcfromtimestamp(timestamp) if isinstance(timestamp, (int, float)) else timestamp
+        self.type = properties.get("type")
+        self.user_id = properties.get("user_id")
+        self.app_id = properties.get("app_id")
+
+    @asynccontextmanager
+    async def process(self, **kwargs):
+        yield self
+
+    async def ack(self, multiple=False):
+        pass
+
+    async def nack(self, multiple=False, requeue=True):
+        pass
+
+
+class _FakeAioQueue:
+    def __init__(self, broker: FakeBroker, name: str):
+        self.broker = broker
+        self.name = name
+        self._task: Optional[asyncio.Task] = None
+
+    async def consume(self, callback, no_ack=False, **kwargs):
+        async def deliver():
+            while True:
+                message = self.broker.get(self.name)
+                if message is None:
+                    await asyncio.sleep(0.001)
+                    continue
+                await callback(FakeIncomingMessage(*message))
+
+        self._task = asyncio.create_task(deliver())
+        return f"ctag-{id(self)}"
+
+    async def cancel(self, consumer_tag, **kwargs):
+        if self._task:
+            self._task.cancel()
+
+
+class _FakeAioExchange:
+    def __init__(self, broker: FakeBroker, name: str):
+        self.broker = broker
+        self.name = name
+
+    async def publish(self, message, routing_key, mandatory=True, **kwargs):
+        properties = {
+            "message_id": message.message_id,
+            "content_type": message.content_type,
+            "headers": message.headers,
+            "correlation_id": message.correlation_id,
+            "reply_to": message.reply_to,
+        }
+        self.broker.route(self.name, routing_key, message.body, properties)
+        return Basic.Ack(delivery_tag=self.broker.published)
+
+
+class _FakeAioChannel:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+        self._queues = []
+        self.is_closed = False
+        self.default_exchange = _FakeAioExchange(broker, "")
+
+    async def get_exchange(self, name, ensure=True):
+        return _FakeAioExchange(self.broker, name)
+
+    async def get_queue(self, name, ensure=True):
+        return await self.declare_queue(name)
+
+    async def set_qos(self, prefetch_count=0, **kwargs):
+        pass
+
+    async def declare_queue(self, name, passive=False, **kwargs):
+        self.broker.declare_queue(name)
+        queue = _FakeAioQueue(self.broker, name)
+        self._queues.append(queue)
+        return queue
+
+    async def close(self):
+        for queue in self._queues:
+            await queue.cancel(None)
+        self.is_closed = True
+
+
+class FakeRobustConnection:
+    def __init__(self, broker: FakeBroker, **kwargs):
+        self.broker = broker
+        self.kwargs = kwargs
+        self._channels = []
+        self.is_closed = False
+
+    async def channel(self, **kwargs):
+        channel = _FakeAioChannel(self.broker)
+        self._channels.append(channel)
+        return channel
+
+    async def close(self):
+        for channel in self._channels:
+            await channel.close()
+        self.is_closed = True
+
+
+@contextmanager
+def patch_aio_pika(broker: FakeBroker):
+    """Route aio_pika.connect_robust and aio_pika.connect to the fake broker"""
+    async def connect_robust(*args, **kwargs):
+        return FakeRobustConnection(broker, **kwargs)
+
+    with mock.patch("aio_pika.connect_robust", connect_robust), mock.patch("aio_pika.connect", connect_robust):
+        yield broker
+
+
+class FakeWebSocket:
+    """Counts frames sent by the consumer manager"""
+
+    def __init__(self):
+        self.sent = 0
+        self.received = asyncio.Event()
+        self.expected = 0
+        self.headers: Dict[str, str] = {}
+        self.client = SimpleNamespace(host="127.0.0.1", port=0)
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.sent += 1
+        if self.sent >= self.expected:
+            self.received.set()
+
+    async def send_text(self, data):
+        await self.send_json(data)
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+def self_signed_certificate(host: str = "localhost") -> Tuple[str, str]:
+    """(certificate PEM, key PEM) valid for `host` and 127.0.0.1"""
+    import ipaddress
+    from datetime import timedelta
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host)])
+    now = datetime.utcnow()
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=1))
+        .not_valid_after(now + timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName(host), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    return (
+        certificate.public_bytes(serialization.Encoding.PEM).decode(),
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                          serialization.NoEncryption()).decode()
+    )
+
+
+class TLSStandIn:
+    """Local TLS listener standing in for an AMQPS port.
+
+    Completes the TLS handshake, reads the AMQP protocol header and answers
+    with its own header (what a broker sends for an unsupported version),
+    then closes. Counts handshakes and how many resumed a session.
+    """
+
+    def __init__(self, tls_version: Optional[str] = None):
+        self.cert_pem, key_pem = self_signed_certificate()
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        if tls_version:
+            version = getattr(ssl.TLSVersion, tls_version)
+            self.context.minimum_version = self.context.maximum_version = version
+        with tempfile.TemporaryDirectory() as directory:
+            cert_path, key_path = f"{directory}/cert.pem", f"{directory}/key.pem"
+            with open(cert_path, "w") as f:
+                f.write(self.cert_pem)
+            with open(key_path, "w") as f:
+                f.write(key_pem)
+            self.context.load_cert_chain(cert_path, key_path)
+        self.handshakes = 0
+        self.resumed = 0
+        self._socket = None
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def __enter__(self):
+        self._socket = socket.create_server(("127.0.0.1", 0))
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def _serve(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def _handle(self, client):
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            with self.context.wrap_socket(client, server_side=True) as tls:
+                self.handshakes += 1
+                self.resumed += tls.session_reused
+                tls.recv(8)
+                tls.sendall(b"AMQP\x00\x00\x09\x01")
+        except OSError:
+            pass
+
+    def __exit__(self, *exc):
+        self._socket.close()
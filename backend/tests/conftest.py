@@ -0,0 +1,115 @@
+"""Shared setup: a throwaway database and capture directory, configured
+before any app module reads its settings"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmpdir = tempfile.mkdtemp(prefix="tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/test.db")
+os.environ.setdefault("ENCRYPTION_KEY", "test-key")
+os.environ.setdefault("CAPTURE_DIR", os.path.join(_tmpdir, "captures"))
+
+import pytest  # noqa: E402
+
+from app.database import RabbitMQConnection, SessionLocal, ensure_schema  # noqa: E402
+from app.services.encryption import encryption_service  # noqa: E402
+
+ensure_schema()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.query(RabbitMQConnection).delete()
+        session.commit()
+        session.close()
+
+
+def saved_connection(db, name: str = "test", **fields) -> RabbitMQConnection:
+    """Insert an active connection row and return it"""
+    connection = RabbitMQConnection(
+        name=name,
+        host=fields.pop("host", "127.0.0.1"),
+        username="guest",
+        password_encrypted=encryption_service.encrypt("guest"),
+        **fields
+    )
+    db.add(connection)
+    db.commit()
+    return connection
+
+
+@pytest.fixture
+def broker():
+    """A FakeBroker behind both pika and aio-pika"""
+    from benchmarks.stubs import FakeBroker, patch_aio_pika, patch_pika
+
+    broker = FakeBroker()
+    with patch_pika(broker), patch_aio_pika(broker):
+        yield broker
+
+
+@pytest.fixture
+def client(broker):
+    """TestClient of the app, started and stopped per test"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.connection_registry import connection_registry
+
+    with TestClient(app) as test_client:
+        yield test_client
+    with SessionLocal() as session:
+        session.query(RabbitMQConnection).delete()
+        session.commit()
+    # Connection ids are reused once the rows are deleted
+    connection_registry.clear()
+
+
+def create_connection(client, name: str = "test", **fields) -> int:
+    """Save a connection through the API and return its id"""
+    response = client.post("/api/connections/", json={
+        "name": name, "host": "127.0.0.1", "username": "guest", "password": "guest", **fields
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def call_disconnected(client, method: str, path: str, query: str = "", body: bytes = b"",
+                      after_chunks: int = 0) -> list:
+    """Run a request whose client disconnects once `after_chunks` body
+    chunks were sent (0: before the response starts); returns the ASGI
+    messages the app sent"""
+    import asyncio
+
+    sent = []
+    requested = []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": body, "more_body": False}
+        while sum(message["type"] == "http.response.body" for message in sent) < after_chunks:
+            await asyncio.sleep(0.001)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        # Let the disconnect listener run, as a real server write would
+        await asyncio.sleep(0)
+
+    async def call():
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "headers": [(b"content-type", b"application/json")] if body else [],
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80), "root_path": "", "app": client.app,
+        }
+        await client.app(scope, receive, send)
+
+    client.portal.call(call)
+    return sent
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from app.database import AsyncSessionLocal, AuditEvent
+from app.services.audit import AUDIT_MAX_MESSAGE_IDS, AuditLog
+
+
+@pytest_asyncio.fixture
+async def audit_rows():
+    """Audit rows written during the test, deleted afterwards"""
+    async def rows():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(select(AuditEvent).order_by(AuditEvent.id))).scalars().all()
+
+    yield rows
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(AuditEvent))
+        await db.commit()
+
+
+def capture_batches(audit: AuditLog) -> list:
+    batches = []
+
+    async def write(batch):
+        batches.append(len(batch))
+        audit.written += len(batch)
+
+    audit._write = write
+    return batches
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_in_batches():
+    audit = AuditLog(batch_size=3, enabled=True)
+    batches = capture_batches(audit)
+    for i in range(7):
+        assert await audit.record("publish", 1, routing_key=f"k{i}")
+    await audit.flush()
+    assert batches == [3, 3, 1]
+    assert audit.stats()["buffered"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_without_waiting_for_the_interval(audit_rows):
+    audit = AuditLog(batch_size=2, flush_seconds=60, enabled=True)
+    writer = asyncio.create_task(audit.run())
+    await audit.record("publish", 1, client="10.0.0.1", exchange="x", routing_key="a",
+                       message_count=3, message_ids=["m1", None, "m2"])
+    await audit.record("export", 1, queue="q", success=False, error="boom")
+    for _ in range(100):
+        if audit.written == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert audit.written == 2
+
+    audit.stop()
+    await writer
+    rows = await audit_rows()
+    assert [(row.operation, row.message_count, row.success) for row in rows] == [
+        ("publish", 3, True), ("export", 1, False)
+    ]
+    assert rows[0].message_ids == '["m1","m2"]'
+    assert rows[1].message_ids is None and rows[1].error == "boom"
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_what_is_buffered():
+    audit = AuditLog(batch_size=100, flush_seconds=60, enabled=True)
+    batches = capture_batches(audit)
+    writer = asyncio.create_task(audit.run())
+    await asyncio.sleep(0)
+    for _ in range(5):
+        await audit.record("publish", 1)
+    audit.stop()
+    await writer
+    assert batches == [5]
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_drops_after_backpressure():
+    audit = AuditLog(buffer_size=2, backpressure_seconds=0.01, enabled=True)
+    assert await audit.record("publish", 1)
+    assert await audit.record("publish", 1)
+    # No writer is running, so no room is made
+    assert not await audit.record("publish", 1)
+    assert audit.stats() == {
+        "enabled": True, "buffered": 2, "buffer_size": 2, "written": 0, "dropped": 1, "write_failed": 0
+    }
+
+
+@pytest.mark.asyncio
+async def test_backpressure_waits_for_the_writer():
+    audit = AuditLog(buffer_size=2, batch_size=100, flush_seconds=60, backpressure_seconds=1, enabled=True)
+    batches = capture_batches(audit)
+    writer = asyncio.create_task(audit.run())
+    await asyncio.sleep(0)
+    results = [await audit.record("publish", 1) for _ in range(3)]
+    assert results == [True, True, True]
+    assert audit.dropped == 0
+    # The full buffer woke the writer early
+    assert batches == [2]
+    audit.stop()
+    await writer
+    assert batches == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_counted(monkeypatch):
+    import app.services.audit as audit_module
+
+    def broken_session():
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(audit_module, "AsyncSessionLocal", broken_session)
+    audit = AuditLog(enabled=True)
+    await audit.record("publish", 1)
+    await audit.flush()
+    assert (audit.written, audit.write_failed) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_disabled_and_message_id_cap():
+    assert not await AuditLog(enabled=False).record("publish", 1)
+
+    audit = AuditLog(enabled=True)
+    await audit.record("publish", 1, message_ids=(f"m{i}" for i in range(AUDIT_MAX_MESSAGE_IDS * 2)))
+    assert audit.buffer[0]["message_ids"].count('"m') == AUDIT_MAX_MESSAGE_IDS
@@ -0,0 +1,84 @@
+import pytest
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def breaker(**kwargs) -> CircuitBreaker:
+    options = dict(window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0,
+                   open_seconds=60, half_open_calls=1)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_stays_closed_below_min_calls():
+    circuit = breaker()
+    for _ in range(3):
+        circuit.before_call()
+        circuit.record(False, 0.01)
+    assert circuit.state == "closed"
+
+
+def test_opens_at_failure_rate_and_fails_fast():
+    circuit = breaker()
+    for ok in (True, False, True, False):
+        circuit.before_call()
+        circuit.record(ok, 0.01)
+    assert circuit.state == "open"
+    with pytest.raises(CircuitOpenError) as raised:
+        circuit.before_call()
+    assert 1 <= raised.value.retry_after <= 60
+
+
+def test_slow_successes_count_as_failures():
+    circuit = breaker()
+    for _ in range(4):
+        circuit.before_call()
+        circuit.record(True, 2.0)
+    assert circuit.state == "open"
+
+
+def test_healthy_calls_keep_it_closed():
+    circuit = breaker()
+    for _ in range(50):
+        circuit.before_call()
+        circuit.record(True, 0.01)
+    circuit.before_call()
+    circuit.record(False, 0.01)
+    assert circuit.state == "closed"
+
+
+def test_half_open_probe_closes_on_success():
+    circuit = breaker(open_seconds=0)
+    for _ in range(4):
+        circuit.before_call()
+        circuit.record(False, 0.01)
+    assert circuit.state == "open"
+
+    circuit.before_call()
+    assert circuit.state == "half_open"
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+    circuit.record(True, 0.01)
+    assert circuit.state == "closed"
+
+
+def test_half_open_probe_reopens_on_failure():
+    circuit = breaker(open_seconds=0)
+    for _ in range(4):
+        circuit.before_call()
+        circuit.record(False, 0.01)
+    circuit.before_call()
+    circuit.record(False, 0.01)
+    assert circuit.state == "open"
+
+
+def test_calls_admitted_before_opening_are_ignored():
+    circuit = breaker()
+    for _ in range(5):
+        circuit.before_call()
+    for _ in range(4):
+        circuit.record(False, 0.01)
+    assert circuit.state == "open"
+    circuit.record(True, 0.01)
+    assert circuit.state == "open"
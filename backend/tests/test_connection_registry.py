@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from app.database import RabbitMQConnection, SessionLocal
+from app.services.connection_registry import ConnectionRegistry
+from tests.conftest import saved_connection
+
+
+def touch(connection_id, **fields):
+    """Edit a row from another session, as another replica would"""
+    with SessionLocal() as other:
+        row = other.get(RabbitMQConnection, connection_id)
+        for name, value in fields.items():
+            setattr(row, name, value)
+        row.updated_at = row.updated_at + timedelta(seconds=1)
+        other.commit()
+
+
+def test_hit_within_revalidate_window_skips_the_database(db):
+    connection = saved_connection(db)
+    registry = ConnectionRegistry(revalidate_seconds=60)
+    service = registry.get_service(db, connection.id)
+    assert service.connection.host == "127.0.0.1"
+    assert service.password == "guest"
+
+    touch(connection.id, host="10.0.0.1")
+    # Within the window the cached service is served without a version check
+    assert registry.get_service(db, connection.id) is service
+
+
+def test_rebuilt_after_updated_at_changes(db):
+    connection = saved_connection(db)
+    registry = ConnectionRegistry(revalidate_seconds=0)
+    service = registry.get_service(db, connection.id)
+    # Unchanged version: the same service survives revalidation
+    assert registry.get_service(db, connection.id) is service
+
+    touch(connection.id, host="10.0.0.1")
+    rebuilt = registry.get_service(db, connection.id)
+    assert rebuilt is not service
+    assert rebuilt.connection.host == "10.0.0.1"
+
+
+def test_deactivated_connection_is_evicted(db):
+    connection = saved_connection(db)
+    registry = ConnectionRegistry(revalidate_seconds=0)
+    assert registry.get_service(db, connection.id) is not None
+
+    touch(connection.id, is_active=False)
+    assert registry.get_service(db, connection.id) is None
+    assert connection.id not in registry._entries
+
+
+def test_unknown_connection(db):
+    assert ConnectionRegistry().get_service(db, 12345) is None
+
+
+def test_invalidate_forces_a_rebuild(db):
+    connection = saved_connection(db, updated_at=datetime(2024, 1, 1))
+    registry = ConnectionRegistry(revalidate_seconds=60)
+    service = registry.get_service(db, connection.id)
+    registry.invalidate(connection.id)
+    assert registry.get_service(db, connection.id) is not service
+
+    registry.clear()
+    assert registry._entries == {}
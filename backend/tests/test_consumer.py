@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.database import RabbitMQConnection
+from app.services.encryption import encryption_service
+from app.services.rabbitmq_service import RabbitMQService
+from app.services.session_store import InMemorySessionStore
+from app.websockets.consumer import RabbitMQConsumerManager
+from benchmarks.stubs import FakeBroker, FakeWebSocket, patch_aio_pika
+
+
+def make_service() -> RabbitMQService:
+    return RabbitMQService(RabbitMQConnection(
+        id=1,
+        name="test",
+        host="127.0.0.1",
+        port=5672,
+        management_port=15672,
+        username="guest",
+        password_encrypted=encryption_service.encrypt("guest"),
+        virtual_host="/",
+        use_ssl=False,
+    ))
+
+
+@pytest.mark.asyncio
+async def test_fanout_delivers_to_every_websocket():
+    broker = FakeBroker()
+    store = InMemorySessionStore()
+    manager = RabbitMQConsumerManager(store=store)
+    service = make_service()
+    consumers, messages = 10, 20
+
+    with patch_aio_pika(broker):
+        sockets, consumer_ids, tasks = [], [], []
+        for i in range(consumers):
+            broker.declare_queue(f"fanout-{i}")
+            websocket = FakeWebSocket()
+            websocket.expected = messages
+            consumer_id = await manager.connect(websocket, service.connection.id)
+            sockets.append(websocket)
+            consumer_ids.append(consumer_id)
+            tasks.append(asyncio.create_task(manager.consume(consumer_id, f"fanout-{i}", service)))
+        await asyncio.sleep(0.05)
+        assert len(store.sessions) == consumers
+
+        for i in range(consumers):
+            broker.fill(f"fanout-{i}", messages)
+        # A consumer that fails before consuming would leave its socket waiting
+        await asyncio.wait_for(asyncio.gather(*(ws.received.wait() for ws in sockets)), timeout=10)
+        assert [ws.sent for ws in sockets] == [messages] * consumers
+
+        for consumer_id in consumer_ids:
+            await manager.disconnect(consumer_id)
+        await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=10)
+    assert store.sessions == {}
+    assert manager.active_connections == {}
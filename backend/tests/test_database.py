@@ -0,0 +1,46 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base, ensure_schema
+
+
+def engine_for(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path}/schema.db")
+
+
+def test_creates_missing_tables_once(tmp_path):
+    engine = engine_for(tmp_path)
+    changes = ensure_schema(engine)
+    assert sorted(changes) == sorted(f"created table {table.name}" for table in Base.metadata.sorted_tables)
+    assert set(inspect(engine).get_table_names()) == set(Base.metadata.tables)
+    # A current schema is left alone
+    assert ensure_schema(engine) == []
+
+
+def test_adds_missing_columns_with_defaults(tmp_path):
+    engine = engine_for(tmp_path)
+    with engine.begin() as conn:
+        # rabbitmq_connections as it was before TLS and cluster nodes
+        conn.execute(text(
+            "CREATE TABLE rabbitmq_connections (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, "
+            "host VARCHAR(255) NOT NULL, port INTEGER, management_port INTEGER, username VARCHAR(100) NOT NULL, "
+            "password_encrypted TEXT NOT NULL, virtual_host VARCHAR(100), use_ssl BOOLEAN, description TEXT, "
+            "created_at DATETIME, updated_at DATETIME, is_active BOOLEAN)"
+        ))
+        conn.execute(text(
+            "INSERT INTO rabbitmq_connections (id, name, host, username, password_encrypted) "
+            "VALUES (1, 'old', 'localhost', 'guest', 'x')"
+        ))
+
+    changes = ensure_schema(engine)
+    assert "added column rabbitmq_connections.nodes" in changes
+    assert "added column rabbitmq_connections.ssl_verify" in changes
+    assert "added column rabbitmq_connections.balance_management" in changes
+    assert "created table rabbitmq_connections" not in changes
+
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT name, nodes, ssl_verify, balance_management FROM rabbitmq_connections"
+        )).one()
+    # Existing rows are backfilled with the model defaults
+    assert tuple(row) == ("old", None, 1, 0)
+    assert ensure_schema(engine) == []
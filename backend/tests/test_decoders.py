@@ -0,0 +1,90 @@
+import base64
+
+import msgpack
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.decoders import PayloadDecoder, decode_protobuf_wire
+
+
+def decode_errors(codec: str):
+    return REGISTRY.get_sample_value("rabbitmq_webui_decode_errors_total", {"codec": codec}) or 0
+
+
+@pytest.mark.parametrize("codec, content_type, headers, expected", [
+    ("msgpack", "application/json", {"x-decoder": "text"}, "msgpack"),
+    (None, "application/json", {"x-decoder": "msgpack"}, "msgpack"),
+    (None, "application/json", {"x-decoder": b"msgpack"}, "msgpack"),
+    (None, "application/x-msgpack; charset=binary", None, "msgpack"),
+    (None, "application/vnd.api+json", None, "json"),
+    (None, "text/csv", None, "text"),
+    (None, "application/octet-stream", {}, "base64"),
+    (None, "image/png", None, None),
+    (None, None, None, None),
+    # Unknown or malformed header values fall back to the content type
+    (None, "application/json", {"x-decoder": "made-up"}, "json"),
+    (None, None, {"x-decoder": "made-up"}, None),
+    (None, "text/plain", {"x-decoder": {"nested": "table"}}, "text"),
+])
+def test_codec_selection(codec, content_type, headers, expected):
+    assert PayloadDecoder(codec).codec_for(content_type, headers) == expected
+
+
+def test_unknown_codec_is_rejected_up_front():
+    with pytest.raises(ValueError, match="Unknown decoder"):
+        PayloadDecoder("made-up")
+
+
+@pytest.mark.parametrize("body, value, codec", [
+    (b'{"a": 1}', {"a": 1}, "json"),
+    ("héllo".encode(), "héllo", "text"),
+    (b"\xff\x00", base64.b64encode(b"\xff\x00").decode(), "base64"),
+])
+def test_detection_without_a_codec(body, value, codec):
+    assert PayloadDecoder().decode(body) == (value, codec, None)
+
+
+def test_decode_by_header():
+    body = msgpack.packb({"id": 7})
+    assert PayloadDecoder().decode(body, "application/octet-stream", {"x-decoder": "msgpack"}) == (
+        {"id": 7}, "msgpack", None
+    )
+
+
+def test_failed_decode_falls_back_with_error():
+    before = decode_errors("json")
+    decoded = PayloadDecoder("json").decode(b"not json")
+    assert (decoded.value, decoded.codec) == ("not json", "text")
+    assert decoded.error.startswith("json: ")
+    assert decode_errors("json") == before + 1
+
+    decoded = PayloadDecoder("msgpack").decode(b"\xc1")
+    assert (decoded.value, decoded.codec) == ("wQ==", "base64")
+
+
+def test_error_label_is_bounded():
+    before = decode_errors("unknown")
+    PayloadDecoder._failed("made-up", b"x", ValueError("bad"))
+    assert decode_errors("unknown") == before + 1
+    assert REGISTRY.get_sample_value("rabbitmq_webui_decode_errors_total", {"codec": "made-up"}) is None
+
+
+@pytest.mark.asyncio
+async def test_large_payloads_decode_off_the_loop(monkeypatch):
+    import app.services.decoders as decoders
+
+    monkeypatch.setattr(decoders, "DECODE_OFFLOAD_BYTES", 16)
+    body = b'{"items": [' + b",".join(b"1" for _ in range(100)) + b"]}"
+    decoded = await PayloadDecoder().decode_async(body, "application/json")
+    assert (decoded.codec, len(decoded.value["items"])) == ("json", 100)
+
+    decoded = await PayloadDecoder("msgpack").decode_async(b"\xc1" * 32)
+    assert decoded.codec == "base64" and decoded.error.startswith("msgpack: ")
+
+
+def test_protobuf_wire_format():
+    # field 1 varint 150, field 2 "hi", field 3 nested {1: 1}, field 1 repeated
+    body = b"\x08\x96\x01\x12\x02hi\x1a\x02\x08\x01\x08\x02"
+    assert decode_protobuf_wire(body) == {"1": [150, 2], "2": "hi", "3": {"1": 1}}
+    with pytest.raises(ValueError):
+        decode_protobuf_wire(b"\x12\x05hi")
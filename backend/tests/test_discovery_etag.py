@@ -0,0 +1,80 @@
+import json
+from functools import partial
+
+import pytest
+
+from tests.conftest import create_connection
+
+
+@pytest.fixture
+def stub():
+    from benchmarks.stubs import StubManagementAPI
+
+    with StubManagementAPI(queues=200) as server:
+        yield server
+
+
+@pytest.fixture
+def connection_id(client, stub, monkeypatch):
+    import app.services.rabbitmq_service as rabbitmq_service
+    from app.services.topology_cache import TopologyCache
+
+    # Re-discover on every request so payload edits show up at once, in
+    # whichever service instance the registry (or the warm-up) resolves
+    monkeypatch.setattr(rabbitmq_service, "TopologyCache", partial(TopologyCache, ttl=0))
+    return create_connection(client, management_port=stub.port)
+
+
+def edit_queues(stub, edit):
+    queues = json.loads(stub.payloads["/api/queues"])
+    edit(queues)
+    stub.payloads["/api/queues"] = json.dumps(queues).encode()
+
+
+def test_matching_etag_is_not_modified(client, connection_id):
+    url = f"/api/discovery/{connection_id}/cluster"
+    full = client.get(url)
+    assert full.status_code == 200
+    etag = full.headers["etag"]
+    assert etag.startswith('W/"')
+    assert len(full.json()["queues"]) == 200
+
+    for if_none_match in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        response = client.get(url, headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_etag_follows_the_viewed_vhost(client, connection_id, stub):
+    cluster_url = f"/api/discovery/{connection_id}/cluster"
+    vhost_url = f"/api/discovery/{connection_id}/queues?vhost=vhost-1"
+    cluster_etag = client.get(cluster_url).headers["etag"]
+    vhost_etag = client.get(vhost_url).headers["etag"]
+
+    def bump(queues):
+        queue = next(queue for queue in queues if queue["vhost"] == "vhost-2")
+        queue["messages"] += 1
+
+    edit_queues(stub, bump)
+    changed = client.get(cluster_url, headers={"If-None-Match": cluster_etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != cluster_etag
+    assert client.get(vhost_url, headers={"If-None-Match": vhost_etag}).status_code == 304
+
+
+def test_listing_order_does_not_change_the_etag(client, connection_id, stub):
+    url = f"/api/discovery/{connection_id}/queues"
+    etag = client.get(url).headers["etag"]
+    edit_queues(stub, list.reverse)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_modified_since(client, connection_id):
+    url = f"/api/discovery/{connection_id}/vhosts"
+    last_modified = client.get(url).headers["last-modified"]
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}).status_code == 200
+    assert client.get(url, headers={"If-Modified-Since": "not a date"}).status_code == 200
@@ -0,0 +1,108 @@
+import json
+from datetime import datetime, timezone
+
+import pika
+import pytest
+
+from app.services.admission import admission
+from app.services.dlq_analysis import OTHER, BoundedCounter, DeadLetterAggregator, first_death
+from tests.conftest import call_disconnected, create_connection
+
+DIED = datetime(2024, 5, 1, 12, 30)
+
+
+def x_death(reason: str = "rejected", queue: str = "orders", time: datetime = DIED) -> dict:
+    return {"x-death": [
+        {"count": 3, "reason": "expired", "queue": "retry", "exchange": "retry-x",
+         "routing-keys": ["rk.retry"], "time": datetime(2024, 5, 1, 13)},
+        {"count": 1, "reason": reason, "queue": queue, "exchange": "app",
+         "routing-keys": [f"rk.{queue}", "cc"], "time": time},
+    ]}
+
+
+def test_first_death_is_the_oldest_entry():
+    assert first_death(x_death()) == (
+        "rejected", "orders", "app", "rk.orders", DIED.replace(tzinfo=timezone.utc).timestamp()
+    )
+
+
+def test_first_death_headers_win():
+    headers = dict(x_death(), **{
+        "x-first-death-reason": b"maxlen", "x-first-death-queue": b"payments", "x-first-death-exchange": ""
+    })
+    reason, queue, exchange, routing_key, _ = first_death(headers)
+    assert (reason, queue, routing_key) == ("maxlen", "payments", "rk.orders")
+    # An empty x-first-death-exchange is the default exchange, not missing
+    assert exchange == ""
+
+
+def test_first_death_without_x_death():
+    assert first_death(None) is None
+    assert first_death({"x-death": []}) is None
+    assert first_death({"other": 1}) is None
+    minimal = first_death({"x-death": [{"reason": None, "time": 1714566600}]})
+    assert minimal == ("unknown", "", "", "", 1714566600.0)
+
+
+def test_bounded_counter_overflow():
+    counter = BoundedCounter(limit=2)
+    assert [counter.add(key) for key in ("a", "b", "c", "a", "d")] == ["a", "b", OTHER, "a", OTHER]
+    assert counter.overflowed
+    assert counter.top() == {"a": 2, OTHER: 2, "b": 1}
+    # Once full, OTHER is the only new key
+    assert len(counter.counts) == 3
+
+
+def test_aggregator_truncates_instead_of_growing():
+    aggregator = DeadLetterAggregator(bucket_seconds=60, samples=1)
+    aggregator.by_dimension["queue"].limit = 2
+    aggregator.groups.limit = 2
+    for i in range(10):
+        aggregator.add(pika.BasicProperties(message_id=f"m{i}", headers=x_death(queue=f"q{i}")), i + 1)
+    aggregator.add(pika.BasicProperties(message_id="alive"), 11)
+
+    result = aggregator.result()
+    assert (result["scanned"], result["dead_lettered"], result["deaths"]) == (11, 10, 40)
+    assert result["truncated"]
+    assert result["by_queue"] == {OTHER: 8, "q0": 1, "q1": 1}
+    assert result["by_reason"] == {"rejected": 10}
+    assert result["by_first_death"] == [{"bucket": "2024-05-01T12:30:00+00:00", "count": 10}]
+    other = next(group for group in result["groups"] if group["queue"] == OTHER)
+    assert other["count"] == 9 and other["sample_message_ids"] == ["m2"]
+
+
+def fill_dlq(broker, count: int):
+    broker.declare_queue("dlq")
+    for i in range(count):
+        headers = x_death(reason=("rejected", "expired")[i % 2]) if i % 5 else None
+        broker.queues["dlq"].append((b"x", {"message_id": f"m{i}", "headers": headers}, "", "dlq"))
+
+
+def test_analyze_requeues_everything(client, broker):
+    connection_id = create_connection(client)
+    fill_dlq(broker, 100)
+    response = client.post("/api/consumer/dlq-analyze", json={
+        "connection_id": connection_id, "queue": "dlq", "batch_size": 7, "samples": 1
+    })
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["scanned"], result["dead_lettered"], result["done"]) == (100, 80, True)
+    assert result["by_reason"] == {"rejected": 40, "expired": 40}
+    assert [message[1]["message_id"] for message in broker.queues["dlq"]] == [f"m{i}" for i in range(100)]
+    assert admission.in_flight(connection_id) == 0
+
+
+@pytest.mark.parametrize("after_chunks", [0, 1])
+def test_streamed_analysis_releases_on_disconnect(client, broker, monkeypatch, after_chunks):
+    import app.services.dlq_analysis as dlq_analysis
+
+    connection_id = create_connection(client)
+    fill_dlq(broker, 100)
+    original = dlq_analysis.analyze_dead_letters
+    # A progress line after every batch
+    monkeypatch.setattr(dlq_analysis, "analyze_dead_letters",
+                        lambda *args, **kwargs: original(*args, progress_interval=0, **kwargs))
+    body = json.dumps({"connection_id": connection_id, "queue": "dlq", "batch_size": 10, "progress": True})
+    call_disconnected(client, "POST", "/api/consumer/dlq-analyze", body=body.encode(), after_chunks=after_chunks)
+    assert admission.in_flight(connection_id) == 0
+    assert [message[1]["message_id"] for message in broker.queues["dlq"]] == [f"m{i}" for i in range(100)]
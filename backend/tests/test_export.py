@@ -0,0 +1,100 @@
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.services.admission import admission
+from app.services.message_import import decode_header_value, encode_header_value
+from tests.conftest import call_disconnected, create_connection
+
+HEADERS = {
+    "text": "plain",
+    "count": 3,
+    "raw": b"\x00\xff",
+    "price": Decimal("1.50"),
+    "at": datetime(2024, 1, 2, 3, 4, 5),
+    "nested": {"list": [b"x", 1, {"deep": Decimal("2")}]},
+}
+
+
+def fill(broker, queue, count):
+    broker.declare_queue(queue)
+    for i in range(count):
+        broker.queues[queue].append((
+            f"body-{i}".encode() + b"\x00\xff",
+            {"message_id": str(i), "content_type": "application/octet-stream", "headers": HEADERS, "timestamp": 1700000000 + i},
+            "",
+            queue,
+        ))
+
+
+def test_header_values_round_trip():
+    encoded = encode_header_value(HEADERS)
+    assert json.loads(json.dumps(encoded)) == encoded
+    assert encoded["raw"] == {"$bytes": "AP8="}
+    assert encoded["price"] == {"$decimal": "1.50"}
+    assert decode_header_value(encoded) == HEADERS
+
+
+def test_export_round_trips_through_import(client, broker):
+    connection_id = create_connection(client)
+    fill(broker, "source", 25)
+
+    export = client.get("/api/consumer/export", params={
+        "connection_id": connection_id, "queue": "source", "batch_size": 10
+    })
+    assert export.status_code == 200
+    lines = export.content.splitlines()
+    assert len(lines) == 25
+    assert json.loads(lines[0])["properties"]["headers"]["price"] == {"$decimal": "1.50"}
+    # Browsing requeues everything, in order
+    assert [message[1]["message_id"] for message in broker.queues["source"]] == [str(i) for i in range(25)]
+
+    broker.declare_queue("copy")
+    imported = client.post(
+        "/api/publisher/import",
+        params={"connection_id": connection_id, "routing_key": "copy"},
+        files={"file": ("export.ndjson", io.BytesIO(export.content), "application/x-ndjson")},
+    )
+    assert imported.status_code == 200, imported.text
+    copies = list(broker.queues["copy"])
+    assert len(copies) == 25
+    for i, (body, properties, _, _) in enumerate(copies):
+        assert body == f"body-{i}".encode() + b"\x00\xff"
+        assert properties["message_id"] == str(i)
+        assert properties["headers"] == HEADERS
+
+
+def test_consume_export_acks_what_was_sent(client, broker):
+    connection_id = create_connection(client)
+    fill(broker, "source", 30)
+    export = client.get("/api/consumer/export", params={
+        "connection_id": connection_id, "queue": "source", "mode": "consume", "max_messages": 20, "compress": True
+    })
+    assert export.status_code == 200
+    assert export.headers["content-type"] == "application/gzip"
+    assert len(broker.queues["source"]) == 10
+    assert admission.in_flight(connection_id) == 0
+
+
+def test_browse_exports_are_bounded(client, broker, monkeypatch):
+    connection_id = create_connection(client)
+    fill(broker, "source", 5)
+    response = client.get("/api/consumer/export", params={
+        "connection_id": connection_id, "queue": "source", "max_messages": 10 ** 6
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("after_chunks", [0, 1])
+def test_disconnect_releases_the_reader(client, broker, after_chunks):
+    connection_id = create_connection(client)
+    fill(broker, "source", 50)
+    sent = call_disconnected(client, "GET", "/api/consumer/export",
+                             f"connection_id={connection_id}&queue=source&batch_size=10", after_chunks=after_chunks)
+    assert sum(message["type"] == "http.response.body" for message in sent) <= after_chunks + 1
+    assert admission.in_flight(connection_id) == 0
+    # The reader's connection was closed, requeueing what it held, in order
+    assert [message[1]["message_id"] for message in broker.queues["source"]] == [str(i) for i in range(50)]
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.health_check import HealthChecker
+from tests.conftest import create_connection
+
+
+class FakeService:
+    """Probes that take `delay` seconds (or fail with `error`)"""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None, tracker: dict = None):
+        self.delay = delay
+        self.error = error
+        self.tracker = tracker if tracker is not None else {"active": 0, "peak": 0}
+
+    async def probe_amqp_async(self, timeout: float):
+        self.tracker["active"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["active"])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.tracker["active"] -= 1
+        if self.error:
+            raise self.error
+
+    def probe_management(self, timeout: float):
+        time.sleep(min(self.delay, timeout))
+        return {"rabbitmq_version": "3.12.0", "erlang_version": "26.0", "cluster_name": "rabbit@test"}
+
+
+async def check_all(checker, targets):
+    return [result async for result in checker.check_all(targets)]
+
+
+@pytest.mark.asyncio
+async def test_results_stream_in_completion_order():
+    checker = HealthChecker(timeout=2, concurrency=10)
+    results = await check_all(checker, [
+        (1, "slow", FakeService(0.3)), (2, "fast", FakeService(0.0)), (3, "medium", FakeService(0.1))
+    ])
+    assert [result.name for result in results] == ["fast", "medium", "slow"]
+    assert all(result.success for result in results)
+    assert results[0].details["cluster_name"] == "rabbit@test"
+    assert set(checker.results) == {1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    tracker = {"active": 0, "peak": 0}
+    checker = HealthChecker(timeout=2, concurrency=3)
+    targets = [(i, f"c{i}", FakeService(0.02, tracker=tracker)) for i in range(10)]
+    assert len(await check_all(checker, targets)) == 10
+    assert tracker["peak"] == 3
+
+
+@pytest.mark.asyncio
+async def test_each_probe_has_its_own_timeout():
+    checker = HealthChecker(timeout=0.1)
+    start = time.perf_counter()
+    result = await checker.check(1, "hung", FakeService(5))
+    assert time.perf_counter() - start < 1
+    assert not result.success
+    assert not result.amqp_ok
+    assert result.amqp_ms is None
+    assert "AMQP: timed out after 0.1s" in result.message
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_is_reported_separately():
+    checker = HealthChecker(timeout=1)
+    result = await checker.check(1, "refused", FakeService(error=ConnectionRefusedError("refused")))
+    assert (result.amqp_ok, result.management_ok) == (False, True)
+    assert result.message == "Connection failed: AMQP: refused"
+    checker.forget(1)
+    assert checker.results == {}
+
+
+def test_test_all_streams_ndjson(client):
+    from benchmarks.stubs import StubManagementAPI
+
+    with StubManagementAPI(queues=1) as stub:
+        reachable = create_connection(client, "reachable", management_port=stub.port)
+        unreachable = create_connection(client, "unreachable", management_port=1)
+        with client.stream("POST", "/api/connections/test-all") as response:
+            assert response.headers["content-type"] == "application/x-ndjson"
+            results = {result["connection_id"]: result for result in map(json.loads, response.iter_lines())}
+
+    assert set(results) == {reachable, unreachable}
+    assert results[reachable]["success"]
+    assert results[unreachable]["amqp_ok"] and not results[unreachable]["management_ok"]
+    health = {result["connection_id"]: result for result in client.get("/api/connections/health").json()}
+    assert health[unreachable]["management_ok"] is False
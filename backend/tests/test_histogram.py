@@ -0,0 +1,79 @@
+import math
+import random
+
+import pytest
+
+from app.services.histogram import LatencyHistogram
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.total == 100
+    assert histogram.min == 1
+    assert histogram.max == 100
+    assert histogram.mean == 50.5
+    assert histogram.percentile(50) == 50
+    assert histogram.percentile(99) == 99
+    assert histogram.percentile(100) == 100
+
+
+def test_relative_error_is_bounded_at_any_magnitude():
+    histogram = LatencyHistogram(precision_bits=7)
+    values = [random.randint(0, 10 ** 9) for _ in range(10000)]
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for p in (50, 90, 99, 99.9):
+        exact = values[math.ceil(p / 100 * len(values)) - 1]
+        assert histogram.percentile(p) >= exact
+        assert histogram.percentile(p) <= exact * (1 + 2 ** -6) + 1
+
+
+def test_percentiles_match_percentile():
+    histogram = LatencyHistogram()
+    for value in range(0, 100000, 7):
+        histogram.record(value)
+    wanted = (50, 90, 99, 99.9)
+    assert histogram.percentiles(wanted) == {p: histogram.percentile(p) for p in wanted}
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0
+    assert histogram.percentiles((50, 99)) == {50: 0, 99: 0}
+    assert histogram.mean == 0.0
+
+
+def test_counts_and_negative_values():
+    histogram = LatencyHistogram()
+    histogram.record(-5)
+    histogram.record(1000, count=9)
+    assert histogram.total == 10
+    assert histogram.min == 0
+    assert histogram.percentile(10) == 0
+    assert histogram.percentile(11) >= 1000
+
+
+def test_merge_and_reset():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for value in range(100):
+        a.record(value)
+    for value in range(100, 200000, 100):
+        b.record(value)
+    a.merge(b)
+    assert a.total == 100 + b.total
+    assert a.min == 0
+    assert a.max == b.max
+    assert a.sum == sum(range(100)) + b.sum
+
+    a.reset()
+    assert a.total == 0
+    assert a.min is None
+    assert a.percentile(50) == 0
+
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        LatencyHistogram(7).merge(LatencyHistogram(5))
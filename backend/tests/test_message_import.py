@@ -0,0 +1,73 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from app.services.message_import import iter_upload_lines, parse_message_line
+
+
+class Upload:
+    """UploadFile stand-in reading from bytes"""
+
+    def __init__(self, data: bytes):
+        self.file = io.BytesIO(data)
+
+    async def read(self, size: int) -> bytes:
+        return self.file.read(size)
+
+
+async def lines(data: bytes, **kwargs):
+    return [line async for line in iter_upload_lines(Upload(data), **kwargs)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+async def test_lines_split_across_chunks(chunk_size):
+    data = b"first\nsecond line\n\nlast without newline"
+    assert await lines(data, chunk_size=chunk_size) == [
+        b"first", b"second line", b"", b"last without newline"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_trailing_newline_yields_no_empty_line():
+    assert await lines(b"a\nb\n", chunk_size=2) == [b"a", b"b"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [5, 64, 64 * 1024])
+async def test_gzip_multi_member(chunk_size):
+    data = gzip.compress(b"one\ntw") + gzip.compress(b"o\nthree\n") + gzip.compress(b"four")
+    assert await lines(data, chunk_size=chunk_size) == [b"one", b"two", b"three", b"four"]
+
+
+@pytest.mark.asyncio
+async def test_gzip_output_is_bounded_per_step():
+    # 8 MiB of zeros compresses to a few KiB; no step may inflate all of it
+    data = gzip.compress(b"0" * (8 * 1024 * 1024) + b"\nx\n")
+    result = await lines(data, chunk_size=1024, max_line_bytes=1024 * 1024)
+    assert result == [None, b"x"]
+
+
+@pytest.mark.asyncio
+async def test_overlong_lines_are_dropped():
+    data = b"short\n" + b"y" * 50 + b"\nok\n" + b"z" * 50
+    assert await lines(data, chunk_size=8, max_line_bytes=20) == [b"short", None, b"ok", None]
+
+
+@pytest.mark.asyncio
+async def test_line_at_the_limit_is_kept():
+    assert await lines(b"x" * 20 + b"\n", chunk_size=3, max_line_bytes=20) == [b"x" * 20]
+
+
+def test_parse_message_line_overrides_and_decodes():
+    line = {
+        "body": "aGk=", "body_encoding": "base64", "exchange": "orders", "routing_key": "new",
+        "properties": {"headers": {"raw": {"$bytes": "AP8="}}},
+    }
+    assert parse_message_line(json.loads(json.dumps(line)), routing_key="copy") == (
+        "orders", "copy", b"hi", {"headers": {"raw": b"\x00\xff"}}
+    )
+    with pytest.raises(ValueError):
+        parse_message_line({"body": "x"})
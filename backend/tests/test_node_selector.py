@@ -0,0 +1,75 @@
+import json
+from types import SimpleNamespace
+
+from app.services import node_selector
+from app.services.node_selector import NodeSelector, NodeSelectorRegistry, connection_addresses
+
+ADDRESSES = [("a", 5672, 15672), ("b", 5672, 15672), ("c", 5672, 15672)]
+
+
+def hosts(nodes):
+    return [node.host for node in nodes]
+
+
+def test_connection_addresses_put_the_primary_first_and_dedupe():
+    connection = SimpleNamespace(host="a", port=5672, management_port=15672, nodes=json.dumps([
+        {"host": "b"},
+        {"host": "a"},
+        {"host": "c", "port": 5673, "management_port": 15673},
+    ]))
+    assert connection_addresses(connection) == [
+        ("a", 5672, 15672), ("b", 5672, 15672), ("c", 5673, 15673)
+    ]
+
+
+def test_unmeasured_nodes_first_then_fastest():
+    selector = NodeSelector(ADDRESSES)
+    a, b, c = selector.nodes
+    selector.record(a, "amqp", True, 0.050)
+    selector.record(b, "amqp", True, 0.010)
+    assert hosts(selector.candidates("amqp")) == ["c", "b", "a"]
+    # Protocols are measured separately
+    assert hosts(selector.candidates("management")) == ["a", "b", "c"]
+
+
+def test_latency_is_a_moving_average(monkeypatch):
+    monkeypatch.setattr(node_selector, "NODE_LATENCY_ALPHA", 0.5)
+    selector = NodeSelector(ADDRESSES)
+    node = selector.nodes[0]
+    selector.record(node, "amqp", True, 0.100)
+    selector.record(node, "amqp", True, 0.200)
+    assert abs(node.latency["amqp"] - 0.150) < 1e-9
+
+
+def test_failed_nodes_are_tried_last_until_they_recover():
+    selector = NodeSelector(ADDRESSES)
+    a, b, c = selector.nodes
+    for node, latency in ((a, 0.001), (b, 0.002), (c, 0.003)):
+        selector.record(node, "amqp", True, latency)
+    selector.record(a, "amqp", False, 5.0)
+    assert hosts(selector.candidates("amqp")) == ["b", "c", "a"]
+    assert [status.amqp_up for status in selector.state()] == [False, True, True]
+    assert selector.state()[0].amqp_failures == 1
+
+    selector.record(a, "amqp", True, 0.001)
+    assert hosts(selector.candidates("amqp"))[0] == "a"
+    assert selector.state()[0].amqp_failures == 0
+
+
+def test_spread_puts_a_healthy_node_first():
+    selector = NodeSelector(ADDRESSES)
+    a, b, c = selector.nodes
+    for node in (a, b):
+        selector.record(node, "management", True, 0.010)
+    selector.record(c, "management", False, 1.0)
+    firsts = {selector.candidates("management", spread=True)[0].host for _ in range(200)}
+    assert firsts == {"a", "b"}
+
+
+def test_registry_keeps_selectors_while_nodes_are_unchanged():
+    registry = NodeSelectorRegistry()
+    connection = SimpleNamespace(id=1, host="a", port=5672, management_port=15672, nodes=None)
+    selector = registry.get(connection)
+    assert registry.get(connection) is selector
+    connection.nodes = json.dumps([{"host": "b"}])
+    assert registry.get(connection) is not selector
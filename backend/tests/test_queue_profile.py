@@ -0,0 +1,45 @@
+import pika
+
+from app.services.queue_profile import QueueProfiler
+
+NOW = 1_700_000_000
+
+
+def get_ok(message_count: int, routing_key: str = "orders.new", redelivered: bool = False):
+    return pika.spec.Basic.GetOk(delivery_tag=1, redelivered=redelivered, exchange="", routing_key=routing_key,
+                                 message_count=message_count)
+
+
+def test_head_projection_is_labelled_and_scaled():
+    profiler = QueueProfiler(top_k=2, sample_size=3, now=NOW)
+    # 10 messages read from the head of a 40-message queue
+    for i in range(10):
+        properties = pika.BasicProperties(
+            content_type="application/json" if i < 8 else "text/plain",
+            timestamp=NOW - 30 if i % 2 else None,
+            headers={"tenant": f"t{i % 3}"}
+        )
+        profiler.add(get_ok(39 - i, redelivered=i == 0), properties, b"x" * 100)
+
+    result = profiler.result()
+    assert (result["scanned"], result["queue_depth"], result["coverage"], result["redelivered"]) == (10, 40, 0.25, 1)
+    assert result["sizes"]["queue_bytes_projected_from_head"] == 4000
+    assert "estimated_queue_bytes" not in result["sizes"]
+    assert result["content_types"] == [
+        {"value": "application/json", "count": 8, "projected_from_head": 32},
+        {"value": "text/plain", "count": 2, "projected_from_head": 8},
+    ]
+    assert result["ages"]["without_timestamp"] == 5
+    assert result["ages"]["buckets"]["<1m"] == 5
+    assert result["headers"]["tenant"]["distinct"] == 3
+    assert len(result["sample"]) == 3
+
+
+def test_full_scan_projection_is_exact():
+    profiler = QueueProfiler(now=NOW)
+    for i in range(5):
+        profiler.add(get_ok(4 - i), pika.BasicProperties(), b"abc")
+    result = profiler.result()
+    assert result["coverage"] == 1.0
+    assert result["sizes"]["queue_bytes_projected_from_head"] == 15
+    assert result["content_types"] == [{"value": "(none)", "count": 5, "projected_from_head": 5}]
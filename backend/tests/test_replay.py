@@ -0,0 +1,28 @@
+from app.services.replay import RoutingKeyMap
+
+
+def test_unmapped_keys_pass_through():
+    assert RoutingKeyMap({})("orders.created") == "orders.created"
+    assert RoutingKeyMap({"a": "b"})("orders.created") == "orders.created"
+
+
+def test_exact_keys_win_over_patterns():
+    mapping = RoutingKeyMap({"orders.*": "replayed.orders", "orders.created": "replayed.created"})
+    assert mapping("orders.created") == "replayed.created"
+    assert mapping("orders.cancelled") == "replayed.orders"
+
+
+def test_patterns_apply_in_the_order_given():
+    mapping = RoutingKeyMap({"orders.eu.*": "eu", "orders.*": "all", "*": "other"})
+    assert mapping("orders.eu.created") == "eu"
+    assert mapping("orders.us.created") == "all"
+    assert mapping("payments") == "other"
+
+
+def test_glob_syntax():
+    mapping = RoutingKeyMap({"log.?": "single", "log.[ab]x": "set"})
+    assert mapping("log.1") == "single"
+    assert mapping("log.10") == "log.10"
+    assert mapping("log.bx") == "set"
+    # Matching is case-sensitive like AMQP routing keys
+    assert mapping("LOG.1") == "LOG.1"
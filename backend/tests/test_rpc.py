@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.database import SessionLocal
+from app.services.connection_registry import connection_registry
+from tests.conftest import create_connection
+
+
+@pytest.fixture
+def responder(broker):
+    """Echo server on the "rpc" queue: replies with the request's
+    correlation id as body, after `delay` seconds"""
+    broker.declare_queue("rpc")
+    state = {"delay": 0.0, "stop": False}
+
+    def serve():
+        while not state["stop"]:
+            message = broker.get("rpc")
+            if message is None:
+                time.sleep(0.0005)
+                continue
+            _, properties, _, _ = message
+            if state["delay"]:
+                time.sleep(state["delay"])
+            broker.route("", properties["reply_to"], properties["correlation_id"].encode(),
+                         {"correlation_id": properties["correlation_id"]})
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield state
+    state["stop"] = True
+    thread.join()
+
+
+def test_concurrent_replies_reach_their_callers(client, responder):
+    connection_id = create_connection(client)
+    response = client.post("/api/publisher/rpc", json={
+        "connection_id": connection_id, "routing_key": "rpc", "message": "ping",
+        "repeat": 40, "concurrency": 8, "max_responses": 40, "properties": {"correlation_id": "c"},
+    })
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["received"] == 40
+    assert {reply["correlation_id"] for reply in result["responses"]} == {f"c-{i}" for i in range(40)}
+    for reply in result["responses"]:
+        assert reply["body"] == reply["correlation_id"]
+        assert reply["properties"]["correlation_id"] == reply["correlation_id"]
+
+
+def test_generated_correlation_id(client, responder):
+    connection_id = create_connection(client)
+    reply = client.post("/api/publisher/rpc", json={
+        "connection_id": connection_id, "routing_key": "rpc", "message": "ping"
+    }).json()["responses"][0]
+    assert len(reply["correlation_id"]) == 32
+    assert reply["body"] == reply["correlation_id"]
+
+
+def test_duplicate_in_flight_correlation_id_is_rejected(client, responder):
+    from app.services.channel_pool import channel_pool
+
+    connection_id = create_connection(client)
+    responder["delay"] = 0.1
+    with SessionLocal() as db:
+        service = connection_registry.get_service(db, connection_id)
+
+    async def call():
+        return await asyncio.gather(*(
+            channel_pool.rpc_call(service, "", "rpc", b"ping", {"correlation_id": "same"}, timeout=2)
+            for _ in range(2)
+        ), return_exceptions=True)
+
+    first, second = client.portal.call(call)
+    assert first.body == b"same"
+    assert isinstance(second, ValueError)
+
+    # Once the first call is answered the id can be used again
+    reply = client.portal.call(call)[0]
+    assert reply.body == b"same"
@@ -0,0 +1,73 @@
+import random
+
+from app.services.sketches import DistinctCounter, Reservoir, SpaceSaving
+
+
+def test_space_saving_is_exact_without_evictions():
+    sketch = SpaceSaving(capacity=10)
+    for key in "aaaabbbc":
+        sketch.add(key)
+    assert sketch.evictions == 0
+    # Rare keys are reported while every count is still exact
+    assert sketch.top(5) == [
+        {"value": "a", "count": 4, "error": 0},
+        {"value": "b", "count": 3, "error": 0},
+        {"value": "c", "count": 1, "error": 0},
+    ]
+    assert sketch.top(1) == [{"value": "a", "count": 4, "error": 0}]
+
+
+def test_space_saving_keeps_heavy_hitters_after_evictions():
+    rng = random.Random(1)
+    sketch = SpaceSaving(capacity=20)
+    stream = ["hot"] * 3000 + ["warm"] * 1000 + [f"noise-{rng.randrange(5000)}" for _ in range(6000)]
+    rng.shuffle(stream)
+    for key in stream:
+        sketch.add(key)
+
+    assert sketch.evictions > 0
+    top = sketch.top(5)
+    assert [entry["value"] for entry in top[:2]] == ["hot", "warm"]
+    for entry, exact in zip(top, (3000, 1000)):
+        # Overestimates by at most the reported error
+        assert exact <= entry["count"] <= exact + entry["error"]
+    # Everything reported is above the guarantee floor
+    assert all(entry["count"] - entry["error"] > sketch.total / sketch.capacity for entry in top)
+
+
+def test_distinct_counter_is_exact_below_k():
+    counter = DistinctCounter(k=256)
+    for value in list(range(200)) * 3:
+        counter.add(value)
+    assert counter.estimate() == 200
+
+
+def test_distinct_counter_estimates_above_k():
+    counter = DistinctCounter(k=256)
+    for value in range(50000):
+        counter.add(f"key-{value}")
+    # About 1/sqrt(256) = 6% relative error; allow four standard errors
+    assert abs(counter.estimate() - 50000) < 50000 * 0.25
+
+
+def test_reservoir_keeps_everything_until_full():
+    reservoir = Reservoir(size=10)
+    for item in range(5):
+        reservoir.add(item)
+    assert reservoir.items == [0, 1, 2, 3, 4]
+    assert reservoir.seen == 5
+
+
+def test_reservoir_sample_is_uniform():
+    hits = [0] * 100
+    rng = random.Random(7)
+    for _ in range(2000):
+        reservoir = Reservoir(size=10, rng=rng)
+        for item in range(100):
+            reservoir.add(item)
+        assert len(reservoir.items) == 10
+        for item in reservoir.items:
+            hits[item] += 1
+    # Each item is kept with probability 10/100: 200 of 2000 runs expected
+    assert min(hits) > 120
+    assert max(hits) < 280
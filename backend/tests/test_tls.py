@@ -0,0 +1,69 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.tls import ResumingSSLContext, TLSContextCache, build_context
+
+
+@pytest.fixture(params=["TLSv1_2", "TLSv1_3"])
+def server(request):
+    from benchmarks.stubs import TLSStandIn
+
+    with TLSStandIn(request.param) as stand_in:
+        yield stand_in
+
+
+def amqp_handshake(context, port: int) -> bool:
+    """Connect, exchange protocol headers and return whether the session was resumed"""
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        with context.wrap_socket(sock, server_hostname="localhost") as tls:
+            tls.sendall(b"AMQP\x00\x00\x09\x01")
+            tls.recv(8)
+            return tls.session_reused
+
+
+def connection(**fields):
+    values = dict(id=1, ssl_ca_cert=None, ssl_client_cert=None, ssl_client_key_encrypted=None, ssl_verify=True)
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_context_cache_reuses_until_tls_settings_change(server):
+    cache = TLSContextCache()
+    amqp = cache.get(connection(ssl_ca_cert=server.cert_pem), "amqp")
+    assert cache.get(connection(ssl_ca_cert=server.cert_pem), "amqp") is amqp
+    assert cache.get(connection(ssl_ca_cert=server.cert_pem), "management") is not amqp
+    assert cache.get(connection(id=2, ssl_ca_cert=server.cert_pem), "amqp") is not amqp
+
+    unverified = cache.get(connection(ssl_ca_cert=server.cert_pem, ssl_verify=False), "amqp")
+    assert unverified is not amqp
+    assert not unverified.check_hostname
+
+
+def test_blocking_sockets_resume_the_session(server):
+    context = build_context(server.cert_pem)
+    assert isinstance(context, ResumingSSLContext)
+    assert [amqp_handshake(context, server.port) for _ in range(3)] == [False, True, True]
+    assert (server.handshakes, server.resumed) == (3, 2)
+
+
+def test_resumption_can_be_disabled(server):
+    context = build_context(server.cert_pem, resumption=False)
+    assert [amqp_handshake(context, server.port) for _ in range(2)] == [False, False]
+
+
+@pytest.mark.asyncio
+async def test_asyncio_connections_resume_the_session(server):
+    context = build_context(server.cert_pem)
+    resumed = []
+    for _ in range(3):
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", server.port, ssl=context, server_hostname="localhost"
+        )
+        writer.write(b"AMQP\x00\x00\x09\x01")
+        await reader.readexactly(8)
+        resumed.append(writer.get_extra_info("ssl_object").session_reused)
+        writer.close()
+    assert resumed == [False, True, True]
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from app.database import WatchRule
+from app.services.rabbitmq_service import QueueStats
+from app.services.watch import ConnectionWatch, RuleIndex
+
+
+def rule(id: int, pattern: str = "*", vhost: str = None, condition: str = "depth_above",
+         threshold: float = 10, webhook_url: str = None) -> WatchRule:
+    return WatchRule(id=id, connection_id=1, name=f"rule-{id}", vhost=vhost, queue_pattern=pattern,
+                     condition=condition, threshold=threshold, webhook_url=webhook_url,
+                     updated_at=datetime(2024, 1, 1))
+
+
+def stats(name: str, vhost: str = "/", messages: int = 0, consumers: int = 1, state: str = "running",
+          publish_rate: float = 0.0, deliver_rate: float = 0.0) -> QueueStats:
+    return QueueStats(vhost, name, messages, consumers, state, publish_rate, deliver_rate)
+
+
+def ids(rules) -> set:
+    return {rule.id for rule in rules}
+
+
+def test_rule_index_matching():
+    index = RuleIndex([
+        rule(1, "orders"),
+        rule(2, "orders", vhost="/"),
+        rule(3, "orders.*"),
+        rule(4, "orders.*", vhost="other"),
+        rule(5, None),
+        rule(6, "Orders"),
+        rule(7, "q[0-9]"),
+    ])
+    assert ids(index.rules_for("/", "orders")) == {1, 2, 5}
+    assert ids(index.rules_for("other", "orders")) == {1, 5}
+    assert ids(index.rules_for("/", "orders.eu")) == {3, 5}
+    assert ids(index.rules_for("other", "orders.eu")) == {3, 4, 5}
+    assert ids(index.rules_for("/", "q1")) == {5, 7}
+    # Globs are case sensitive, like queue names
+    assert ids(index.rules_for("/", "ORDERS.eu")) == {5}
+
+
+def test_rule_index_memo_is_forgotten():
+    index = RuleIndex([rule(1, "a*")])
+    assert index.rules_for("/", "ab") is index.rules_for("/", "ab")
+    index.forget("/", "ab")
+    assert ("/", "ab") not in index._memo
+
+
+def test_conditions():
+    watch = ConnectionWatch(1, [
+        rule(1, "depth"),
+        rule(2, "idle", condition="no_consumers"),
+        rule(3, "busy", condition="rate_imbalance", threshold=5),
+        rule(4, "down", condition="not_running"),
+    ])
+    events = watch.evaluate([
+        stats("depth", messages=11),
+        stats("idle", consumers=0),
+        stats("busy", publish_rate=20, deliver_rate=14.5),
+        stats("down", state="flow"),
+    ])
+    assert {(event.rule_id, event.state, event.value) for event, _ in events} == {
+        (1, "firing", 11.0), (2, "firing", 0.0), (3, "firing", 5.5), (4, "firing", 1.0)
+    }
+    events = watch.evaluate([
+        stats("depth", messages=10), stats("idle"), stats("busy", publish_rate=5), stats("down")
+    ])
+    assert sorted((event.rule_id, event.state) for event, _ in events) == [
+        (1, "resolved"), (2, "resolved"), (3, "resolved"), (4, "resolved")
+    ]
+
+
+def test_transitions_fire_once_and_resolve():
+    watch = ConnectionWatch(1, [rule(1, "orders.*", webhook_url="http://hook")])
+    events = watch.evaluate([stats("orders.eu", messages=50), stats("orders.us", messages=1)])
+    assert [(event.queue, event.state, url) for event, url in events] == [("orders.eu", "firing", "http://hook")]
+    assert [event.queue for event in watch.firing.values()] == ["orders.eu"]
+
+    # Still firing: no new event, unchanged stats are not even evaluated
+    assert watch.evaluate([stats("orders.eu", messages=60), stats("orders.us", messages=1)]) == []
+
+    events = watch.evaluate([stats("orders.eu", messages=2), stats("orders.us", messages=1)])
+    assert [(event.queue, event.state, event.value) for event, _ in events] == [("orders.eu", "resolved", 2.0)]
+    assert watch.firing == {}
+
+
+def test_deleted_queue_resolves_its_alert():
+    watch = ConnectionWatch(1, [rule(1)])
+    watch.evaluate([stats("gone", messages=50)])
+    events = watch.evaluate([])
+    assert [(event.queue, event.state, event.value) for event, _ in events] == [("gone", "resolved", 50.0)]
+    assert watch.firing == {}
+
+
+def test_rule_changes():
+    watch = ConnectionWatch(1, [rule(1), rule(2, "b")])
+    watch.evaluate([stats("a", messages=50), stats("b", messages=50)])
+    assert len(watch.firing) == 3
+
+    assert not watch.set_rules([rule(1), rule(2, "b")])
+    # Alerts of the deleted rule go, and every queue is evaluated again
+    assert watch.set_rules([rule(1)])
+    assert {key[0] for key in watch.firing} == {1}
+    assert watch.last == {}
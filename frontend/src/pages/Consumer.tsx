@@ -16,6 +16,11 @@ import {
   Clock
 } from 'lucide-react';
 
+// Reconnect backoff when a replica at capacity closes the socket with 1013
+const RECONNECT_BASE_DELAY_MS = 500;
+const RECONNECT_MAX_DELAY_MS = 10000;
+const MAX_RECONNECT_ATTEMPTS = 8;
+
 interface ConsumeForm {
   queue: string;
   vhost: string;
@@ -31,6 +36,10 @@ const Consumer: React.FC = () => {
   const [filterType, setFilterType] = useState<'all' | 'message' | 'error'>('all');
   const [wsConnection, setWsConnection] = useState<WebSocket | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // Set by Stop so a pending reconnect is dropped
+  const stoppedRef = useRef(false);
+  const reconnectAttemptsRef = useRef(0);
+  const reconnectTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const [autoScroll, setAutoScroll] = useState(true);
 
   const {
@@ -88,6 +97,70 @@ const Consumer: React.FC = () => {
     }
   }, [state.discovery, selectedVHost, setValue]);
 
+  const openConsumer = (connectionId: number, data: ConsumeForm) => {
+    // Create WebSocket connection
+    const ws = consumerApi.createConsumerWebSocket(connectionId);
+
+    ws.onopen = () => {
+      console.log('WebSocket connected');
+      // Send consume request
+      ws.send(JSON.stringify({
+        queue: data.queue,
+        vhost: data.vhost,
+        auto_ack: data.auto_ack,
+      }));
+      setIsConsuming(true);
+      setWsConnection(ws);
+      if (reconnectAttemptsRef.current === 0) {
+        toast.success('Started consuming messages');
+      }
+    };
+
+    ws.onmessage = (event) => {
+      // A delivered message means this replica kept the session
+      reconnectAttemptsRef.current = 0;
+      const message: ConsumedMessage = JSON.parse(event.data);
+      setMessages(prev => [...prev, { ...message, timestamp: new Date().toISOString() }]);
+      
+      if (message.type === 'error') {
+        toast.error(message.message || 'Consumer error');
+      }
+    };
+
+    ws.onclose = (event) => {
+      console.log('WebSocket disconnected', event.code);
+      setWsConnection(null);
+
+      // 1013 (Try Again Later): the replica is at capacity, so reconnect
+      // through the load balancer with exponential backoff and jitter
+      if (event.code === 1013 && !stoppedRef.current
+          && reconnectAttemptsRef.current < MAX_RECONNECT_ATTEMPTS) {
+        const attempt = reconnectAttemptsRef.current++;
+        const delay = Math.min(RECONNECT_BASE_DELAY_MS * 2 ** attempt, RECONNECT_MAX_DELAY_MS);
+        reconnectTimerRef.current = setTimeout(() => {
+          reconnectTimerRef.current = null;
+          if (!stoppedRef.current) {
+            openConsumer(connectionId, data);
+          }
+        }, delay / 2 + Math.random() * delay / 2);
+        return;
+      }
+
+      setIsConsuming(false);
+      if (event.code === 1013) {
+        toast.error('All replicas are at capacity, try again later');
+      } else {
+        toast.info('Stopped consuming messages');
+      }
+    };
+
+    ws.onerror = (error) => {
+      console.error('WebSocket error:', error);
+      // onclose follows and decides whether to reconnect
+      toast.error('WebSocket connection error');
+    };
+  };
+
   const startConsuming = async (data: ConsumeForm) => {
     if (!state.selectedConnection) {
       toast.error('Please select a connection first');
@@ -95,57 +168,37 @@ const Consumer: React.FC = () => {
     }
 
     try {
-      // Create WebSocket connection
-      const ws = consumerApi.createConsumerWebSocket(state.selectedConnection.id);
-      
-      ws.onopen = () => {
-        console.log('WebSocket connected');
-        // Send consume request
-        ws.send(JSON.stringify({
-          queue: data.queue,
-          vhost: data.vhost,
-          auto_ack: data.auto_ack,
-        }));
-        setIsConsuming(true);
-        setWsConnection(ws);
-        toast.success('Started consuming messages');
-      };
-
-      ws.onmessage = (event) => {
-        const message: ConsumedMessage = JSON.parse(event.data);
-        setMessages(prev => [...prev, { ...message, timestamp: new Date().toISOString() }]);
-        
-        if (message.type === 'error') {
-          toast.error(message.message || 'Consumer error');
-        }
-      };
-
-      ws.onclose = () => {
-        console.log('WebSocket disconnected');
-        setIsConsuming(false);
-        setWsConnection(null);
-        toast.info('Stopped consuming messages');
-      };
-
-      ws.onerror = (error) => {
-        console.error('WebSocket error:', error);
-        toast.error('WebSocket connection error');
-        setIsConsuming(false);
-        setWsConnection(null);
-      };
-
+      stoppedRef.current = false;
+      reconnectAttemptsRef.current = 0;
+      openConsumer(state.selectedConnection.id, data);
     } catch (error: any) {
       toast.error('Failed to start consuming: ' + error.message);
     }
   };
 
   const stopConsuming = () => {
+    stoppedRef.current = true;
+    if (reconnectTimerRef.current) {
+      clearTimeout(reconnectTimerRef.current);
+      reconnectTimerRef.current = null;
+      setIsConsuming(false);
+    }
     if (wsConnection) {
       wsConnection.send(JSON.stringify({ action: 'stop' }));
       wsConnection.close();
     }
   };
 
+  // Cancel a pending reconnect when leaving the page
+  useEffect(() => {
+    return () => {
+      stoppedRef.current = true;
+      if (reconnectTimerRef.current) {
+        clearTimeout(reconnectTimerRef.current);
+      }
+    };
+  }, []);
+
   const clearMessages = () => {
     setMessages([]);
     setFilteredMessages([]);
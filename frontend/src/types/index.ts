@@ -1,3 +1,9 @@
+export interface NodeAddress {
+  host: string;
+  port?: number;
+  management_port?: number;
+}
+
 export interface RabbitMQConnection {
   id: number;
   name: string;
@@ -8,7 +14,13 @@ export interface RabbitMQConnection {
   password: string;
   virtual_host: string;
   use_ssl: boolean;
+  ssl_ca_cert?: string;
+  ssl_client_cert?: string;
+  ssl_client_key?: string;
+  ssl_verify?: boolean;
   description?: string;
+  nodes?: NodeAddress[];
+  balance_management?: boolean;
   created_at: string;
   updated_at: string;
   is_active: boolean;
@@ -23,7 +35,13 @@ export interface RabbitMQConnectionCreate {
   password: string;
   virtual_host: string;
   use_ssl: boolean;
+  ssl_ca_cert?: string;
+  ssl_client_cert?: string;
+  ssl_client_key?: string;
+  ssl_verify?: boolean;
   description?: string;
+  nodes?: NodeAddress[];
+  balance_management?: boolean;
 }
 
 export interface ConnectionTestResult {
@@ -94,16 +112,23 @@ export interface PublishResult {
   message_id?: string;
 }
 
+export type PayloadCodec = 'json' | 'text' | 'msgpack' | 'protobuf' | 'avro' | 'base64';
+
 export interface ConsumeRequest {
   connection_id: number;
   queue: string;
   vhost: string;
   auto_ack: boolean;
+  decoder?: PayloadCodec;
+  schemas?: Record<string, any>;
 }
 
 export interface ConsumedMessage {
   type: 'message' | 'ready' | 'error';
   body?: string;
+  // Same fields as browse/get results, on HTTP and WebSocket alike
+  body_decoder?: PayloadCodec;
+  body_decode_error?: string | null;
   properties?: Record<string, any>;
   delivery_info?: Record<string, any>;
   timestamp?: string;